@@ -0,0 +1,231 @@
+"""Crawl localhost mocks of the news sites and retail APIs and report throughput.
+
+Every target is served by a ``MockServer`` (see ``mock_server.py``) with
+the given latency and error rate, and crawled by the real pipeline in a
+fresh process: the scheduler, crawl engine, site parsers and a JSONL sink
+for news sites, and the catalog crawl for retailers. Reported per target:
+records written and records/sec, client-side request latency p50/p99,
+requests, errors injected and requests that still failed after retries,
+the most requests a server had in flight, the final adaptive limit, the
+mean CPU time of an article parse, and the peak RSS of the crawling
+process and of its parse workers.
+
+    python benchmarks/crawl_benchmark.py --latency 0.05 --jitter 0.05 --error-rate 0.01
+    python benchmarks/crawl_benchmark.py --sites detik --no-retail --parse-workers 4 --parser selectolax
+    python benchmarks/crawl_benchmark.py --capacity 10 --adaptive --max-per-host 32
+    python benchmarks/crawl_benchmark.py --no-retail --partial
+    python benchmarks/crawl_benchmark.py --no-news --retail alfagift
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from datetime import date
+from multiprocessing import get_context
+
+from mock_server import AlfagiftApi, IndomaretApi, MockServer, NewsSite, rewrite
+
+from indoscraping.scraper.metrics import Metrics
+from indoscraping.scraper.sites import SITES
+
+RETAILERS = {
+    "indomaret": ("indoscraping.scraper.retail.indomaret", IndomaretApi),
+    "alfagift": ("indoscraping.scraper.retail.alfagift", AlfagiftApi),
+}
+
+DATE = date(2025, 7, 28)
+
+
+class SampledMetrics(Metrics):
+    """``Metrics`` that also keep every request latency, for exact percentiles."""
+
+    def reset(self):
+        super().reset()
+        self.samples = []
+        self._samples_lock = threading.Lock()
+
+    def observe_request(self, site, stage, seconds, status, size=0, retries=0):
+        super().observe_request(site, stage, seconds, status, size, retries)
+        if status != "cached":
+            with self._samples_lock:
+                self.samples.append(seconds)
+
+    def percentile(self, q):
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def mock_categories(site, base, count):
+    """Return ``count`` categories shaped like the ones ``site`` lists."""
+    if site == "detik":
+        return [f"{base}/kanal-{i}/indeks" for i in range(count)]
+    if site == "cnbcindonesia":
+        return [{"name": f"Kanal {i}", "slug": f"kanal-{i}", "id": str(i)} for i in range(count)]
+    if site == "cnnindonesia":
+        return [{"label": f"kanal-{i}", "id": str(i)} for i in range(count)]
+    return [str(i) for i in range(count)]
+
+
+def _setup(args):
+    from indoscraping.scraper import parsing
+    from indoscraping.scraper.ratelimit import rate_limiter
+
+    logging.disable(logging.ERROR)
+    if args.parser:
+        parsing.set_backend(args.parser)
+    parsing.set_partial(args.partial)
+    rate = args.rate or 1_000_000
+    rate_limiter.configure("127.0.0.1", rate, max(1, int(rate * 2)))
+    if args.adaptive:
+        from indoscraping.scraper.adaptive import AdaptiveLimiter
+        from indoscraping.scraper.client import http_client
+
+        http_client.adaptive = AdaptiveLimiter(initial=args.per_host, maximum=args.max_per_host)
+
+
+def _limit():
+    from indoscraping.scraper.client import http_client
+
+    limits = http_client.adaptive.limits() if http_client.adaptive else {}
+    return max(limits.values()) if limits else None
+
+
+def _result(metrics, records, elapsed):
+    failed = sum(count for (_, _, status), count in metrics.statuses.items()
+                 if status == "error" or status.isdigit() and int(status) >= 400)
+    parses = [histogram for (_, stage), histogram in metrics.parse_cpu.items() if stage == "article"]
+    parsed = sum(histogram.count for histogram in parses)
+    return {
+        "records": records,
+        "seconds": elapsed,
+        "records_per_second": records / elapsed if elapsed else 0.0,
+        "requests": len(metrics.samples),
+        "failed": failed,
+        "retries": sum(metrics.retries.values()),
+        "p50": metrics.percentile(0.5),
+        "p99": metrics.percentile(0.99),
+        "limit": _limit(),
+        "parse_ms": sum(histogram.sum for histogram in parses) / parsed * 1000 if parsed else 0.0,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "workers_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+def crawl_news(name, base, args):
+    """Crawl site ``name`` from the mock at ``base``; runs in a fresh process."""
+    from indoscraping.scraper.engine import CrawlEngine
+    from indoscraping.scraper.scheduler import JobScheduler, build_jobs
+    from indoscraping.scraper.sinks import JsonlSink
+    from indoscraping.scraper.sites import load_site
+
+    _setup(args)
+    site = load_site(name)
+    categories = mock_categories(name, base, args.categories)
+    spec = replace(site, get_categories=lambda: categories,
+                   index_page_url=lambda category, date_str, page: rewrite(
+                       site.index_page_url(category, date_str, page), base))
+    metrics = SampledMetrics()
+    jobs = build_jobs([spec], [DATE])
+    with tempfile.TemporaryDirectory() as tmp, JsonlSink(os.path.join(tmp, "articles.jsonl")) as sink, \
+            CrawlEngine(concurrency=args.concurrency, per_host=args.per_host, parse_workers=args.parse_workers,
+                        index_window=args.index_window, metrics=metrics) as engine:
+        started = time.perf_counter()
+        JobScheduler(engine, jobs=args.jobs, per_site=args.per_site).run(jobs, lambda _: sink)
+        elapsed = time.perf_counter() - started
+    return _result(metrics, metrics.articles.get(name, 0), elapsed)
+
+
+def crawl_retail(name, base, args):
+    """Crawl retailer ``name``'s catalog from the mock at ``base``; runs in a fresh process."""
+    from indoscraping.scraper.retail import catalog
+
+    _setup(args)
+    retailer = importlib.import_module(RETAILERS[name][0])
+    retailer.BASE_URL = rewrite(retailer.BASE_URL, base)
+    catalog.metrics = metrics = SampledMetrics()
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        stats = retailer.main(os.path.join(tmp, "products.jsonl"), workers=args.workers, window=args.window)
+        elapsed = time.perf_counter() - started
+    return _result(metrics, stats["products"], elapsed)
+
+
+def run(target, app, crawl, args):
+    with MockServer(app, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    error_status=args.error_status, seed=args.seed, capacity=args.capacity) as server:
+        # A fresh interpreter per target, so that peak RSS is the target's own
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(crawl, target, server.base, args).result()
+    return {"target": target, "served": server.requests, "injected": server.errors, "peak": server.peak, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sites", nargs="+", default=list(SITES), choices=list(SITES), metavar="SITE",
+                        help="news sites to crawl (default: all)")
+    parser.add_argument("--retail", nargs="+", default=list(RETAILERS), choices=list(RETAILERS),
+                        help="retailers to crawl (default: all)")
+    parser.add_argument("--no-news", action="store_true", help="crawl no news site")
+    parser.add_argument("--no-retail", action="store_true", help="crawl no retailer")
+    parser.add_argument("--categories", type=int, default=4, help="categories per site (default: %(default)s)")
+    parser.add_argument("--pages", type=int, default=5, help="index pages per category (default: %(default)s)")
+    parser.add_argument("--links", type=int, default=20, help="articles per index page (default: %(default)s)")
+    parser.add_argument("--listings", type=int, default=20, help="listings per catalog (default: %(default)s)")
+    parser.add_argument("--listing-pages", type=int, default=3, help="pages per listing (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, default=20, help="products per page (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="up to this many more seconds, at random")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="status of injected errors")
+    parser.add_argument("--capacity", type=int, help="requests in flight a server takes before answering 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--adaptive", action="store_true", help="adaptive per-host concurrency from --per-host")
+    parser.add_argument("--max-per-host", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--per-site", type=int, default=2)
+    parser.add_argument("--index-window", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument("--parser", choices=["lxml", "html.parser", "selectolax"])
+    parser.add_argument("--partial", action="store_true", help="partial article parsing (see parsing.set_partial)")
+    parser.add_argument("--workers", type=int, default=4, help="retail listings fetched at once")
+    parser.add_argument("--window", type=int, default=4, help="retail pages of a listing fetched at once")
+    parser.add_argument("--rate", type=float, help="requests per second per server (default: unlimited)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per target")
+    args = parser.parse_args()
+    if args.no_news:
+        args.sites = []
+    if args.no_retail:
+        args.retail = []
+    if not args.sites and not args.retail:
+        parser.error("--no-news and --no-retail leave nothing to crawl")
+
+    targets = [(site, NewsSite(site, pages=args.pages, links=args.links), crawl_news) for site in args.sites]
+    targets += [(name, RETAILERS[name][1](listings=args.listings, pages=args.listing_pages,
+                                          page_size=args.page_size), crawl_retail) for name in args.retail]
+
+    if not args.json:
+        print(f"{'target':<15}{'records':>8}{'seconds':>9}{'rec/sec':>9}{'requests':>9}{'injected':>9}"
+              f"{'failed':>7}{'retries':>8}{'p50 ms':>8}{'p99 ms':>8}{'peak':>6}{'limit':>7}{'parse ms':>9}{'RSS MB':>8}{'workers':>8}")
+    for target, app, crawl in targets:
+        result = run(target, app, crawl, args)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(f"{target:<15}{result['records']:>8}{result['seconds']:>9.2f}{result['records_per_second']:>9.1f}"
+                  f"{result['requests']:>9}{result['injected']:>9}{result['failed']:>7}{result['retries']:>8}"
+                  f"{result['p50'] * 1000:>8.1f}{result['p99'] * 1000:>8.1f}{result['peak']:>6}"
+                  f"{result['limit'] or 0:>7.1f}{result['parse_ms']:>9.2f}{result['rss_mb']:>8.1f}"
+                  f"{result['workers_rss_mb']:>8.1f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Localhost stand-ins for the news sites and retail APIs, for benchmarks.
+
+``NewsSite`` serves a site's index pages and articles from
+``benchmarks/fixtures/<site>``. ``index.html`` is a ``string.Template``
+with ``$links``, ``$pagination`` and ``$last_page``. ``index-link.html`` is
+the markup of one listed article as the live index pages print it (with
+``$url``, ``$title`` and ``$number``), and every listed article is served as one
+of the saved ``article-*.html`` pages. Any path outside ``/read/`` is an
+index page, with its page number in the ``page`` parameter, so the site
+modules' own ``index_page_url`` works once its host is swapped for the
+server's (``rewrite``).
+
+``IndomaretApi`` and ``AlfagiftApi`` serve the catalog endpoints the
+retail scrapers call, with products generated from the fixture
+``product.json``.
+
+``MockServer`` serves one of them on its own port, so the crawl's per-host
+limits apply per site as they do live. Every response is delayed by
+``latency`` plus up to ``jitter`` seconds, and a share ``error_rate`` of
+requests is answered with ``error_status`` instead. With ``capacity`` the
+server answers 429 to requests beyond that many in flight, like a site
+that pushes back on load.
+"""
+import copy
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+HTML = "text/html; charset=utf-8"
+JSON = "application/json"
+
+
+def rewrite(url, base):
+    """Return ``url`` with its scheme and host replaced by those of ``base``."""
+    parts, server = urlsplit(url), urlsplit(base)
+    return urlunsplit((server.scheme, server.netloc, parts.path, parts.query, ""))
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class NewsSite:
+    """Index pages of ``links`` articles each, ``pages`` pages per listing."""
+
+    def __init__(self, site, fixtures_dir=FIXTURES_DIR, pages=5, links=20):
+        site_dir = os.path.join(fixtures_dir, site)
+        self.site = site
+        self.pages = pages
+        self.links = links
+        self.index = Template(_read(os.path.join(site_dir, "index.html")))
+        self.link = Template(_read(os.path.join(site_dir, "index-link.html")))
+        self.articles = [_read(os.path.join(site_dir, name)).encode("utf-8")
+                         for name in sorted(os.listdir(site_dir)) if name.startswith("article")]
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def _listing(self, path, query):
+        key = (path, tuple(sorted((k, tuple(v)) for k, v in query.items() if k != "page")))
+        with self._lock:
+            return self._listings.setdefault(key, len(self._listings))
+
+    def handle(self, base, path, query):
+        if path.startswith("/read/"):
+            number = int(path.rsplit("-", 1)[1])
+            return 200, HTML, self.articles[number % len(self.articles)]
+        page = int(query.get("page", ["1"])[0])
+        links = []
+        if page <= self.pages:
+            first = self._listing(path, query) * 100_000 + (page - 1) * self.links + 1
+            for number in range(first, first + self.links):
+                links.append(self.link.substitute(url=f"{base}/read/{self.site}/d-{number}/berita-{number}",
+                                                  title=f"Berita {number}", number=number))
+        pagination = "".join(f'<a href="?page={p}">{p}</a>' for p in range(1, self.pages + 1))
+        body = self.index.substitute(links="".join(links), pagination=pagination, last_page=self.pages)
+        return 200, HTML, body.encode("utf-8")
+
+
+class _CatalogApi:
+    """Generated catalog of ``listings`` listings with ``pages`` pages of ``page_size`` products."""
+
+    retailer = None
+    key = None
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, listings=20, pages=3, page_size=20):
+        with open(os.path.join(fixtures_dir, self.retailer, "product.json"), encoding="utf-8") as f:
+            self.product = json.load(f)
+        self.listings = listings
+        self.pages = pages
+        self.page_size = page_size
+
+    def products(self, listing, page):
+        """Return ``page`` (0-based) of ``listing``, empty past the last page."""
+        if page >= self.pages:
+            return []
+        products = []
+        for i in range(self.page_size):
+            number = (listing * self.pages + page) * self.page_size + i
+            product = copy.deepcopy(self.product)
+            product[self.key] = str(10_000_000 + number)
+            product["productName"] = f"{product['productName']} #{number}"
+            products.append(product)
+        return products
+
+
+class IndomaretApi(_CatalogApi):
+    """``/category/meta`` and ``/search/result`` of the Klik Indomaret catalog API."""
+
+    retailer = "indomaret"
+    key = "plu"
+
+    def handle(self, base, path, query):
+        if path.endswith("/category/meta"):
+            metas = {}
+            for listing in range(self.listings):
+                metas.setdefault(listing // 5, []).append({"permalink": f"kategori-{listing}", "subCategories": []})
+            data = [{"permalink": f"meta-{meta}", "categories": categories} for meta, categories in metas.items()]
+            return 200, JSON, json.dumps({"data": data}).encode("utf-8")
+        if path.endswith("/search/result"):
+            listing = int(query["categories"][0].rsplit("-", 1)[1])
+            content = self.products(listing, int(query.get("page", ["0"])[0]))
+            return 200, JSON, json.dumps({"data": {"content": content}}).encode("utf-8")
+        return 404, JSON, b"{}"
+
+
+class AlfagiftApi(_CatalogApi):
+    """``/categories`` and ``/products/category/<id>`` of the Alfagift gateway."""
+
+    retailer = "alfagift"
+    key = "sku"
+
+    def handle(self, base, path, query):
+        if path.endswith("/categories"):
+            categories = {}
+            for listing in range(self.listings):
+                categories.setdefault(listing // 5, []).append({"categoryId": f"sub-{listing}"})
+            data = [{"categoryId": f"cat-{c}", "subCategories": subs} for c, subs in categories.items()]
+            return 200, JSON, json.dumps({"categories": data}).encode("utf-8")
+        if "/products/category/" in path:
+            listing = int(path.rsplit("-", 1)[1])
+            products = self.products(listing, int(query.get("start", ["0"])[0]))
+            return 200, JSON, json.dumps({"products": products, "totalPage": self.pages - 1}).encode("utf-8")
+        return 404, JSON, b"{}"
+
+
+class MockServer:
+    """Serve ``app`` on a localhost port from a background thread.
+
+    Responses are gzipped when the client accepts it, like the live sites'.
+    ``requests`` and ``errors`` count the requests served and the errors
+    injected, including the 429s over ``capacity``, and ``peak`` is the
+    most requests that were in flight at once.
+    """
+
+    def __init__(self, app, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, seed=None, capacity=None):
+        self.app = app
+        self.capacity = capacity
+        self.inflight = 0
+        self.peak = 0
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _roll(self):
+        with self._lock:
+            self.requests += 1
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            if self.capacity and self.inflight > self.capacity:
+                status = 429
+            elif self._random.random() < self.error_rate:
+                status = self.error_status
+            else:
+                status = None
+            self.errors += status is not None
+        return delay, status
+
+    def _done(self):
+        with self._lock:
+            self.inflight -= 1
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; with Nagle on, every
+            # keep-alive response would wait out the client's delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                delay, status = mock._roll()
+                try:
+                    self._respond(delay, status)
+                finally:
+                    mock._done()
+
+            def _respond(self, delay, status):
+                if delay:
+                    time.sleep(delay)
+                if status:
+                    content_type, body = HTML, b"<html>Service Unavailable</html>"
+                else:
+                    parts = urlsplit(self.path)
+                    base = f"http://{self.headers['Host']}"
+                    status, content_type, body = mock.app.handle(base, parts.path, parse_qs(parts.query))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="mock-server", daemon=True).start()
+        return self
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
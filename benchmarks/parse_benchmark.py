@@ -0,0 +1,86 @@
+"""Parse saved article pages with every parser backend and report pages/sec.
+
+Fixtures live in ``benchmarks/fixtures/<site>/*.html`` where ``<site>`` is
+the name of a module in ``indoscraping.scraper.news``. ``article-real.html``
+is a trimmed capture of a live page, with the site chrome around the
+article removed; the numbered ``article-*.html`` pages are synthetic pages
+in the site's article layout, padded like a real page. Each backend's output
+is compared with html.parser's so a port that drifts shows up as a
+mismatch rather than as a speedup. With ``--partial`` every backend is
+also run in partial mode, which must give the same output too.
+
+    python benchmarks/parse_benchmark.py --repeat 20 --partial
+"""
+import argparse
+import importlib
+import logging
+import os
+import time
+
+from indoscraping.scraper import parsing
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Fields that legitimately differ between two parses of the same page.
+VOLATILE_FIELDS = ("scraped_at",)
+
+
+def load_fixtures(fixtures_dir, sites=None):
+    fixtures = {}
+    for site in sorted(os.listdir(fixtures_dir)):
+        site_dir = os.path.join(fixtures_dir, site)
+        if not os.path.isdir(site_dir) or (sites and site not in sites):
+            continue
+        pages = []
+        for name in sorted(os.listdir(site_dir)):
+            if name.startswith("article") and name.endswith(".html"):
+                with open(os.path.join(site_dir, name), encoding="utf-8") as f:
+                    pages.append((f"https://fixtures.local/{site}/{name}", f.read()))
+        if pages:
+            fixtures[site] = pages
+    return fixtures
+
+
+def comparable(article):
+    return {k: v for k, v in article.to_dict().items() if k not in VOLATILE_FIELDS}
+
+
+def bench_site(parse, pages, backend, repeat, reference, partial=False):
+    parsing.set_backend(backend)
+    parsing.set_partial(partial)
+    mismatches = sum(comparable(parse(html, url)) != reference[url] for url, html in pages)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, html in pages:
+            parse(html, url)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--sites", nargs="*", help="Only benchmark these sites")
+    parser.add_argument("--backends", nargs="*", default=parsing.available_backends())
+    parser.add_argument("--repeat", type=int, default=10, help="Parses of each fixture per backend")
+    parser.add_argument("--partial", action="store_true", help="Also benchmark partial parsing")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures, args.sites)
+    logging.disable(logging.WARNING)
+
+    print(f"{'site':<16}{'backend':<22}{'pages/sec':>12}{'mismatches':>12}")
+    for site, pages in fixtures.items():
+        parse = importlib.import_module(f"indoscraping.scraper.news.{site}").SITE.parse_article
+        parsing.set_backend("html.parser")
+        parsing.set_partial(False)
+        reference = {url: comparable(parse(html, url)) for url, html in pages}
+        for backend in args.backends:
+            for partial in (False, True) if args.partial else (False,):
+                rate, mismatches = bench_site(parse, pages, backend, args.repeat, reference, partial)
+                name = f"{backend}{' partial' if partial else ''}"
+                print(f"{site:<16}{name:<22}{rate:>12.1f}{mismatches:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,4 @@
-def main() -> None:
-    print("Hello from indoscraping!")
+def main() -> int:
+    from indoscraping.cli import main as cli_main
+
+    return cli_main()
@@ -0,0 +1,650 @@
+"""Command line interface of the ``indoscraping`` console script.
+
+``indoscraping crawl`` crawls any combination of news sites, categories
+and dates in one run::
+
+    indoscraping crawl --sites detik kompas --from 2025-07-01 --to 2025-07-31 \
+        --output "articles/{site}.jsonl" --frontier crawl.sqlite
+
+The same selection can be spread over several machines: ``indoscraping
+coordinator --queue URL ...`` puts it on a shared work queue and any
+number of ``indoscraping worker --queue URL`` processes crawl it.
+
+``indoscraping retail indomaret`` and ``indoscraping retail alfagift``
+scrape the product catalogs, ``indoscraping history`` tracks their price
+changes between snapshots, and ``indoscraping load`` upserts JSON or
+JSONL output into PostgreSQL or SQLite. ``indoscraping index`` and
+``indoscraping search`` maintain and query a local full-text index.
+
+Crawls and retail scrapes end with a summary of their metrics (request
+latencies, bytes, statuses, retries, parse time and articles per second
+by site and stage); ``--metrics-port`` also serves them to Prometheus
+while the run lasts.
+
+``indoscraping sites`` lists the known sites and ``indoscraping
+categories SITE`` the category names ``--categories`` accepts for one.
+"""
+import argparse
+import importlib
+import json
+import logging
+import sys
+from datetime import date, timedelta
+
+from indoscraping.scraper.sites import SITES, category_names, load_site
+
+logger = logging.getLogger(__name__)
+
+RETAILERS = {
+    "indomaret": "indoscraping.scraper.retail.indomaret",
+    "alfagift": "indoscraping.scraper.retail.alfagift",
+}
+RETAIL_OUTPUTS = {
+    "indomaret": "klikindomaret_products.jsonl",
+    "alfagift": "alfagift_products.jsonl",
+}
+
+
+def parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got {value!r}") from None
+
+
+def date_range(start, end):
+    """Return the dates from ``start`` to ``end``, both included."""
+    if end < start:
+        raise ValueError(f"--to {end} is before --from {start}")
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class SiteSinks:
+    """Open one sink per distinct output path, on first use.
+
+    ``path`` may contain ``{site}`` to give every site its own file. With
+    ``format="parquet"`` it is the root directory of a Parquet dataset
+    partitioned by site and date. Articles are also written to the sinks in
+    ``also``, such as a search index, which the caller closes.
+    """
+
+    def __init__(self, path, append=False, format="jsonl", also=()):
+        self.path = path
+        self.append = append
+        self.format = format
+        self.also = tuple(also)
+        self._sinks = {}
+
+    def __call__(self, site):
+        path = self.path.format(site=site.name)
+        if path not in self._sinks:
+            if self.format == "parquet":
+                from indoscraping.scraper.parquet import ParquetSink
+                self._sinks[path] = ParquetSink(path)
+            else:
+                from indoscraping.scraper.sinks import JsonlSink
+                self._sinks[path] = JsonlSink(path, append=self.append)
+        if self.also:
+            from indoscraping.scraper.sinks import TeeSink
+            return TeeSink(self._sinks[path], *self.also)
+        return self._sinks[path]
+
+    def close(self):
+        for sink in self._sinks.values():
+            sink.close()
+
+
+def configure_client(args):
+    from indoscraping.scraper.cache import HttpCache
+    from indoscraping.scraper.client import http_client
+
+    if args.parser:
+        from indoscraping.scraper.parsing import set_backend
+        set_backend(args.parser)
+    if args.partial:
+        from indoscraping.scraper.parsing import set_partial
+        set_partial(True)
+    if args.cache_dir or args.offline:
+        http_client.cache = HttpCache(args.cache_dir or ".http_cache", ttl=args.cache_ttl, offline=args.offline)
+    if args.adaptive:
+        configure_adaptive(args.per_host, args.max_per_host)
+
+
+def configure_adaptive(initial, maximum):
+    from indoscraping.scraper.adaptive import AdaptiveLimiter
+    from indoscraping.scraper.client import http_client
+
+    http_client.adaptive = AdaptiveLimiter(initial=initial, maximum=maximum)
+
+
+def print_summary(metrics):
+    from indoscraping.scraper.client import http_client
+
+    print(metrics.summary())
+    if http_client.adaptive:
+        limits = http_client.adaptive.limits()
+        print("adaptive concurrency: " + ", ".join(f"{host}={limit:.1f}" for host, limit in sorted(limits.items())))
+
+
+def start_metrics(args):
+    from indoscraping.scraper.metrics import metrics
+
+    metrics.reset()
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port, host=args.metrics_host)
+    return metrics
+
+
+def open_search_index(args):
+    from indoscraping.scraper.search import SearchIndex
+
+    return SearchIndex(args.search_index) if getattr(args, "search_index", None) else None
+
+
+def open_dedup(args):
+    from indoscraping.scraper.dedup import DedupIndex
+
+    return DedupIndex(args.dedup, max_distance=args.near_duplicate_bits) if args.dedup else None
+
+
+def make_engine(args, frontier=None, dedup=None):
+    from indoscraping.scraper.engine import CrawlEngine
+
+    return CrawlEngine(
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        max_index_pages=args.max_index_pages,
+        parse_workers=args.parse_workers,
+        frontier=frontier,
+        incremental=getattr(args, "incremental", False),
+        dedup=dedup,
+    )
+
+
+def selected_jobs(args):
+    from indoscraping.scraper.scheduler import build_jobs
+
+    dates = args.date or date_range(args.date_from or date.today(), args.date_to or args.date_from or date.today())
+    sites = [load_site(name) for name in args.sites]
+    jobs = build_jobs(sites, dates, args.categories)
+    logger.info(f"Scheduled {len(jobs)} jobs over {len(sites)} sites and {len(dates)} dates")
+    return jobs
+
+
+def crawl(args):
+    from indoscraping.scraper.frontier import Frontier
+    from indoscraping.scraper.scheduler import JobScheduler
+
+    configure_client(args)
+    jobs = selected_jobs(args)
+    metrics = start_metrics(args)
+    frontier = Frontier(args.frontier) if args.frontier else None
+    dedup = open_dedup(args)
+    search_index = open_search_index(args)
+    sinks = SiteSinks(args.output, append=bool(frontier), format=args.format, also=filter(None, [search_index]))
+    engine = make_engine(args, frontier, dedup)
+    try:
+        stats = JobScheduler(engine, jobs=args.jobs, per_site=args.per_site).run(jobs, sinks)
+    finally:
+        engine.close()
+        sinks.close()
+        if frontier:
+            frontier.close()
+        if dedup:
+            dedup.close()
+        if search_index:
+            search_index.close()
+
+    failed = 0
+    for name, site_stats in stats.items():
+        failed += site_stats["failed"]
+        print(f"{name}: {site_stats['articles']} articles from {site_stats['jobs']} jobs "
+              f"({site_stats['failed']} failed)")
+    print_summary(metrics)
+    return 1 if failed else 0
+
+
+def open_work_queue(args):
+    from indoscraping.scraper.distributed import open_queue
+
+    return open_queue(args.queue, lease_timeout=args.lease_timeout, max_attempts=args.max_attempts)
+
+
+def coordinate(args):
+    import time
+
+    from indoscraping.scraper.distributed import enqueue_jobs
+
+    queue = open_work_queue(args)
+    try:
+        added = enqueue_jobs(queue, selected_jobs(args))
+        print(f"Enqueued {added} new units on {args.queue}")
+        while args.watch:
+            counts = queue.counts()
+            print(" ".join(f"{state}={count}" for state, count in counts.items()), flush=True)
+            if queue.remaining() == 0:
+                break
+            time.sleep(args.watch)
+    finally:
+        queue.close()
+    return 0
+
+
+def work(args):
+    from indoscraping.scraper.distributed import Worker
+
+    configure_client(args)
+    queue = open_work_queue(args)
+    metrics = start_metrics(args)
+    dedup = open_dedup(args)
+    search_index = open_search_index(args)
+    sinks = SiteSinks(args.output, append=True, format=args.format, also=filter(None, [search_index]))
+    engine = make_engine(args, dedup=dedup)
+    try:
+        stats = Worker(queue, engine, sinks, units=args.units, poll_interval=args.poll_interval,
+                       wait=args.wait).run()
+    finally:
+        engine.close()
+        sinks.close()
+        queue.close()
+        if dedup:
+            dedup.close()
+        if search_index:
+            search_index.close()
+    print(f"{stats['articles']} articles from {stats['units']} units ({stats['failed']} failed)")
+    print_summary(metrics)
+    return 1 if stats["failed"] else 0
+
+
+def to_parquet(args):
+    from indoscraping.scraper.parquet import convert
+
+    fields = dict(item.split("=", 1) for item in args.set or [])
+    count = convert(args.inputs, args.output, site=args.site, date=args.date, partition_by=args.partition_by, fields=fields,
+                    row_group_size=args.row_group_size)
+    print(f"Wrote {count} records to {args.output}")
+    return 0
+
+
+def load(args):
+    from indoscraping.scraper.loader import load_articles, open_loader
+    from indoscraping.scraper.sinks import read_records
+
+    with open_loader(args.database) as loader:
+        for path in args.inputs:
+            records = read_records(path)
+            if args.site:
+                stats = load_articles(loader, records, table=args.table or "articles", site=args.site,
+                                      chunk_size=args.chunk_size)
+            else:
+                stats = loader.load(args.table, records, key=args.key, chunk_size=args.chunk_size,
+                                    exclude=args.exclude or ())
+            print(f"{path}: {stats['written']} of {stats['records']} records written")
+    return 0
+
+
+def scrape_retail(args):
+    from urllib.parse import urlparse
+
+    from indoscraping.scraper.ratelimit import rate_limiter
+    from indoscraping.scraper.sinks import read_records
+
+    retailer = importlib.import_module(RETAILERS[args.retailer])
+    if args.rate:
+        rate_limiter.configure(urlparse(retailer.BASE_URL).hostname, args.rate, max(1, int(args.rate * 2)))
+    if args.adaptive:
+        configure_adaptive(args.workers, args.workers * args.window)
+    metrics = start_metrics(args)
+    if args.stores:
+        return scrape_store_matrix(args, retailer, list(read_records(args.stores)), metrics)
+    output = args.output or (f"{args.retailer}/" if args.format == "parquet" else RETAIL_OUTPUTS[args.retailer])
+    stats = retailer.main(output, format=args.format, workers=args.workers, window=args.window)
+    print(f"{stats['products']} products from {stats['listings']} listings ({stats['failed']} failed)")
+    print_summary(metrics)
+    if args.history:
+        # A partial snapshot would mark the products of failed listings unlisted
+        record_history(args.history, read_records(output), key=retailer.KEY, store=retailer.STORE,
+                       complete=not stats["failed"])
+    return 1 if stats["failed"] else 0
+
+
+def scrape_narasi(args):
+    from urllib.parse import urlparse
+
+    from indoscraping.scraper.news import narasi
+    from indoscraping.scraper.ratelimit import rate_limiter
+
+    if args.rate:
+        rate_limiter.configure(urlparse(narasi.API_URL).hostname, args.rate, max(1, int(args.rate * 2)))
+    metrics = start_metrics(args)
+    count = narasi.main(args.output, since=args.since, full=args.full, window=args.window,
+                        max_pages=args.max_pages)
+    print(f"{count} new articles written to {args.output}")
+    print_summary(metrics)
+    return 0
+
+
+def scrape_store_matrix(args, retailer, stores, metrics):
+    import os
+
+    from indoscraping.scraper.retail.catalog import merge_offers, open_sink
+    from indoscraping.scraper.sinks import read_records
+
+    root = args.output or args.retailer
+    if args.format == "parquet":
+        products_path, offers_path = os.path.join(root, "products"), os.path.join(root, "offers")
+    else:
+        products_path, offers_path = os.path.join(root, "products.jsonl"), os.path.join(root, "offers.jsonl")
+    with open_sink(products_path, args.format, partition_by=retailer.PARTITIONS) as products, \
+            open_sink(offers_path, args.format, partition_by=("store",)) as offers:
+        stats = retailer.scrape_stores(stores, products, offers, workers=args.workers, window=args.window)
+    failed = 0
+    for store, store_stats in stats.items():
+        failed += store_stats["failed"]
+        print(f"{store}: {store_stats['products']} products ({store_stats['failed']} listings failed)")
+    print(f"{products.count} distinct products, {offers.count} offers")
+    print_summary(metrics)
+    if args.history:
+        if args.format == "parquet":
+            logger.warning("--history needs --format jsonl, not recording the snapshot")
+        else:
+            records = merge_offers(read_records(products_path), read_records(offers_path), retailer.KEY)
+            record_history(args.history, records, key=retailer.KEY, complete=not failed, store_field="store")
+    return 1 if failed else 0
+
+
+def record_history(path, records, key, store=None, at=None, complete=True, store_field="storeCode"):
+    from indoscraping.scraper.retail.history import PriceHistory
+
+    with PriceHistory(path) as history:
+        stats = history.record(records, key=key, store=store, at=at, complete=complete, store_field=store_field)
+    print(f"{stats['changed']} of {stats['products']} products changed ({stats['changes']} field changes)")
+    return stats
+
+
+def history(args):
+    from indoscraping.scraper.retail.history import PriceHistory
+
+    if args.action == "record":
+        from itertools import chain
+
+        from indoscraping.scraper.sinks import read_records
+
+        records = chain.from_iterable(read_records(path) for path in args.inputs)
+        record_history(args.db, records, key=args.key, store=args.store, at=args.at, complete=not args.partial)
+        return 0
+    with PriceHistory(args.db) as price_history:
+        if args.action == "price":
+            if args.sku:
+                stores = [args.store] if args.store is not None else price_history.stores(args.sku)
+                for store in stores:
+                    values = (price_history.state_at(args.sku, args.at, store=store) if args.field == "*" else
+                              {args.field: price_history.price_at(args.sku, args.at, store=store, field=args.field)})
+                    print(json.dumps({"sku": args.sku, "store": store, **values}, ensure_ascii=False))
+            else:
+                for (sku, store), value in price_history.prices_at(args.at, store=args.store, field=args.field).items():
+                    print(json.dumps({"sku": sku, "store": store, args.field: value}, ensure_ascii=False))
+        else:
+            for change in price_history.changes_since(args.since, field=args.field, store=args.store):
+                print(json.dumps(change, ensure_ascii=False))
+    return 0
+
+
+def index_articles(args):
+    from indoscraping.scraper.models import Article
+    from indoscraping.scraper.search import SearchIndex
+    from indoscraping.scraper.sinks import read_records
+
+    with SearchIndex(args.index) as index:
+        for path in args.inputs:
+            before = index.count
+            for record in read_records(path):
+                index.write(Article.from_dict(record, site=args.site or ""))
+            print(f"{path}: indexed {index.count - before} articles")
+        if args.optimize:
+            index.optimize()
+    return 0
+
+
+def search(args):
+    from indoscraping.scraper.search import SearchIndex
+
+    with SearchIndex(args.index) as index:
+        results = index.search(" ".join(args.query), site=args.site, date_from=args.date_from, date_to=args.date_to,
+                               tag=args.tag, author=args.author, limit=args.limit, any_term=args.any)
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        else:
+            print(f"{result['date']} [{result['site']}] {result['title']}\n    {result['url']}")
+    return 0
+
+
+def list_sites(args):
+    for name in SITES:
+        print(name)
+    return 0
+
+
+def list_categories(args):
+    for category in load_site(args.site).get_categories():
+        print(" | ".join(category_names(category)))
+    return 0
+
+
+def add_selection_args(p):
+    p.add_argument("--sites", nargs="+", default=list(SITES), choices=list(SITES), metavar="SITE",
+                   help="sites to crawl (default: all)")
+    p.add_argument("--categories", nargs="+", metavar="NAME",
+                   help="only crawl these categories (see the categories command)")
+    p.add_argument("--date", nargs="+", type=parse_date, metavar="YYYY-MM-DD", help="dates to crawl")
+    p.add_argument("--from", dest="date_from", type=parse_date, metavar="YYYY-MM-DD",
+                   help="first date of a range (default: today)")
+    p.add_argument("--to", dest="date_to", type=parse_date, metavar="YYYY-MM-DD",
+                   help="last date of a range (default: --from)")
+
+
+def add_engine_args(p):
+    p.add_argument("--concurrency", type=int, default=32, help="requests in flight (default: %(default)s)")
+    p.add_argument("--per-host", type=int, default=4,
+                   help="requests in flight per host, or the starting point with --adaptive (default: %(default)s)")
+    p.add_argument("--adaptive", action="store_true",
+                   help="raise and lower each host's requests in flight with its latency and errors")
+    p.add_argument("--max-per-host", type=int, default=16,
+                   help="most requests in flight per host with --adaptive (default: %(default)s)")
+    p.add_argument("--max-index-pages", type=int, help="index pages walked per job")
+    p.add_argument("--parse-workers", type=int, default=0, help="parser processes (default: parse in-process)")
+    p.add_argument("--parser", choices=["lxml", "html.parser", "selectolax"], help="HTML parser backend")
+    p.add_argument("--partial", action="store_true",
+                   help="read and parse only the part of each article page that holds the article")
+    p.add_argument("--cache-dir", help="HTTP cache directory for category and index pages")
+    p.add_argument("--cache-ttl", type=int, default=600, help="seconds a cached page is fresh (default: %(default)s)")
+    p.add_argument("--offline", action="store_true", help="only serve pages from the HTTP cache")
+    p.add_argument("--dedup", metavar="DB", help="SQLite index that skips already scraped articles and flags "
+                                                 "duplicate content")
+    p.add_argument("--near-duplicate-bits", type=int, default=3,
+                   help="SimHash bits two near-duplicates may differ in (default: %(default)s)")
+    add_metrics_args(p)
+
+
+def add_metrics_args(p):
+    p.add_argument("--metrics-port", type=int, metavar="PORT",
+                   help="serve Prometheus metrics on this port while running")
+    p.add_argument("--metrics-host", default="127.0.0.1",
+                   help="address the metrics are served on (default: %(default)s)")
+
+
+def add_queue_args(p):
+    p.add_argument("--queue", required=True,
+                   help="work queue: an SQLite path or a redis://host:port/db URL")
+    p.add_argument("--lease-timeout", type=float, default=300,
+                   help="seconds before an unextended lease is handed to another worker (default: %(default)s)")
+    p.add_argument("--max-attempts", type=int, default=3,
+                   help="leases of a unit before it is set aside (default: %(default)s)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="indoscraping", description="Scrape Indonesian news sites.")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("crawl", help="crawl sites, categories and dates")
+    add_selection_args(p)
+    p.add_argument("-o", "--output", default="articles.jsonl",
+                   help="output file, or dataset directory with --format parquet; {site} is replaced "
+                        "by the site name (default: %(default)s)")
+    p.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl",
+                   help="jsonl, or a Parquet dataset partitioned by site and date (default: %(default)s)")
+    p.add_argument("--jobs", type=int, default=8, help="jobs running at once (default: %(default)s)")
+    p.add_argument("--per-site", type=int, default=2, help="jobs running at once per site (default: %(default)s)")
+    add_engine_args(p)
+    p.add_argument("--search-index", metavar="DB", help="also index the articles in this SQLite search index")
+    p.add_argument("--frontier", help="SQLite frontier that makes the crawl resumable")
+    p.add_argument("--incremental", action="store_true", help="stop at already known articles (needs --frontier)")
+    p.set_defaults(func=crawl)
+
+    p = commands.add_parser("coordinator", help="put a crawl on a shared work queue")
+    add_selection_args(p)
+    add_queue_args(p)
+    p.add_argument("--watch", type=float, metavar="SECONDS", help="print progress until the queue is drained")
+    p.set_defaults(func=coordinate)
+
+    p = commands.add_parser("worker", help="crawl units leased from a shared work queue")
+    add_queue_args(p)
+    p.add_argument("-o", "--output", default="articles.jsonl",
+                   help="output file, or dataset directory with --format parquet; {site} is replaced "
+                        "by the site name (default: %(default)s)")
+    p.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl",
+                   help="jsonl, or a Parquet dataset partitioned by site and date (default: %(default)s)")
+    p.add_argument("--units", type=int, default=4, help="units worked on at once (default: %(default)s)")
+    p.add_argument("--poll-interval", type=float, default=5, help="seconds between polls of an empty queue")
+    p.add_argument("--wait", action="store_true", help="keep polling after the queue is drained")
+    p.add_argument("--search-index", metavar="DB", help="also index the articles in this SQLite search index")
+    add_engine_args(p)
+    p.set_defaults(func=work)
+
+    p = commands.add_parser("to-parquet", help="convert JSON or JSONL output into a Parquet dataset")
+    p.add_argument("inputs", nargs="+", help="JSON or JSONL files")
+    p.add_argument("-o", "--output", required=True, help="dataset directory")
+    p.add_argument("--site", help="read the records as articles of this site, partitioned by site and date")
+    p.add_argument("--date", metavar="YYYY-MM-DD", help="index date of articles that do not record one")
+    p.add_argument("--partition-by", nargs="+", metavar="FIELD", help="partition columns (e.g. retailer categories)")
+    p.add_argument("--set", nargs="+", metavar="FIELD=VALUE", help="constant fields added to every record")
+    p.add_argument("--row-group-size", type=int, default=10_000, help="rows per row group (default: %(default)s)")
+    p.set_defaults(func=to_parquet)
+
+    p = commands.add_parser("retail", help="scrape a retailer's product catalog")
+    p.add_argument("retailer", choices=list(RETAILERS))
+    p.add_argument("-o", "--output", help="output file, or dataset directory with --format parquet "
+                                          "(default: klikindomaret_products.jsonl, alfagift_products.jsonl)")
+    p.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl",
+                   help="jsonl, or a Parquet dataset partitioned by retailer and category (default: %(default)s)")
+    p.add_argument("--workers", type=int, default=4, help="listings fetched at once (default: %(default)s)")
+    p.add_argument("--window", type=int, default=4, help="pages of a listing fetched at once (default: %(default)s)")
+    p.add_argument("--rate", type=float, help="requests per second to the catalog API (default: 5)")
+    p.add_argument("--adaptive", action="store_true",
+                   help="adjust requests in flight to the API's latency and errors, from --workers up to "
+                        "--workers x --window")
+    p.add_argument("--stores", metavar="FILE",
+                   help="JSON or JSONL list of store configs to crawl at once; writes products and per-store "
+                        "offers under --output")
+    p.add_argument("--history", metavar="DB", help="record the snapshot's changes in this SQLite price history")
+    add_metrics_args(p)
+    p.set_defaults(func=scrape_retail)
+
+    p = commands.add_parser("narasi", help="append new Narasi articles from its API feed")
+    p.add_argument("-o", "--output", default="narasi_articles.jsonl", help="JSONL file (default: %(default)s)")
+    p.add_argument("--since", help="only articles published after this date or time "
+                                   "(default: the newest one in --output)")
+    p.add_argument("--full", action="store_true", help="page through the whole feed")
+    p.add_argument("--window", type=int, default=4, help="pages fetched at once (default: %(default)s)")
+    p.add_argument("--max-pages", type=int, help="pages fetched at most")
+    p.add_argument("--rate", type=float, help="requests per second to the API (default: the shared per-host limit)")
+    add_metrics_args(p)
+    p.set_defaults(func=scrape_narasi)
+
+    p = commands.add_parser("history", help="record and query the price history of retail catalogs")
+    actions = p.add_subparsers(dest="action", required=True)
+    a = actions.add_parser("record", help="append the changes of catalog snapshots")
+    a.add_argument("inputs", nargs="+", help="JSON or JSONL catalog snapshots")
+    a.add_argument("--key", required=True, help="product key field (plu for Indomaret, sku for Alfagift)")
+    a.add_argument("--at", help="snapshot time, ISO 8601 (default: now)")
+    a.add_argument("--partial", action="store_true", help="do not mark products missing from the snapshot unlisted")
+    a = actions.add_parser("price", help="print prices (or another field) at a point in time")
+    a.add_argument("sku", nargs="?", help="one product (default: the whole catalog)")
+    a.add_argument("--at", required=True, help="point in time, ISO 8601")
+    a.add_argument("--field", default="price", help="field to print, * for all of a product's (default: price)")
+    a = actions.add_parser("changes", help="print the changes after a point in time")
+    a.add_argument("--since", required=True, help="point in time, ISO 8601")
+    a.add_argument("--field", help="only changes of this field")
+    for a in actions.choices.values():
+        a.add_argument("--db", required=True, help="SQLite price history")
+        a.add_argument("--store", help="store code (default: every store; when recording, the storeCode of each product)")
+    p.set_defaults(func=history)
+
+    p = commands.add_parser("load", help="upsert JSON or JSONL output into PostgreSQL or SQLite")
+    p.add_argument("inputs", nargs="+", help="JSON or JSONL files")
+    p.add_argument("--database", required=True, help="a postgresql:// URL or an SQLite path")
+    p.add_argument("--site", help="load the records as articles of this site, keyed by URL")
+    p.add_argument("--table", help="table name (default: articles with --site)")
+    p.add_argument("--key", nargs="+", metavar="FIELD", help="key column(s) of other records (e.g. plu)")
+    p.add_argument("--exclude", nargs="+", metavar="FIELD", help="fields that are not loaded")
+    p.add_argument("--chunk-size", type=int, default=5000, help="records per batch (default: %(default)s)")
+    p.set_defaults(func=load)
+
+    p = commands.add_parser("index", help="add JSON or JSONL articles to a search index")
+    p.add_argument("inputs", nargs="+", help="JSON or JSONL files")
+    p.add_argument("--index", required=True, help="SQLite search index")
+    p.add_argument("--site", help="site of records that do not name one")
+    p.add_argument("--optimize", action="store_true", help="merge the index afterwards, e.g. after a backfill")
+    p.set_defaults(func=index_articles)
+
+    p = commands.add_parser("search", help="search the articles in a search index")
+    p.add_argument("query", nargs="+")
+    p.add_argument("--index", required=True, help="SQLite search index")
+    p.add_argument("--site", choices=list(SITES))
+    p.add_argument("--from", dest="date_from", type=parse_date, metavar="YYYY-MM-DD")
+    p.add_argument("--to", dest="date_to", type=parse_date, metavar="YYYY-MM-DD")
+    p.add_argument("--tag")
+    p.add_argument("--author")
+    p.add_argument("--any", action="store_true", help="match articles with any of the words, not all")
+    p.add_argument("--limit", type=int, default=20, help="results (default: %(default)s)")
+    p.add_argument("--json", action="store_true", help="print one JSON object per result")
+    p.set_defaults(func=search)
+
+    p = commands.add_parser("sites", help="list the known sites")
+    p.set_defaults(func=list_sites)
+
+    p = commands.add_parser("categories", help="list the categories of a site")
+    p.add_argument("site", choices=list(SITES))
+    p.set_defaults(func=list_categories)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "incremental", False) and not args.frontier:
+        parser.error("--incremental needs --frontier")
+    if getattr(args, "date", None) and (args.date_from or args.date_to):
+        parser.error("--date cannot be combined with --from/--to")
+    if args.command == "load" and not args.site and not (args.table and args.key):
+        parser.error("load needs --site, or --table and --key")
+    if getattr(args, "date_to", None):
+        # Without --from a crawl starts today, while a search has no lower bound
+        start = args.date_from or (date.today() if hasattr(args, "categories") else None)
+        if start and args.date_to < start:
+            parser.error(f"--to {args.date_to} is before --from {start}" if args.date_from
+                         else f"--to {args.date_to} is before today, the default --from")
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+    )
+    for name in ("requests", "urllib3"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Adaptive per-host concurrency (AIMD).
+
+Instead of a fixed number of requests in flight per host, each host gets
+an ``AimdLimit`` that is steered by the responses it gets back:
+
+- while requests succeed and their latency stays near the host's
+  baseline (the lowest latency recently seen), and the limit is actually
+  being used, it grows by one request per window of ``limit`` responses
+  (additive increase);
+- a 429 or 5xx response (including ones retried into a success), a
+  timeout, a refused connection or a reported bad response such as an
+  HTML page instead of JSON cuts it by ``backoff`` (multiplicative
+  decrease), at most once per round trip so that one burst of failures
+  counts once;
+- latency above ``latency_tolerance`` times the baseline stops the
+  growth and trims the limit slightly, since the server is queueing.
+
+Every host thus settles just below the concurrency at which it starts to
+push back, and follows it when that changes. The per-host token buckets of
+``rate_limiter`` still cap the request rate on top of this.
+
+A ``HttpClient`` with an ``AdaptiveLimiter`` gates its requests through
+it; the crawl engine waits for a slot on its event loop instead::
+
+    http_client.adaptive = AdaptiveLimiter(initial=4, maximum=16)
+"""
+import asyncio
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Share of the gap by which the latency baseline drifts up per response,
+# so that it follows a host that has become slower for good
+BASELINE_DRIFT = 0.01
+# Decrease applied when latency alone signals congestion
+LATENCY_BACKOFF = 0.9
+# Seconds of latency above the tolerated multiple that are still ignored,
+# so that jitter on very fast hosts does not read as congestion
+LATENCY_SLACK = 0.05
+
+
+class AimdLimit:
+    """Concurrency limit of one host, usable from threads and from asyncio tasks."""
+
+    def __init__(self, host, initial=4, minimum=1, maximum=32, backoff=0.5, latency_tolerance=2.0):
+        self.host = host
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.inflight = 0
+        self.baseline = None
+        self.rtt = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []
+
+    def _try_acquire(self):
+        if self.inflight < int(self.limit):
+            self.inflight += 1
+            return True
+        return False
+
+    def _wake(self):
+        self._cond.notify_all()
+        for loop, future in self._waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        self._waiters = []
+
+    def acquire(self):
+        """Block until a request may start."""
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may start."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._wake()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def observe(self, seconds, throttled=False):
+        """Adjust the limit to one response that took ``seconds``, or to a failure."""
+        with self._cond:
+            now = time.monotonic()
+            if not throttled:
+                if self.baseline is None or seconds < self.baseline:
+                    self.baseline = seconds
+                else:
+                    self.baseline += (seconds - self.baseline) * BASELINE_DRIFT
+                self.rtt = seconds if not self.rtt else self.rtt * 0.9 + seconds * 0.1
+            if throttled or seconds > self.latency_tolerance * self.baseline + LATENCY_SLACK:
+                # One decrease per round trip: the other requests of the same
+                # burst were sent before the last one took effect
+                if now - self._last_decrease < self.rtt:
+                    return
+                self._last_decrease = now
+                before = self.limit
+                self.limit = max(self.minimum, self.limit * (self.backoff if throttled else LATENCY_BACKOFF))
+                logger.debug(f"{self.host}: concurrency {before:.1f} -> {self.limit:.1f} "
+                             f"({'throttled' if throttled else f'latency {seconds:.2f}s'})")
+            elif self.inflight >= int(self.limit):
+                # Only grow a limit that is in use; an idle one proves nothing
+                before = int(self.limit)
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                if int(self.limit) > before:
+                    self._wake()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveLimiter:
+    """Keep one ``AimdLimit`` per host, created with the given settings."""
+
+    def __init__(self, initial=4, minimum=1, maximum=32, backoff=0.5, latency_tolerance=2.0):
+        self.settings = {"initial": initial, "minimum": minimum, "maximum": maximum, "backoff": backoff,
+                         "latency_tolerance": latency_tolerance}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, url):
+        """Return the limit of ``url``'s host."""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = AimdLimit(host, **self.settings)
+            return self._limits[host]
+
+    def penalize(self, url):
+        """Back off ``url``'s host after a response that looked fine to HTTP but was not."""
+        self.limit_for(url).observe(0.0, throttled=True)
+
+    def limits(self):
+        """Return the current limit of every host seen."""
+        with self._lock:
+            return {host: limit.limit for host, limit in self._limits.items()}
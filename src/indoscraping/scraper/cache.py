@@ -0,0 +1,217 @@
+"""Content-addressed on-disk HTTP cache.
+
+Response bodies are stored once per SHA-256 digest under ``objects/`` and
+an SQLite index maps each URL to its body, ``ETag`` and ``Last-Modified``.
+Entries younger than ``ttl`` are served without a request; older ones are
+revalidated with ``If-None-Match``/``If-Modified-Since`` so an unchanged
+page costs a 304 instead of a full download. Entries not refreshed for
+``max_age`` are evicted, and the least recently used ones go when the
+bodies exceed ``max_bytes``.
+
+In ``offline`` mode every cached entry is served regardless of age and a
+miss raises ``CacheMiss``, which lets parsers be developed against
+recorded HTML.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES objects (digest),
+    headers TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+# Response headers kept with a cached body.
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class CacheMiss(requests.RequestException):
+    """Raised in offline mode for a URL that is not in the cache."""
+
+
+class HttpCache:
+    """On-disk HTTP cache shared by the threads of a crawl."""
+
+    def __init__(self, root, ttl=600, max_age=7 * 24 * 3600, max_bytes=1 << 30, offline=False):
+        self.root = root
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.offline = offline
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._stores = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _entry(self, url):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT digest, headers, etag, last_modified, fetched_at FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _response(self, url, entry):
+        digest, headers = entry[0], json.loads(entry[1])
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            # The body was removed behind the index's back: drop the entry
+            # so that the URL is fetched afresh rather than revalidated
+            logger.warning(f"Cached body of {url} is missing, dropping the entry")
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM entries WHERE url = ? AND digest = ?", (url, digest))
+                self._conn.execute("DELETE FROM objects WHERE digest = ? AND NOT EXISTS "
+                                   "(SELECT 1 FROM entries WHERE digest = ?)", (digest, digest))
+            return None
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+        resp._content = body
+        resp.from_cache = True
+        return resp
+
+    def fresh_response(self, url):
+        """Return the cached response for ``url`` if it can be used without a request."""
+        entry = self._entry(url)
+        if entry is None:
+            if self.offline:
+                raise CacheMiss(f"{url} is not in the cache")
+            return None
+        if self.offline or time.time() - entry[4] < self.ttl:
+            resp = self._response(url, entry)
+            if resp is None and self.offline:
+                raise CacheMiss(f"The cached body of {url} is missing")
+            return resp
+        return None
+
+    def validators(self, url):
+        """Return the conditional request headers for a stale cached ``url``."""
+        entry = self._entry(url)
+        headers = {}
+        if entry and entry[2]:
+            headers["If-None-Match"] = entry[2]
+        if entry and entry[3]:
+            headers["If-Modified-Since"] = entry[3]
+        return headers
+
+    def update(self, url, resp):
+        """Store a 200 response, or turn a 304 into the cached response.
+
+        Returns the response the caller should use, or ``None`` for a 304
+        whose entry is gone or whose body is missing; the stale entry is
+        dropped and the caller has to fetch ``url`` again unconditionally.
+        """
+        if resp.status_code == 304:
+            entry = self._entry(url)
+            if entry is None:
+                return None
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            return self._response(url, entry)
+        if resp.status_code == 200:
+            self._store(url, resp)
+        return resp
+
+    def _store(self, url, resp):
+        body = resp.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        headers = {name: resp.headers[name] for name in STORED_HEADERS if name in resp.headers}
+        now = time.time()
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT digest FROM entries WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("INSERT OR IGNORE INTO objects (digest, size) VALUES (?, ?)", (digest, len(body)))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (url, digest, headers, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, json.dumps(headers), resp.headers.get("ETag"), resp.headers.get("Last-Modified"), now, now),
+            )
+            if old and old[0] != digest:
+                self._drop_orphan(old[0])
+            self._stores += 1
+            check = self._stores % 100 == 0
+        if check:
+            self.evict()
+
+    def _drop_orphan(self, digest):
+        """Delete a body no entry refers to any more. Call with the lock held."""
+        if self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        self._conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under ``max_bytes``."""
+        with self._lock, self._conn:
+            expired = self._conn.execute(
+                "SELECT url, digest FROM entries WHERE fetched_at < ?", (time.time() - self.max_age,)
+            ).fetchall()
+            for url, digest in expired:
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._drop_orphan(digest)
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            if total <= self.max_bytes:
+                return len(expired)
+            evicted = len(expired)
+            target = self.max_bytes * 0.9
+            for url, digest in self._conn.execute(
+                "SELECT url, digest FROM entries ORDER BY accessed_at"
+            ).fetchall():
+                if total <= target:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                size = self._conn.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()
+                self._drop_orphan(digest)
+                if size and not self._conn.execute("SELECT 1 FROM objects WHERE digest = ?", (digest,)).fetchone():
+                    total -= size[0]
+                evicted += 1
+        logger.info(f"Evicted {evicted} entries from the HTTP cache")
+        return evicted
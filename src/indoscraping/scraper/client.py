@@ -0,0 +1,191 @@
+"""Shared HTTP client used by every scraper.
+
+A single ``requests.Session`` keeps a pool of keep-alive connections per
+host, asks for compressed responses and retries transient failures (429
+and 5xx) with exponential backoff, honouring ``Retry-After``. Requests
+also wait on the per-host rate limiter before going out, and requests made
+with ``use_cache=True`` go through the client's ``HttpCache`` if it has one.
+With an ``AdaptiveLimiter`` (see ``adaptive``) the number of requests in
+flight to each host follows that host's latency and errors. A body can be
+read only up to a marker, for parsers that need the start of a page.
+"""
+import logging
+import time
+
+import requests
+from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from indoscraping.scraper.ratelimit import rate_limiter as shared_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+ua = UserAgent()
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Rest of a cut body, in bytes on the wire, that is still read and thrown
+# away to keep the connection; beyond it the connection is closed instead
+DRAIN_LIMIT = 64 * 1024
+
+
+def accept_encoding():
+    """Return the encodings urllib3 can decode in this environment."""
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+def retry_count(resp):
+    """Return how many times urllib3 retried the request of ``resp``."""
+    retries = resp.raw.retries if resp.raw is not None and getattr(resp.raw, "retries", None) else None
+    return len(retries.history) if retries else 0
+
+
+def is_throttled(resp=None, error=None):
+    """Whether a response or request error means the host wants less load.
+
+    That is a 429 or 5xx status, one that was retried into a success, a
+    timeout or a failed connection.
+    """
+    if error is not None:
+        return isinstance(error, (requests.Timeout, requests.ConnectionError))
+    return resp.status_code in RETRY_STATUSES or retry_count(resp) > 0
+
+
+def read_until(resp, marker, chunk_size=16 * 1024):
+    """Read the body of streamed ``resp`` up to the end of the first ``marker``.
+
+    ``resp.content`` is then the body up to and including the marker, or
+    the whole body if it has none, and ``resp.truncated`` tells which. The
+    rest is drained if it is short, so that the connection is reused, and
+    otherwise left unread by closing the connection.
+    """
+    marker = marker.encode("utf-8")
+    body = bytearray()
+    resp.truncated = False
+    for chunk in resp.iter_content(chunk_size):
+        start = max(0, len(body) - len(marker) + 1)
+        body += chunk
+        end = body.find(marker, start)
+        if end != -1:
+            del body[end + len(marker):]
+            resp.truncated = True
+            break
+    resp._content = bytes(body)
+    if resp.truncated:
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) - resp.raw.tell() <= DRAIN_LIMIT:
+            resp.raw.drain_conn()
+        else:
+            resp.raw.close()
+    resp.close()
+    return resp
+
+
+def default_retry(total=5, backoff_factor=0.5):
+    return Retry(
+        total=total,
+        backoff_factor=backoff_factor,
+        backoff_max=60,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class HttpClient:
+    """Pooled, retrying and rate-limited HTTP client.
+
+    ``pool_connections`` is the number of hosts whose pools are kept alive
+    and ``pool_maxsize`` the number of connections kept per host; it should
+    be at least the per-host concurrency of the crawl.
+    """
+
+    def __init__(self, pool_connections=32, pool_maxsize=16, retries=None, timeout=30,
+                 headers=None, rate_limiter=None, cache=None, adaptive=None):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.cache = cache
+        self.adaptive = adaptive
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": ua.random,
+            "Accept-Encoding": accept_encoding(),
+            "Connection": "keep-alive",
+        })
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retries or default_retry(),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def cached_response(self, url):
+        """Return a response for ``url`` from the cache if no request is needed."""
+        return self.cache.fresh_response(url) if self.cache else None
+
+    def get(self, url, rate_limit=True, use_cache=False, adaptive=True, until=None, **kwargs):
+        """GET ``url``, waiting for the host's rate limit unless ``rate_limit`` is false.
+
+        With ``use_cache`` a fresh cached copy is returned without a request
+        and a stale one is revalidated with a conditional request. The
+        request waits for a slot of the client's ``adaptive`` limiter, if it
+        has one, unless ``adaptive`` is false because the caller holds one.
+        With ``until`` the body is read only up to that marker (see
+        ``read_until``); cached requests always read it in full.
+        """
+        cache = self.cache if use_cache else None
+        if until and not cache:
+            kwargs["stream"] = True
+        kwargs.setdefault("timeout", self.timeout)
+        if not cache:
+            resp = self._send(url, rate_limit, adaptive, **kwargs)
+            if until:
+                read_until(resp, until)
+            return resp
+        cached = cache.fresh_response(url)
+        if cached is not None:
+            return cached
+        validators = cache.validators(url)
+        headers = kwargs.pop("headers", None) or {}
+        resp = cache.update(url, self._send(url, rate_limit, adaptive, headers={**headers, **validators}, **kwargs))
+        if resp is None:
+            logger.debug(f"Got a 304 for {url} without a cached body, fetching it again")
+            resp = self._send(url, rate_limit, adaptive, headers=headers, **kwargs)
+            resp = cache.update(url, resp) or resp
+        return resp
+
+    def _send(self, url, rate_limit, adaptive, **kwargs):
+        if rate_limit:
+            self.rate_limiter.wait(url)
+        if self.adaptive and adaptive:
+            with self.adaptive.limit_for(url) as limit:
+                started = time.perf_counter()
+                try:
+                    resp = self.session.get(url, **kwargs)
+                except requests.RequestException as e:
+                    limit.observe(time.perf_counter() - started, throttled=is_throttled(error=e))
+                    raise
+                limit.observe(time.perf_counter() - started, throttled=is_throttled(resp))
+        else:
+            resp = self.session.get(url, **kwargs)
+        retries = retry_count(resp)
+        if retries:
+            logger.debug(f"Fetched {url} after {retries} retries")
+        return resp
+
+    def close(self):
+        self.session.close()
+
+
+# Shared by every scraper in the process so that they reuse the same
+# connection pools.
+http_client = HttpClient()
@@ -0,0 +1,201 @@
+"""URL canonicalization and duplicate detection for articles.
+
+``canonical_url`` strips what does not change the page a URL points to:
+tracking parameters, fragments, default ports, letter case of the host and
+trailing slashes. Sites whose articles live under several hosts or paths
+add their own key on top (``SiteSpec.url_key``, e.g. detik's ``d-`` id).
+
+``DedupIndex`` remembers, in SQLite, every article URL key and a
+fingerprint of every article body: an exact hash of the normalized text
+and a 64-bit SimHash of its word shingles. An article whose text matches
+one seen before is flagged ``duplicate_of`` that article's URL, one
+whose SimHash is within ``max_distance`` bits is flagged
+``near_duplicate_of`` it. Near-duplicate lookups use LSH banding: the
+SimHash is split into ``max_distance + 1`` bands and two hashes that
+differ in at most ``max_distance`` bits agree on at least one band
+exactly, so a lookup is one indexed query per band that returns a handful
+of candidates however many articles the index holds.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that track where a click came from rather than select
+# content. Generic names such as page, single or amp are left alone, as
+# on some sites they pick another page or another rendering of the article.
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "_ga", "ref", "tag_from",
+})
+TRACKING_PREFIXES = ("utm_",)
+
+SHINGLE_SIZE = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    site TEXT,
+    content_hash BLOB NOT NULL,
+    simhash INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fingerprints_hash ON fingerprints (content_hash);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    fingerprint INTEGER NOT NULL,
+    PRIMARY KEY (band, value, fingerprint)
+) WITHOUT ROWID;
+"""
+
+
+def canonical_url(url):
+    """Return ``url`` without tracking parameters, fragment and cosmetic differences."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in TRACKING_PARAMS and not name.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def normalize_text(text):
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def content_hash(text):
+    """Return a 16-byte hash of ``text`` that ignores case, punctuation and spacing."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """Return the 64-bit SimHash of the word shingles of ``text``."""
+    words = normalize_text(text).split()
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    if not shingles or shingles == {""}:
+        return 0
+    # Count set bits per position column-wise over the binary strings, which
+    # keeps the per-bit loop in C
+    hashes = [format(int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest()), "064b")
+              for s in shingles]
+    half = len(hashes) / 2
+    bits = "".join("1" if column.count("1") > half else "0" for column in map("".join, zip(*hashes)))
+    return int(bits, 2)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class DedupIndex:
+    """SQLite index of article URL keys and content fingerprints.
+
+    May be shared by the threads and event loop of a crawl.
+    """
+
+    def __init__(self, path, max_distance=3):
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._band_bits = -(-64 // self.bands)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def known_url(self, key):
+        """Return the URL first recorded under ``key``, or ``None``."""
+        with self._lock:
+            row = self._conn.execute("SELECT url FROM urls WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def add_url(self, key, url):
+        """Record ``url`` under ``key``; return false if the key was already known."""
+        with self._lock, self._conn:
+            return self._conn.execute("INSERT OR IGNORE INTO urls VALUES (?, ?)", (key, url)).rowcount == 1
+
+    def _band_values(self, value):
+        mask = (1 << self._band_bits) - 1
+        return [(band, (value >> (band * self._band_bits)) & mask) for band in range(self.bands)]
+
+    def find(self, text):
+        """Return ``(kind, url)`` of an earlier article ``text`` duplicates, or ``(None, None)``.
+
+        ``kind`` is ``"exact"`` or ``"near"``.
+        """
+        digest, fingerprint = content_hash(text), simhash(text)
+        with self._lock:
+            return self._find(digest, fingerprint)
+
+    def _find(self, digest, fingerprint):
+        row = self._conn.execute("SELECT url FROM fingerprints WHERE content_hash = ? LIMIT 1", (digest,)).fetchone()
+        if row:
+            return "exact", row[0]
+        best = None
+        for band, value in self._band_values(fingerprint):
+            for url, candidate in self._conn.execute(
+                    "SELECT f.url, f.simhash FROM bands b JOIN fingerprints f ON f.id = b.fingerprint "
+                    "WHERE b.band = ? AND b.value = ?", (band, value)):
+                distance = hamming(fingerprint, _unsigned(candidate))
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, url)
+        return ("near", best[1]) if best else (None, None)
+
+    def check(self, url, text, site=None):
+        """Look up ``text`` like ``find`` and then add it to the index under ``url``."""
+        digest, fingerprint = content_hash(text), simhash(text)
+        with self._lock, self._conn:
+            kind, duplicate_of = self._find(digest, fingerprint)
+            if duplicate_of == url:
+                # The same article scraped again
+                return None, None
+            if kind != "exact":
+                # Exact copies add nothing a later lookup could not find already
+                cursor = self._conn.execute(
+                    "INSERT INTO fingerprints (url, site, content_hash, simhash) VALUES (?, ?, ?, ?)",
+                    (url, site, digest, _signed(fingerprint)))
+                self._conn.executemany("INSERT OR IGNORE INTO bands VALUES (?, ?, ?)",
+                                       [(band, value, cursor.lastrowid)
+                                        for band, value in self._band_values(fingerprint)])
+        return kind, duplicate_of
+
+    def flag(self, article):
+        """Check an ``Article``'s content and flag it in ``extra`` if it duplicates an earlier one."""
+        if not article.content:
+            return None
+        kind, duplicate_of = self.check(article.url, article.text, article.site)
+        if kind == "exact":
+            article.extra["duplicate_of"] = duplicate_of
+        elif kind == "near":
+            article.extra["near_duplicate_of"] = duplicate_of
+        return kind
@@ -0,0 +1,450 @@
+"""Distributed crawling over a shared work queue.
+
+A coordinator splits a crawl into (site, category, date, page) units and
+puts the first index page of every (site, category, date) on a queue.
+Workers on any number of nodes lease units, fetch the index page, scrape
+the articles it lists and acknowledge the unit. Page 1 of a site that
+prints its page count enqueues the remaining pages; on the other sites
+every non-empty page enqueues the next one. Units are keyed by their
+coordinates, so enqueueing one twice is a no-op and no two nodes get the
+same page.
+
+A lease expires after ``lease_timeout`` seconds unless the worker extends
+it, after which the unit is handed to another worker; workers extend their
+leases while they work, so only units of crashed or stuck workers are
+re-delivered. A unit with an article that could not be scraped is handed
+back as failed, so the article is tried again on a later attempt. A unit
+that fails or expires ``max_attempts`` times is set aside as dead.
+
+Two queues are available: ``SqliteWorkQueue`` for a file that every
+worker can open (one machine, or a few processes sharing a disk) and
+``RedisWorkQueue`` for a Redis-compatible server reachable by all nodes.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from indoscraping.scraper.frontier import category_key
+from indoscraping.scraper.sites import load_site
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+
+@dataclass
+class Unit:
+    site: str
+    category: Any
+    date: str
+    page: int
+
+    @property
+    def key(self):
+        return f"{self.site}|{category_key(self.category)}|{self.date}|{self.page}"
+
+    def to_json(self):
+        return json.dumps([self.site, self.category, self.date, self.page], ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(*json.loads(data))
+
+
+@dataclass
+class Lease:
+    unit: Unit
+    token: str
+    attempts: int
+
+
+def worker_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id TEXT PRIMARY KEY,
+    unit TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    token TEXT,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_state ON units (state, lease_until);
+"""
+
+
+class SqliteWorkQueue:
+    """Work queue in an SQLite file shared by the workers of one machine."""
+
+    def __init__(self, path, lease_timeout=300, max_attempts=3):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, fn, *args):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # cannot select the same queued unit.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def put(self, units):
+        """Enqueue ``units``, skipping those already known. Returns the number added."""
+        now = time.time()
+        rows = [(unit.key, unit.to_json(), QUEUED, now) for unit in units]
+
+        def insert():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO units (id, unit, state, updated_at) VALUES (?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def lease(self, worker, n=1):
+        """Lease up to ``n`` queued or expired units to ``worker``."""
+        def take():
+            now = time.time()
+            self._conn.execute(
+                "UPDATE units SET state = ?, error = 'lease expired', updated_at = ? "
+                "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (DEAD, now, LEASED, now, self.max_attempts),
+            )
+            rows = self._conn.execute(
+                "SELECT id, unit, attempts FROM units WHERE state = ? OR (state = ? AND lease_until < ?) "
+                "ORDER BY rowid LIMIT ?",
+                (QUEUED, LEASED, now, n),
+            ).fetchall()
+            leases = []
+            for unit_id, unit, attempts in rows:
+                token = uuid.uuid4().hex
+                self._conn.execute(
+                    "UPDATE units SET state = ?, token = ?, worker = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (LEASED, token, worker, now + self.lease_timeout, now, unit_id),
+                )
+                leases.append(Lease(Unit.from_json(unit), token, attempts + 1))
+            return leases
+
+        return self._transaction(take)
+
+    def _finish(self, lease, state, error=None):
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE units SET state = ?, error = ?, token = NULL, updated_at = ? "
+                "WHERE id = ? AND token = ? AND state = ?",
+                (state, error, time.time(), lease.unit.key, lease.token, LEASED),
+            )
+        return cur.rowcount == 1
+
+    def ack(self, lease):
+        """Mark a leased unit done. Returns false if the lease was lost."""
+        return self._finish(lease, DONE)
+
+    def fail(self, lease, error):
+        """Give a unit back for another attempt, or set it aside once out of attempts."""
+        return self._finish(lease, DEAD if lease.attempts >= self.max_attempts else QUEUED, error)
+
+    def extend(self, lease):
+        """Push a lease's expiry ``lease_timeout`` seconds into the future."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE units SET lease_until = ? WHERE id = ? AND token = ? AND state = ?",
+                (time.time() + self.lease_timeout, lease.unit.key, lease.token, LEASED),
+            )
+        return cur.rowcount == 1
+
+    def counts(self):
+        """Return the number of units in each state."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM units GROUP BY state").fetchall())
+        return {state: counts.get(state, 0) for state in (QUEUED, LEASED, DONE, DEAD)}
+
+    def remaining(self):
+        """Return the number of units that are queued or being worked on."""
+        counts = self.counts()
+        return counts[QUEUED] + counts[LEASED]
+
+
+# Moves expired leases back to the queue, then pops and leases up to
+# ARGV[3] units. Returns a flat list of id, attempts, token triples.
+REDIS_LEASE = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('HDEL', KEYS[4], id)
+  redis.call('RPUSH', KEYS[1], id)
+end
+local result = {}
+for i = 1, tonumber(ARGV[3]) do
+  local id = redis.call('LPOP', KEYS[1])
+  if not id then break end
+  local token = ARGV[4] .. i
+  redis.call('ZADD', KEYS[2], ARGV[2], id)
+  redis.call('HSET', KEYS[4], id, token)
+  local attempts = redis.call('HINCRBY', KEYS[3], id, 1)
+  table.insert(result, id)
+  table.insert(result, attempts)
+  table.insert(result, token)
+end
+return result
+"""
+
+# Ends a lease if ARGV[2] still holds it: ARGV[3] is the set or list to
+# move the unit to and ARGV[4] an optional error.
+REDIS_FINISH = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+if ARGV[3] == 'queued' then
+  redis.call('RPUSH', KEYS[3], ARGV[1])
+else
+  redis.call('SADD', KEYS[4], ARGV[1])
+end
+if ARGV[4] ~= '' then redis.call('HSET', KEYS[5], ARGV[1], ARGV[4]) end
+return 1
+"""
+
+REDIS_EXTEND = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+REDIS_PUT = """
+local added = 0
+for i = 1, #ARGV, 2 do
+  if redis.call('SADD', KEYS[1], ARGV[i]) == 1 then
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    redis.call('RPUSH', KEYS[3], ARGV[i])
+    added = added + 1
+  end
+end
+return added
+"""
+
+
+def _redis():
+    try:
+        import redis
+    except ImportError as e:
+        raise ImportError("the Redis work queue requires the 'redis' package") from e
+    return redis
+
+
+class RedisWorkQueue:
+    """Work queue on a Redis-compatible server shared by all nodes.
+
+    Every operation is a Lua script, so leases stay consistent however many
+    workers talk to the server.
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="indoscraping", lease_timeout=300, max_attempts=3):
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self._redis = _redis().Redis.from_url(url, decode_responses=True)
+        names = ("seen", "units", "queued", "leased", "tokens", "attempts", "done", "dead", "errors")
+        self.keys = {name: f"{prefix}:{name}" for name in names}
+        self._lease = self._redis.register_script(REDIS_LEASE)
+        self._finish_script = self._redis.register_script(REDIS_FINISH)
+        self._extend = self._redis.register_script(REDIS_EXTEND)
+        self._put = self._redis.register_script(REDIS_PUT)
+
+    def close(self):
+        self._redis.close()
+
+    def put(self, units):
+        added = 0
+        units = list(units)
+        keys = [self.keys["seen"], self.keys["units"], self.keys["queued"]]
+        for i in range(0, len(units), 500):
+            args = []
+            for unit in units[i:i + 500]:
+                args += [unit.key, unit.to_json()]
+            added += self._put(keys=keys, args=args)
+        return added
+
+    def lease(self, worker, n=1):
+        k = self.keys
+        now = time.time()
+        result = self._lease(
+            keys=[k["queued"], k["leased"], k["attempts"], k["tokens"]],
+            args=[now, now + self.lease_timeout, n, f"{worker}:{uuid.uuid4().hex}:"],
+        )
+        leases = []
+        for i in range(0, len(result), 3):
+            unit_id, attempts, token = result[i], int(result[i + 1]), result[i + 2]
+            lease = Lease(Unit.from_json(self._redis.hget(k["units"], unit_id)), token, attempts)
+            if attempts > self.max_attempts:
+                self._finish(lease, DEAD, "lease expired")
+                continue
+            leases.append(lease)
+        return leases
+
+    def _finish(self, lease, state, error=None):
+        k = self.keys
+        return bool(self._finish_script(
+            keys=[k["leased"], k["tokens"], k["queued"], k[state], k["errors"]],
+            args=[lease.unit.key, lease.token, state, error or ""],
+        ))
+
+    def ack(self, lease):
+        return self._finish(lease, DONE)
+
+    def fail(self, lease, error):
+        return self._finish(lease, DEAD if lease.attempts >= self.max_attempts else QUEUED, error)
+
+    def extend(self, lease):
+        k = self.keys
+        return bool(self._extend(keys=[k["leased"], k["tokens"]],
+                                 args=[lease.unit.key, lease.token, time.time() + self.lease_timeout]))
+
+    def counts(self):
+        k = self.keys
+        return {
+            QUEUED: self._redis.llen(k["queued"]),
+            LEASED: self._redis.zcard(k["leased"]),
+            DONE: self._redis.scard(k["done"]),
+            DEAD: self._redis.scard(k["dead"]),
+        }
+
+    def remaining(self):
+        counts = self.counts()
+        return counts[QUEUED] + counts[LEASED]
+
+
+def open_queue(url, **kwargs):
+    """Open the queue at ``url``: ``redis://...`` or an SQLite path (optionally ``sqlite:///path``)."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue(url, **kwargs)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SqliteWorkQueue(url, **kwargs)
+
+
+def enqueue_jobs(queue, jobs):
+    """Put the first index page of every crawl job on ``queue``."""
+    return queue.put(Unit(job.site.name, job.category, job.date_str, 1) for job in jobs)
+
+
+class Worker:
+    """Lease units from a queue and crawl them with a ``CrawlEngine``.
+
+    ``units`` is how many units are worked on at once. Without ``wait``
+    the worker stops once no unit is queued or leased anywhere.
+    """
+
+    def __init__(self, queue, engine, sink_for, name=None, units=4, poll_interval=5, wait=False):
+        self.queue = queue
+        self.engine = engine
+        self.sink_for = sink_for
+        self.name = name or worker_name()
+        self.units = units
+        self.poll_interval = poll_interval
+        self.wait = wait
+        self.stats = {"units": 0, "failed": 0, "articles": 0}
+
+    async def _heartbeat(self, lease):
+        while True:
+            await asyncio.sleep(self.queue.lease_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, lease):
+                logger.warning(f"Lost the lease on {lease.unit.key}")
+                return
+
+    async def _process(self, lease):
+        unit = lease.unit
+        site = load_site(unit.site)
+        links, max_page = await self.engine.index_page(site, unit.category, unit.date, unit.page)
+        last = self.engine.max_index_pages
+        if max_page:
+            pages = range(2, (min(max_page, last) if last else max_page) + 1)
+        elif site.parse_max_page is None and links and not (last and unit.page >= last):
+            pages = [unit.page + 1]
+        else:
+            pages = []
+        if pages:
+            await asyncio.to_thread(self.queue.put, [Unit(unit.site, unit.category, unit.date, p) for p in pages])
+
+        articles = await asyncio.gather(*(self.engine.scrape(site, link, unit.category, unit.date)
+                                          for link in self.engine.unscraped(site, links)))
+        sink = self.sink_for(site)
+        count = 0
+        for article in articles:
+            if article is not None:
+                self.engine.write(sink, site, article)
+                count += 1
+        return count, len(articles) - count
+
+    async def _run_unit(self, lease):
+        heartbeat = asyncio.create_task(self._heartbeat(lease))
+        try:
+            count, failed = await self._process(lease)
+        except Exception as e:
+            logger.error(f"Unit {lease.unit.key} failed (attempt {lease.attempts}): {e}")
+            await asyncio.to_thread(self.queue.fail, lease, str(e))
+            self.stats["failed"] += 1
+            return
+        finally:
+            heartbeat.cancel()
+        self.stats["articles"] += count
+        if failed:
+            # Hand the unit back so the articles that failed are tried again;
+            # with a dedup index the ones written above are skipped then
+            logger.warning(f"Unit {lease.unit.key} failed (attempt {lease.attempts}): "
+                           f"{failed} of {failed + count} articles could not be scraped")
+            await asyncio.to_thread(self.queue.fail, lease, f"{failed} articles failed")
+            self.stats["failed"] += 1
+            return
+        if not await asyncio.to_thread(self.queue.ack, lease):
+            logger.warning(f"Unit {lease.unit.key} finished after its lease was lost")
+        self.stats["units"] += 1
+        logger.info(f"[{lease.unit.site}] {count} articles from page {lease.unit.page} of "
+                    f"{lease.unit.category} on {lease.unit.date}")
+
+    async def crawl(self):
+        """Work until the queue is drained and return the worker's counts."""
+        active = set()
+        while True:
+            if len(active) < self.units:
+                leases = await asyncio.to_thread(self.queue.lease, self.name, self.units - len(active))
+                active.update(asyncio.create_task(self._run_unit(lease)) for lease in leases)
+            if not active:
+                if not self.wait and await asyncio.to_thread(self.queue.remaining) == 0:
+                    return self.stats
+                await asyncio.sleep(self.poll_interval)
+                continue
+            _, active = await asyncio.wait(active, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+
+    def run(self):
+        """Synchronous wrapper around ``crawl``."""
+        return self.engine.run_async(self.crawl())
@@ -0,0 +1,440 @@
+"""Asyncio crawl engine shared by the news scrapers.
+
+Each site module describes how to list and parse its pages with a
+``SiteSpec``. The engine fetches index pages and articles concurrently,
+bounded by a global and a per-host concurrency budget, and yields parsed
+articles as soon as they are ready.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from indoscraping.scraper import parsing
+from indoscraping.scraper.client import http_client, is_throttled, retry_count
+from indoscraping.scraper.dedup import canonical_url
+from indoscraping.scraper.frontier import FAILED, FETCHED, PARSED
+from indoscraping.scraper.metrics import metrics as shared_metrics
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pipeline import ParsePool
+from indoscraping.scraper.ratelimit import rate_limiter as shared_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SiteSpec:
+    """How a news site lists its articles and how to parse them.
+
+    ``index_page_url(category, date_str, page)`` builds the URL of an index
+    page, ``parse_index(html)`` returns the article links on it and
+    ``parse_article(html, url)`` returns an ``Article`` (or ``None``).
+    Sites that print their page count provide ``parse_max_page(html)``;
+    the others are paginated until the first empty page. ``date_format``
+    is the ``strftime`` format of the site's ``date_str``. ``url_key(url)``
+    returns what the URLs of one article have in common where that is more
+    than ``canonical_url`` finds. ``article_end`` marks where the part of an
+    article page that ``parse_article`` reads ends; in partial mode (see
+    ``parsing.set_partial``) article bodies are only read up to it. It is
+    opt-in: anything after the marker is lost, so it should only be set
+    from the site's live pages, and none of the bundled sites sets one.
+    """
+    name: str
+    get_categories: Callable[[], list]
+    index_page_url: Callable[[Any, str, int], str]
+    parse_index: Callable[[str], list]
+    parse_article: Callable[[str, str], Optional[Article]]
+    parse_max_page: Optional[Callable[[str], int]] = None
+    category_fields: Optional[Callable[[Any], dict]] = None
+    date_format: Optional[str] = None
+    url_key: Optional[Callable[[str], str]] = None
+    article_end: Optional[str] = None
+
+    def iso_date(self, date_str):
+        """Return ``date_str`` as ``YYYY-MM-DD``, or unchanged if it cannot be parsed."""
+        if not self.date_format:
+            return date_str
+        try:
+            return datetime.strptime(date_str, self.date_format).date().isoformat()
+        except ValueError:
+            return date_str
+
+    def is_past(self, date_str):
+        """Whether ``date_str`` is before today, i.e. its index can no longer change."""
+        if not self.date_format:
+            return False
+        try:
+            return datetime.strptime(date_str, self.date_format).date() < date.today()
+        except ValueError:
+            return False
+
+
+class CrawlEngine:
+    """Fetch and parse a site's index pages and articles concurrently.
+
+    ``concurrency`` caps the number of requests in flight overall and
+    ``per_host`` caps them for any single host. Together with the per-host
+    token buckets of ``rate_limiter`` this is the politeness budget a site
+    sees from one crawl. When the client has an ``AdaptiveLimiter`` it
+    replaces ``per_host``: each host's limit then follows its latency and
+    errors.
+
+    With ``parse_workers`` set, pages are parsed in that many worker
+    processes (see ``ParsePool``) instead of on the event loop, with at most
+    ``max_queued`` fetched pages waiting for a worker.
+
+    With a ``frontier`` the crawl records each URL's state on disk, skips
+    URLs that are already parsed and index listings that are already
+    complete, so an interrupted or repeated crawl only does what is missing.
+    ``incremental`` (which needs a frontier) additionally stops paginating
+    an index at the first page that lists an already known article or the
+    category's watermark; index pages list the newest articles first, so
+    everything beyond it has been seen before.
+
+    Index pages always go through the client's HTTP cache when it has one;
+    ``cache_articles`` sends article pages through it as well, e.g. to
+    record HTML for offline parser development.
+
+    Index pages after the first are fetched concurrently: all at once when
+    the site prints its page count, otherwise ``index_window`` at a time.
+
+    Links are deduplicated by their canonical URL. With a ``dedup`` index
+    (see ``DedupIndex``) links already scraped in earlier crawls, under any
+    variant of their URL, are not fetched again, and articles whose content
+    duplicates or nearly duplicates an earlier one are flagged in ``extra``.
+
+    Requests, parse times and writes are recorded in ``metrics`` (the
+    process-wide ``Metrics`` by default) per site and stage.
+    """
+
+    def __init__(self, concurrency=16, per_host=4, timeout=30, headers=None, max_index_pages=None,
+                 rate_limiter=None, client=None, parse_workers=0, max_queued=None, frontier=None,
+                 incremental=False, cache_articles=False, index_window=4, dedup=None, metrics=None):
+        if incremental and frontier is None:
+            raise ValueError("incremental crawling needs a frontier")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+        self.client = client or http_client
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.max_index_pages = max_index_pages
+        self.frontier = frontier
+        self.incremental = incremental
+        self.cache_articles = cache_articles
+        self.index_window = max(1, index_window)
+        self.dedup = dedup
+        self.metrics = metrics or shared_metrics
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawl")
+        self.parse_pool = ParsePool(parse_workers, max_queued) if parse_workers else None
+        self._global = None
+        self._hosts = {}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.parse_pool:
+            self.parse_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _host_semaphore(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    def _get(self, url, use_cache=False, site=None, stage="page", limit=None, until=None):
+        started = time.perf_counter()
+        try:
+            resp = self.client.get(url, rate_limit=False, use_cache=use_cache, adaptive=False, until=until,
+                                   headers=self.headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.metrics.observe_request(site, stage, time.perf_counter() - started, "error")
+            if limit:
+                limit.observe(time.perf_counter() - started, throttled=is_throttled(error=e))
+            raise
+        if limit and not getattr(resp, "from_cache", False):
+            limit.observe(time.perf_counter() - started, throttled=is_throttled(resp))
+        # A revalidated cache entry comes back as the cached 200
+        status = 304 if getattr(resp, "from_cache", False) else resp.status_code
+        self.metrics.observe_request(site, stage, time.perf_counter() - started, status, len(resp.content),
+                                     retry_count(resp))
+        resp.raise_for_status()
+        return resp.text
+
+    async def fetch(self, url, use_cache=False, site=None, stage="page", until=None):
+        """Fetch ``url`` in the worker pool and return the response body.
+
+        With ``use_cache`` the client's HTTP cache is consulted first and a
+        fresh hit skips the rate limiter entirely. The request is recorded
+        in the metrics under ``site`` (its host by default) and ``stage``.
+        With ``until`` the body is only read up to the end of that marker.
+        """
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.concurrency)
+        host = urlparse(url).netloc
+        site = site or host
+        if use_cache:
+            cached = self.client.cached_response(url)
+            if cached is not None:
+                self.metrics.observe_request(site, stage, 0.0, "cached", len(cached.content))
+                return cached.text
+        limit = self.client.adaptive.limit_for(url) if self.client.adaptive else None
+        async with limit or self._host_semaphore(host):
+            await self.rate_limiter.wait_async(url)
+            async with self._global:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, self._get, url, use_cache, site, stage, limit,
+                                                  until)
+
+    async def _parse_index(self, site, html):
+        if self.parse_pool:
+            links, cpu = await self.parse_pool.parse_index(site.parse_index, html)
+        else:
+            started = time.thread_time()
+            links = site.parse_index(html)
+            cpu = time.thread_time() - started
+        self.metrics.observe_parse(site.name, "index", cpu)
+        return links
+
+    async def _parse_article(self, site, html, url):
+        if self.parse_pool:
+            article, cpu = await self.parse_pool.parse_article(site.parse_article, html, url)
+        else:
+            started = time.thread_time()
+            article = site.parse_article(html, url)
+            cpu = time.thread_time() - started
+        self.metrics.observe_parse(site.name, "article", cpu)
+        return article
+
+    async def discover(self, site, category, date_str):
+        """Return every article link listed for ``category`` on ``date_str``."""
+        links, _ = await self._walk_index(site, category, date_str)
+        return links
+
+    async def index_page(self, site, category, date_str, page):
+        """Fetch one index page and return its links and the page count.
+
+        The page count is only read from page 1 and only on sites that
+        print it; it is ``None`` otherwise.
+        """
+        html = await self.fetch(site.index_page_url(category, date_str, page), use_cache=True, site=site.name,
+                                stage="index")
+        links = await self._parse_index(site, html)
+        max_page = site.parse_max_page(html) if site.parse_max_page and page == 1 else None
+        return links, max_page
+
+    async def _fetch_index_page(self, site, category, date_str, page):
+        """Return the links on one index page, or ``None`` if it could not be fetched."""
+        try:
+            links, _ = await self.index_page(site, category, date_str, page)
+        except requests.RequestException as e:
+            logger.error(f"[{site.name}] Failed to fetch index page {page} for {category}: {e}")
+            return None
+        return links
+
+    async def _walk_index(self, site, category, date_str, stop=None):
+        """Return the listed links and whether every index page was fetched.
+
+        Once page 1 gives the page count, the remaining pages are fetched
+        together. Without a page count (or when ``stop`` may end the walk
+        early) pages are fetched ``index_window`` at a time and processed in
+        order, so at most ``index_window - 1`` pages past the end are
+        requested speculatively. ``stop(page_links)`` returning true ends
+        pagination after that page.
+        """
+        complete = True
+        try:
+            links, max_page = await self.index_page(site, category, date_str, 1)
+        except requests.RequestException as e:
+            logger.error(f"[{site.name}] Failed to fetch first index page for {category}: {e}")
+            return [], False
+        links = list(links)
+        if stop and stop(links):
+            logger.info(f"[{site.name}] Reached known articles on page 1 for {category}")
+            return links, False
+
+        last = max_page
+        if self.max_index_pages:
+            last = min(last, self.max_index_pages) if last is not None else self.max_index_pages
+        page = 2
+        while last is None or page <= last:
+            window = self.index_window if max_page is None or stop else last - page + 1
+            pages = range(page, page + window if last is None else min(page + window, last + 1))
+            results = await asyncio.gather(
+                *(self._fetch_index_page(site, category, date_str, p) for p in pages))
+            for p, page_links in zip(pages, results):
+                if page_links is None:
+                    complete = False
+                    if max_page is None:
+                        return links, complete
+                    continue
+                if not page_links and max_page is None:
+                    logger.debug(f"[{site.name}] No articles on page {p}, stopping pagination")
+                    logger.info(f"[{site.name}] Found {len(links)} article links for {category} on {date_str}")
+                    return links, complete
+                links.extend(page_links)
+                if stop and stop(page_links):
+                    logger.info(f"[{site.name}] Reached known articles on page {p} for {category}")
+                    return links, False
+            page += len(pages)
+
+        logger.info(f"[{site.name}] Found {len(links)} article links for {category} on {date_str}")
+        return links, complete
+
+    async def _links_to_scrape(self, site, category, date_str):
+        """Discover a category's links, or take them from the frontier when it has them."""
+        frontier = self.frontier
+        if frontier is None:
+            return await self.discover(site, category, date_str)
+        if not frontier.listing_complete(site.name, category, date_str):
+            stop = None
+            if self.incremental:
+                watermark = frontier.watermark(site.name, category)
+
+                def stop(page_links):
+                    return watermark in page_links or bool(frontier.known(page_links))
+
+            links, complete = await self._walk_index(site, category, date_str, stop)
+            frontier.add(site.name, category, date_str, links)
+            if links and not site.is_past(date_str):
+                frontier.set_watermark(site.name, category, links[0])
+            if complete and site.is_past(date_str):
+                frontier.complete_listing(site.name, category, date_str, len(links))
+        links = frontier.pending(site.name, date_str, category)
+        logger.info(f"[{site.name}] {len(links)} URLs pending for {category} on {date_str}")
+        return links
+
+    def url_key(self, site, url):
+        return site.url_key(url) if site.url_key else canonical_url(url)
+
+    def unscraped(self, site, links):
+        """Return ``links`` without repeats and, with a dedup index, without already scraped articles."""
+        keys = set()
+        fresh = []
+        for link in links:
+            key = self.url_key(site, link)
+            if key in keys:
+                continue
+            keys.add(key)
+            known = self.dedup.known_url(key) if self.dedup is not None else None
+            if known:
+                logger.debug(f"[{site.name}] Skipping {link}, already scraped as {known}")
+                continue
+            fresh.append(link)
+        return fresh
+
+    async def scrape(self, site, url, category=None, date_str=None):
+        """Fetch and parse one article, returning ``None`` on failure.
+
+        ``date_str`` is the date of the index the article was listed on.
+        """
+        frontier = self.frontier
+        until = site.article_end if parsing.partial_enabled() else None
+        try:
+            html = await self.fetch(url, use_cache=self.cache_articles, site=site.name, stage="article", until=until)
+            if frontier:
+                frontier.mark(url, FETCHED)
+            article = await self._parse_article(site, html, url)
+            if until and html.endswith(until) and (article is None or not article.content):
+                # The body was cut at the marker before the article: the
+                # page does not look the way the site module expects
+                logger.info(f"[{site.name}] No article before the end marker of {url}, fetching it in full")
+                html = await self.fetch(url, use_cache=self.cache_articles, site=site.name, stage="article")
+                article = await self._parse_article(site, html, url)
+        except Exception as e:
+            logger.error(f"[{site.name}] Failed to scrape article {url}: {e}")
+            if frontier:
+                frontier.mark(url, FAILED, str(e))
+            return None
+        if frontier:
+            frontier.mark(url, PARSED if article is not None else FAILED)
+        if article is None:
+            return None
+        if site.category_fields and category is not None:
+            article.update(site.category_fields(category))
+        if date_str and not article.index_date:
+            article.index_date = site.iso_date(date_str)
+        if self.dedup is not None:
+            self.dedup.add_url(self.url_key(site, url), url)
+            if self.dedup.flag(article):
+                logger.info(f"[{site.name}] {url} duplicates "
+                            f"{article.extra.get('duplicate_of') or article.extra.get('near_duplicate_of')}")
+        return article
+
+    async def crawl(self, site, date_str, categories=None) -> AsyncIterator[Article]:
+        """Crawl ``categories`` (all of them by default) and yield articles as they finish."""
+        if categories is None:
+            categories = await asyncio.to_thread(site.get_categories)
+        logger.info(f"[{site.name}] Crawling {len(categories)} categories for {date_str}")
+
+        seen = set()
+        pending = {
+            asyncio.create_task(self._links_to_scrape(site, category, date_str)): (None, category)
+            for category in categories
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    url, category = pending.pop(task)
+                    if url is None:
+                        for link in self.unscraped(site, task.result()):
+                            key = self.url_key(site, link)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            pending[asyncio.create_task(self.scrape(site, link, category, date_str))] = (link, category)
+                    elif task.result() is not None:
+                        yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def write(self, sink, site, article):
+        """Write ``article`` of ``site`` to ``sink``, recording the write in the metrics."""
+        started = time.perf_counter()
+        sink.write(article)
+        self.metrics.observe_write(site.name, time.perf_counter() - started)
+
+    def run_async(self, main):
+        """Run coroutine ``main``, which uses this engine, on a new event loop."""
+        async def session():
+            self._global, self._hosts = None, {}
+            try:
+                return await main
+            finally:
+                if self.parse_pool:
+                    await self.parse_pool.stop()
+
+        return asyncio.run(session())
+
+    def run_to(self, sink, site, date_str, categories=None):
+        """Crawl like ``run`` but stream each article into ``sink`` as it finishes.
+
+        Returns the number of articles written.
+        """
+        async def stream():
+            count = 0
+            async for article in self.crawl(site, date_str, categories):
+                self.write(sink, site, article)
+                count += 1
+            return count
+
+        return self.run_async(stream())
+
+    def run(self, site, date_str, categories=None):
+        """Synchronous wrapper around ``crawl`` that returns a list of articles."""
+        async def collect():
+            return [article async for article in self.crawl(site, date_str, categories)]
+
+        return self.run_async(collect())
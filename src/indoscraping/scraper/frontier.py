@@ -0,0 +1,179 @@
+"""Disk-backed URL frontier for resumable crawls.
+
+Every article URL a crawl discovers is recorded in SQLite together with
+its state, so an interrupted crawl can pick up where it stopped and a
+repeated crawl of the same date only fetches what is missing. Completed
+index listings of past dates are recorded as well, which lets a re-run
+skip index pagination entirely.
+
+For incremental runs the frontier also keeps a watermark per site and
+category: the newest article link seen on its index.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+DISCOVERED = "discovered"
+FETCHED = "fetched"
+PARSED = "parsed"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    category TEXT,
+    date TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_site_date ON urls (site, date, category, state);
+CREATE TABLE IF NOT EXISTS listings (
+    site TEXT NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    links INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (site, category, date)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    site TEXT NOT NULL,
+    category TEXT NOT NULL,
+    newest_url TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, category)
+);
+"""
+
+
+def category_key(category):
+    """Serialize a site's category (a string, dict or tuple) for storage."""
+    return json.dumps(category, sort_keys=True, ensure_ascii=False)
+
+
+class Frontier:
+    """SQLite record of each URL's crawl state.
+
+    URLs move from ``discovered`` to ``fetched`` to ``parsed``; failures
+    are ``failed`` and are retried on later runs until ``max_attempts``.
+    The frontier may be shared by the threads and event loop of a crawl.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, site, category, date, urls):
+        """Record newly discovered ``urls``; known URLs keep their state."""
+        now = time.time()
+        rows = [(url, site, category_key(category), date, DISCOVERED, now) for url in urls]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, site, category, date, state, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def mark(self, url, state, error=None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE urls SET state = ?, error = ?, updated_at = ?, attempts = attempts + ? WHERE url = ?",
+                (state, error, time.time(), 1 if state == FAILED else 0, url),
+            )
+
+    def state(self, url):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM urls WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, url):
+        """Whether ``url`` needs no more work: parsed, or out of retries."""
+        with self._lock:
+            row = self._conn.execute("SELECT state, attempts FROM urls WHERE url = ?", (url,)).fetchone()
+        return bool(row) and (row[0] == PARSED or (row[0] == FAILED and row[1] >= self.max_attempts))
+
+    def known(self, urls):
+        """Return the subset of ``urls`` that is already in the frontier."""
+        urls = list(urls)
+        found = set()
+        with self._lock:
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT url FROM urls WHERE url IN ({placeholders})", chunk))
+        return found
+
+    def pending(self, site, date, category=None):
+        """Return the URLs of ``site`` and ``date`` that still need to be scraped."""
+        query = ("SELECT url FROM urls WHERE site = ? AND date = ? "
+                 "AND (state IN (?, ?) OR (state = ? AND attempts < ?))")
+        params = [site, date, DISCOVERED, FETCHED, FAILED, self.max_attempts]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category_key(category))
+        with self._lock:
+            return [row[0] for row in self._conn.execute(query, params)]
+
+    def listing_complete(self, site, category, date):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM listings WHERE site = ? AND category = ? AND date = ?",
+                (site, category_key(category), date),
+            ).fetchone()
+        return row is not None
+
+    def complete_listing(self, site, category, date, links):
+        """Record that every index page of ``category`` on ``date`` was walked."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings (site, category, date, links, completed_at) VALUES (?, ?, ?, ?, ?)",
+                (site, category_key(category), date, links, time.time()),
+            )
+
+    def watermark(self, site, category):
+        """Return the newest article link seen for ``category``, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_url FROM watermarks WHERE site = ? AND category = ?",
+                (site, category_key(category)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, site, category, url):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (site, category, newest_url, updated_at) VALUES (?, ?, ?, ?)",
+                (site, category_key(category), url, time.time()),
+            )
+
+    def counts(self, site=None, date=None):
+        """Return the number of URLs in each state."""
+        query, params = "SELECT state, COUNT(*) FROM urls WHERE 1 = 1", []
+        if site is not None:
+            query += " AND site = ?"
+            params.append(site)
+        if date is not None:
+            query += " AND date = ?"
+            params.append(date)
+        with self._lock:
+            return dict(self._conn.execute(query + " GROUP BY state", params).fetchall())
@@ -0,0 +1,318 @@
+"""Bulk, incremental loading of scraped records into PostgreSQL or SQLite.
+
+Records are streamed in chunks of ``chunk_size`` and upserted on a key,
+so a re-run only writes rows that are new or whose values changed; rows
+that are identical are left alone. The table is created on first load
+and columns that show up later are added to it. A table that exists
+without a unique constraint on the key (one written by pandas'
+``to_sql``, say) gets a unique index on it first. A PostgreSQL column
+that a later chunk brings values it cannot hold for (a string for a
+``NUMERIC`` column, a fraction for a ``BIGINT`` one) is widened to
+``TEXT`` or ``NUMERIC``.
+
+On PostgreSQL each chunk is sent with ``COPY`` into a temporary staging
+table and merged with ``INSERT ... ON CONFLICT DO UPDATE ... WHERE ... IS
+DISTINCT FROM``. On SQLite the chunk goes through one ``executemany`` of
+the equivalent upsert. Nested values (lists, dicts) are stored as JSON
+text. PostgreSQL needs ``pip install -e ".[postgres]"``.
+
+    loader = open_loader(os.environ["DATABASE_URL"])
+    loader.load("indomaret", read_records("klikindomaret_products.json"), key="plu")
+    load_articles(loader, read_records("detik_articles.jsonl"), site="detik")
+"""
+import logging
+import sqlite3
+from itertools import islice
+
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.parquet import flatten
+
+logger = logging.getLogger(__name__)
+
+
+def chunks(records, size):
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class _Loader:
+    """Chunking, flattening and schema evolution shared by both databases."""
+
+    def load(self, table, records, key, chunk_size=5000, exclude=()):
+        """Upsert ``records`` (dicts or ``Article``) into ``table`` on the ``key`` column(s).
+
+        ``exclude`` names fields that are not loaded. Returns the number of
+        records read and of rows inserted or changed.
+        """
+        key = (key,) if isinstance(key, str) else tuple(key)
+        exclude = set(exclude)
+        stats = {"records": 0, "written": 0}
+        for chunk in chunks(records, chunk_size):
+            rows = {}
+            for record in chunk:
+                record = flatten(record.to_dict() if isinstance(record, Article) else record)
+                row = {k: v for k, v in record.items() if k not in exclude}
+                if any(row.get(k) is None for k in key):
+                    logger.warning(f"Skipping a record without {', '.join(key)}")
+                    continue
+                # The last copy of a key in a chunk wins, as it would across chunks
+                rows[tuple(row[k] for k in key)] = row
+            rows = list(rows.values())
+            if rows:
+                columns = self._prepare(table, key, rows)
+                stats["written"] += self._upsert(table, key, columns, rows)
+            stats["records"] += len(chunk)
+            logger.debug(f"Loaded {stats['records']} records into {table}")
+        logger.info(f"Loaded {stats['records']} records into {table}, {stats['written']} rows written")
+        return stats
+
+    def _prepare(self, table, key, rows):
+        """Create ``table``, add missing columns and widen mismatched ones; return the chunk's columns."""
+        columns = {}
+        for row in rows:
+            for name, value in row.items():
+                column_type = self.column_type(value)
+                if columns.get(name) is None:
+                    columns[name] = column_type
+                elif column_type is not None and column_type != columns[name]:
+                    columns[name] = self.common_type(columns[name], column_type)
+        existing = self._existing_columns(table)
+        if not existing:
+            self._create(table, key, columns)
+        else:
+            for name, column_type in columns.items():
+                if name not in existing:
+                    self._execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(name)} {column_type or 'TEXT'}")
+                elif column_type is not None:
+                    self._widen(table, name, existing[name], column_type, [row.get(name) for row in rows])
+            self._ensure_unique(table, key)
+        return list(columns)
+
+    @staticmethod
+    def common_type(a, b):
+        return "TEXT"
+
+    def _widen(self, table, name, existing_type, column_type, values):
+        """Make column ``name`` able to hold ``values``, of ``column_type``."""
+
+    def _ensure_unique(self, table, key):
+        """Give an existing ``table`` the unique index on ``key`` that the upsert needs."""
+        if (table, key) in self._keyed:
+            return
+        if not self._has_unique(table, key):
+            index = _quote(f"{table}_{'_'.join(key)}_key")
+            logger.info(f"Adding a unique index on {', '.join(key)} to {table}")
+            try:
+                self._execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {self._qualified(table)} "
+                              f"({', '.join(_quote(k) for k in key)})")
+            except Exception as e:
+                raise ValueError(f"{table} has no unique constraint on {', '.join(key)} and one cannot be "
+                                 f"added, e.g. because the column holds duplicates: {e}") from e
+        self._keyed.add((table, key))
+
+    def _create(self, table, key, columns):
+        definitions = [f"{_quote(name)} {column_type or 'TEXT'}" for name, column_type in columns.items()]
+        definitions.append(f"PRIMARY KEY ({', '.join(_quote(k) for k in key)})")
+        self._execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(definitions)})")
+
+    def _conflict_clause(self, table, key, columns, excluded):
+        updates = [c for c in columns if c not in key]
+        if not updates:
+            return f"ON CONFLICT ({', '.join(_quote(k) for k in key)}) DO NOTHING"
+        assignments = ", ".join(f"{_quote(c)} = {excluded}.{_quote(c)}" for c in updates)
+        return (f"ON CONFLICT ({', '.join(_quote(k) for k in key)}) DO UPDATE SET {assignments} "
+                f"WHERE {self._changed(table, updates, excluded)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SqliteLoader(_Loader):
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._keyed = set()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def column_type(value):
+        if value is None:
+            return None
+        if isinstance(value, bool) or isinstance(value, int):
+            return "INTEGER"
+        if isinstance(value, float):
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def common_type(a, b):
+        return "REAL" if {a, b} == {"INTEGER", "REAL"} else "TEXT"
+
+    def _execute(self, statement):
+        with self.conn:
+            self.conn.execute(statement)
+
+    def _qualified(self, table):
+        return _quote(table)
+
+    def _existing_columns(self, table):
+        return {row[1]: row[2] for row in self.conn.execute(f"PRAGMA table_info({_quote(table)})")}
+
+    def _has_unique(self, table, key):
+        primary = [row[1] for row in sorted(self.conn.execute(f"PRAGMA table_info({_quote(table)})"),
+                                            key=lambda row: row[5]) if row[5]]
+        if set(primary) == set(key):
+            return True
+        for index in self.conn.execute(f"PRAGMA index_list({_quote(table)})").fetchall():
+            # (seq, name, unique, origin, partial); a partial index cannot back ON CONFLICT
+            if index[2] and not (len(index) > 4 and index[4]):
+                columns = {row[2] for row in self.conn.execute(f"PRAGMA index_info({_quote(index[1])})")}
+                if columns == set(key):
+                    return True
+        return False
+
+    def _changed(self, table, columns, excluded):
+        return " OR ".join(f"{_quote(table)}.{_quote(c)} IS NOT {excluded}.{_quote(c)}" for c in columns)
+
+    def _upsert(self, table, key, columns, rows):
+        statement = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            + self._conflict_clause(table, key, columns, "excluded")
+        )
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(statement, ([row.get(c) for c in columns] for row in rows))
+            return self.conn.total_changes - before
+
+
+# information_schema types of columns that COPY cannot put every number into
+INTEGER_TYPES = ("SMALLINT", "INTEGER", "BIGINT")
+NUMERIC_TYPES = ("NUMERIC", "REAL", "DOUBLE PRECISION")
+
+
+def _psycopg():
+    try:
+        import psycopg
+    except ImportError as e:
+        raise ImportError("loading into PostgreSQL requires the 'psycopg' package") from e
+    return psycopg
+
+
+class PostgresLoader(_Loader):
+    def __init__(self, dsn, schema="public"):
+        self.schema = schema
+        # Each load statement runs in its own explicit transaction
+        self.conn = _psycopg().connect(dsn, autocommit=True)
+        self.conn.execute(f"CREATE SCHEMA IF NOT EXISTS {_quote(schema)}")
+        self.conn.execute(f"SET search_path TO {_quote(schema)}")
+        self._keyed = set()
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def column_type(value):
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return "BOOLEAN"
+        # NUMERIC holds both the integer and the fractional prices an API
+        # may return for the same field.
+        if isinstance(value, (int, float)):
+            return "NUMERIC"
+        return "TEXT"
+
+    def _execute(self, statement):
+        with self.conn.transaction():
+            self.conn.execute(statement)
+
+    def _qualified(self, table):
+        return f"{_quote(self.schema)}.{_quote(table)}"
+
+    def _existing_columns(self, table):
+        rows = self.conn.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = %s AND table_name = %s",
+            (self.schema, table),
+        ).fetchall()
+        return {row[0]: row[1].upper() for row in rows}
+
+    def _widen(self, table, name, existing_type, column_type, values):
+        # COPY fails on a value the column cannot hold, e.g. a string in a
+        # NUMERIC column or a fraction in a BIGINT one (as pandas' to_sql
+        # creates them). Columns of other types are left to the database.
+        if existing_type in INTEGER_TYPES and column_type == "NUMERIC":
+            if all(isinstance(v, int) for v in values if v is not None):
+                return
+            widened = "NUMERIC"
+        elif existing_type in INTEGER_TYPES + NUMERIC_TYPES + ("BOOLEAN",) and column_type != existing_type \
+                and not (existing_type in NUMERIC_TYPES and column_type == "NUMERIC"):
+            widened = "TEXT"
+        else:
+            return
+        logger.warning(f"Widening {table}.{name} from {existing_type} to {widened} for {column_type} values")
+        self._execute(f"ALTER TABLE {self._qualified(table)} ALTER COLUMN {_quote(name)} TYPE {widened} "
+                      f"USING {_quote(name)}::{widened.lower()}")
+
+    def _has_unique(self, table, key):
+        rows = self.conn.execute(
+            "SELECT array_agg(a.attname::text) FROM pg_index i "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass AND i.indisunique AND i.indpred IS NULL GROUP BY i.indexrelid",
+            (self._qualified(table),),
+        ).fetchall()
+        return any(set(row[0]) == set(key) for row in rows)
+
+    def _changed(self, table, columns, excluded):
+        target = ", ".join(f"{_quote(table)}.{_quote(c)}" for c in columns)
+        source = ", ".join(f"{excluded}.{_quote(c)}" for c in columns)
+        if len(columns) == 1:
+            return f"{target} IS DISTINCT FROM {source}"
+        return f"ROW({target}) IS DISTINCT FROM ROW({source})"
+
+    def _upsert(self, table, key, columns, rows):
+        column_list = ", ".join(_quote(c) for c in columns)
+        with self.conn.transaction():
+            self.conn.execute(
+                f"CREATE TEMP TABLE _staging (LIKE {self._qualified(table)} INCLUDING DEFAULTS) ON COMMIT DROP")
+            with self.conn.cursor() as cur:
+                with cur.copy(f"COPY _staging ({column_list}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row([row.get(c) for c in columns])
+                cur.execute(
+                    f"INSERT INTO {self._qualified(table)} AS {_quote(table)} ({column_list}) "
+                    f"SELECT {column_list} FROM _staging "
+                    + self._conflict_clause(table, key, columns, "EXCLUDED")
+                )
+                return cur.rowcount
+
+
+def open_loader(url):
+    """Open a loader for ``postgresql://...``, ``sqlite:///path`` or a plain SQLite path.
+
+    SQLAlchemy-style ``postgresql+psycopg2://`` URLs are accepted too; the
+    driver is dropped, as psycopg connects by itself.
+    """
+    scheme, sep, rest = url.partition("://")
+    if sep and scheme.split("+", 1)[0] in ("postgresql", "postgres"):
+        return PostgresLoader(f"postgresql://{rest}")
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SqliteLoader(url)
+
+
+def load_articles(loader, records, table="articles", site=None, chunk_size=5000):
+    """Upsert news articles (``Article`` or JSON records) on their URL."""
+    articles = (r if isinstance(r, Article) else Article.from_dict(r, site=site or "") for r in records)
+    return loader.load(table, articles, key="url", chunk_size=chunk_size)
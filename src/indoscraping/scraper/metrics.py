@@ -0,0 +1,199 @@
+"""Crawl metrics: where the time of a crawl goes, per site and stage.
+
+The crawl engine records every request it makes (latency, bytes, status
+and retries) under the stage it belongs to (``index`` or ``article``
+pages), the CPU time spent parsing each page and the time spent writing
+each article to its sink. Latencies and parse times go into histograms
+with fixed buckets, everything else into counters.
+
+``Metrics.render`` formats them in the Prometheus text format, which
+``Metrics.serve`` exposes on a local port while a crawl runs::
+
+    metrics.serve(9108)          # curl localhost:9108/metrics
+
+and ``Metrics.summary`` is the end-of-run table the command line prints,
+with request counts, latency percentiles (estimated from the buckets),
+throughput and articles per second.
+"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency and parse time buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CPU_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+PREFIX = "indoscraping"
+
+
+class Histogram:
+    """Counts of observations per bucket, with their sum."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate quantile ``q`` by interpolating within its bucket, as Prometheus does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of the metrics of a crawl."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far and restart the clock of the rates."""
+        with self._lock:
+            self.started = time.monotonic()
+            self.latency = {}
+            self.bytes = {}
+            self.statuses = {}
+            self.retries = {}
+            self.parse_cpu = {}
+            self.write_time = {}
+            self.articles = {}
+
+    def observe_request(self, site, stage, seconds, status, size=0, retries=0):
+        """Record one request of ``stage``; ``status`` is the HTTP status, ``"error"`` or ``"cached"``."""
+        key = (site, stage)
+        with self._lock:
+            if status != "cached":
+                self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.bytes[key] = self.bytes.get(key, 0) + size
+            self.retries[key] = self.retries.get(key, 0) + retries
+            self.statuses[key + (str(status),)] = self.statuses.get(key + (str(status),), 0) + 1
+
+    def observe_parse(self, site, stage, cpu_seconds):
+        with self._lock:
+            self.parse_cpu.setdefault((site, stage), Histogram(CPU_BUCKETS)).observe(cpu_seconds)
+
+    def observe_write(self, site, seconds):
+        """Record one article written to a sink of ``site``."""
+        with self._lock:
+            self.write_time.setdefault(site, Histogram(CPU_BUCKETS)).observe(seconds)
+            self.articles[site] = self.articles.get(site, 0) + 1
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histograms(name, help, values, label_names):
+            lines.extend([f"# HELP {PREFIX}_{name} {help}", f"# TYPE {PREFIX}_{name} histogram"])
+            for key, histogram in sorted(values.items()):
+                labels = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}_{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+                lines.append(f"{PREFIX}_{name}_sum{_labels(**labels)} {histogram.sum}")
+                lines.append(f"{PREFIX}_{name}_count{_labels(**labels)} {histogram.count}")
+
+        def counters(name, help, values, label_names, type="counter"):
+            lines.extend([f"# HELP {PREFIX}_{name} {help}", f"# TYPE {PREFIX}_{name} {type}"])
+            for key, value in sorted(values.items()):
+                labels = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+                lines.append(f"{PREFIX}_{name}{_labels(**labels)} {value}")
+
+        with self._lock:
+            elapsed = self.elapsed()
+            histograms("request_seconds", "Request latency.", self.latency, ("site", "stage"))
+            counters("response_bytes_total", "Bytes of response bodies.", self.bytes, ("site", "stage"))
+            counters("responses_total", "Responses by status.", self.statuses, ("site", "stage", "status"))
+            counters("retries_total", "Retried requests.", self.retries, ("site", "stage"))
+            histograms("parse_cpu_seconds", "CPU time spent parsing a page.", self.parse_cpu, ("site", "stage"))
+            histograms("write_seconds", "Time spent writing an article.", self.write_time, ("site",))
+            counters("articles_total", "Articles written.", self.articles, ("site",))
+            counters("articles_per_second", "Articles written per second since the crawl started.",
+                     {site: count / elapsed for site, count in self.articles.items()}, ("site",), type="gauge")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Return a plain-text table of the run: one line per site and stage."""
+        with self._lock:
+            elapsed = self.elapsed()
+            lines = [f"{'site':<14} {'stage':<8} {'requests':>8} {'errors':>6} {'retries':>7} {'p50':>7} "
+                     f"{'p95':>7} {'p99':>7} {'MB':>8} {'parse ms':>8}"]
+            for site, stage in sorted(set(self.bytes) | set(self.parse_cpu)):
+                statuses = {status: count for (s, st, status), count in self.statuses.items()
+                            if (s, st) == (site, stage)}
+                errors = sum(count for status, count in statuses.items()
+                             if status == "error" or status.isdigit() and int(status) >= 400)
+                latency = self.latency.get((site, stage)) or Histogram(LATENCY_BUCKETS)
+                parse = self.parse_cpu.get((site, stage))
+                lines.append(
+                    f"{site:<14} {stage:<8} {sum(statuses.values()):>8} {errors:>6} "
+                    f"{self.retries.get((site, stage), 0):>7} {latency.quantile(0.5):>6.3f}s "
+                    f"{latency.quantile(0.95):>6.3f}s {latency.quantile(0.99):>6.3f}s "
+                    f"{self.bytes.get((site, stage), 0) / 1e6:>8.2f} "
+                    f"{parse.sum / parse.count * 1000 if parse else 0:>8.1f}")
+            for site, count in sorted(self.articles.items()):
+                write = self.write_time[site]
+                lines.append(f"{site}: {count} articles in {elapsed:.1f}s ({count / elapsed:.1f}/s), "
+                             f"{write.sum / write.count * 1000:.2f} ms per write")
+        return "\n".join(lines)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve ``/metrics`` on ``host:port`` from a daemon thread and return the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+# Shared by every crawl engine in the process, like the rate limiter
+metrics = Metrics()
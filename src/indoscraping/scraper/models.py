@@ -0,0 +1,153 @@
+"""Common record type produced by every news scraper.
+
+``Article`` is a slotted dataclass, so a large batch holds no per-record
+``__dict__``, and every site fills in the same fields with the same
+shapes: ``content`` is a list of paragraphs, ``tags`` a list of tag names
+and ``authors`` a list of names. ``published`` is the date as the site
+prints it, ``index_date`` the ISO date of the index the article was
+listed on. Fields a site does not have stay empty; anything site-specific
+goes into ``extra``.
+
+``to_dict`` gives the flat JSON form written by the sinks (with ``extra``
+merged in), ``from_dict`` reads it back, including the per-site dicts the
+scrapers produced before, and ``to_arrow`` builds a pyarrow table of a
+batch (``pip install -e ".[arrow]"``).
+"""
+import json
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+@dataclass(slots=True)
+class Article:
+    url: str
+    site: str = ""
+    title: str = ""
+    published: str = ""
+    authors: list = field(default_factory=list)
+    editor: str = ""
+    lead: str = ""
+    content: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+    image_url: str = ""
+    image_alt: str = ""
+    image_caption: str = ""
+    category: str = ""
+    index_date: str = ""
+    scraped_at: str = field(default_factory=_now)
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def text(self):
+        """The article body as one string, paragraphs separated by blank lines."""
+        return "\n\n".join(self.content)
+
+    def update(self, values):
+        """Set fields from ``values``; keys that are not fields go into ``extra``."""
+        for key, value in values.items():
+            if key in FIELD_NAMES:
+                setattr(self, key, value)
+            else:
+                self.extra[key] = value
+
+    def to_dict(self):
+        record = {
+            "url": self.url,
+            "site": self.site,
+            "title": self.title,
+            "published": self.published,
+            "authors": self.authors,
+            "editor": self.editor,
+            "lead": self.lead,
+            "content": self.content,
+            "tags": self.tags,
+            "image_url": self.image_url,
+            "image_alt": self.image_alt,
+            "image_caption": self.image_caption,
+            "category": self.category,
+            "index_date": self.index_date,
+            "scraped_at": self.scraped_at,
+        }
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_dict(cls, record, site=""):
+        """Build an article from a ``to_dict`` record or an old per-site dict."""
+        record = dict(record)
+        article = cls(url=record.pop("url", ""), site=record.pop("site", site) or site)
+        article.published = record.pop("published", None) or record.pop("publish_date", None) \
+            or record.pop("date", None) or ""
+        authors = record.pop("authors", None) or record.pop("journalists", None) or record.pop("author", None)
+        article.authors = [authors] if isinstance(authors, str) else list(authors or [])
+        content = record.pop("content", None) or []
+        if isinstance(content, str):
+            content = [p.strip() for p in content.split("\n") if p.strip()]
+        article.content = list(content)
+        tags, tag_urls = [], []
+        for tag in record.pop("tags", None) or []:
+            if isinstance(tag, dict):
+                tags.append(tag.get("text", ""))
+                tag_urls.append(tag.get("href"))
+            elif isinstance(tag, (list, tuple)):
+                tags.append(tag[0])
+                tag_urls.append(tag[1] if len(tag) > 1 else None)
+            else:
+                tags.append(tag)
+        article.tags = tags
+        if tag_urls:
+            article.extra["tag_urls"] = tag_urls
+        # Old records without a timestamp keep it empty rather than getting today's
+        article.scraped_at = record.pop("scraped_at", None) or ""
+        for key in ("title", "editor", "lead", "image_url", "image_alt", "image_caption", "category", "index_date"):
+            if key in record:
+                setattr(article, key, record.pop(key) or "")
+        article.extra.update(record.pop("extra", None) or {})
+        article.extra.update(record)
+        return article
+
+
+FIELD_NAMES = frozenset(f.name for f in fields(Article)) - {"extra"}
+
+LIST_FIELDS = ("authors", "content", "tags")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Arrow output requires the 'pyarrow' package") from e
+    return pyarrow
+
+
+def arrow_schema():
+    """Return the Arrow schema of ``to_arrow`` tables; ``extra`` is stored as JSON."""
+    pa = _pyarrow()
+    columns = []
+    for f in fields(Article):
+        if f.name in LIST_FIELDS:
+            columns.append(pa.field(f.name, pa.list_(pa.string())))
+        else:
+            columns.append(pa.field(f.name, pa.string()))
+    return pa.schema(columns)
+
+
+def to_arrow(articles):
+    """Return a pyarrow table with one row per article."""
+    pa = _pyarrow()
+    articles = list(articles)
+    columns = {}
+    for f in fields(Article):
+        values = [getattr(article, f.name) for article in articles]
+        if f.name == "extra":
+            values = [json.dumps(value, ensure_ascii=False) if value else None for value in values]
+        columns[f.name] = values
+    return pa.Table.from_pydict(columns, schema=arrow_schema())
@@ -1,15 +1,26 @@
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime
 import json
+import logging
 import re
 
+import requests
+
+from indoscraping.scraper.client import http_client
+from indoscraping.scraper.engine import CrawlEngine, SiteSpec
+from indoscraping.scraper.frontier import Frontier
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import fetch_pages
+from indoscraping.scraper.parsing import get_backend, make_soup, make_tree, node_text, partial_parser
+from indoscraping.scraper.sinks import JsonlSink, read_jsonl
+
+logger = logging.getLogger(__name__)
+
 BASE_URL = "https://www.bisnis.com"
 HEADERS = {'User-Agent': 'Mozilla/5.0'}
 
 def get_categories():
-    res = requests.get(f"{BASE_URL}/index", headers=HEADERS)
-    soup = BeautifulSoup(res.text, "html.parser")
+    url = f"{BASE_URL}/index"
+    res = http_client.get(url, headers=HEADERS, use_cache=True)
+    soup = make_soup(res.text)
     categories = {}
     for label in soup.select("label.indeks-radio"):
         match = re.search(r"categoryId=([^']+)", label.find("input").get("onclick", ""))
@@ -17,63 +28,131 @@ def get_categories():
             categories[label.text.strip()] = match.group(1)
     return categories
 
-def get_max_page(category_id, date_str):
-    res = requests.get(f"{BASE_URL}/index?categoryId={category_id}&type=indeks&date={date_str}", headers=HEADERS)
-    soup = BeautifulSoup(res.text, "html.parser")
+def index_page_url(category_id, date_str, page):
+    return f"{BASE_URL}/index?categoryId={category_id}&type=indeks&date={date_str}&page={page}"
+
+def parse_max_page(html):
+    soup = make_soup(html)
     total_page = soup.select_one("#total_page")
     return int(total_page['value']) if total_page else 1
 
+def parse_article_links(html):
+    soup = make_soup(html)
+    return [a.get("href", "") for a in soup.select("a.artLink") if a.get("href", "").startswith("http")]
+
+def get_max_page(category_id, date_str):
+    url = f"{BASE_URL}/index?categoryId={category_id}&type=indeks&date={date_str}"
+    res = http_client.get(url, headers=HEADERS, use_cache=True)
+    return parse_max_page(res.text)
+
 def get_article_links(category_id, date_str):
     max_page = get_max_page(category_id, date_str)
+
+    def fetch_page(page):
+        url = index_page_url(category_id, date_str, page)
+        return parse_article_links(http_client.get(url, headers=HEADERS, use_cache=True).text)
+
     links = set()
-    for page in range(1, max_page + 1):
-        url = f"{BASE_URL}/index?categoryId={category_id}&type=indeks&date={date_str}&page={page}"
-        soup = BeautifulSoup(requests.get(url, headers=HEADERS).text, "html.parser")
-        for a in soup.select("a.artLink"):
-            href = a.get("href", "")
-            if href.startswith("http"):
-                links.add(href)
+    for page_links in fetch_pages(fetch_page, range(1, max_page + 1)):
+        links.update(page_links)
     return list(links)
 
+# What parse_article reads
+ARTICLE_REGIONS = ('h1.detailsTitleCaption', 'div.detailsLead', 'div.detailsAuthor', 'div.detailsAttributeDates',
+                   'figure.detailsCoverImg', 'article.detailsContent', 'ul.detailsTagList')
+
+@partial_parser(ARTICLE_REGIONS)
+def parse_article(html, url):
+    if get_backend() == "selectolax":
+        return _parse_article_lexbor(html, url)
+
+    soup = make_soup(html)
+
+    data = Article(
+        url=url,
+        site="bisnis",
+        title=soup.find('h1', class_='detailsTitleCaption').get_text(strip=True) if soup.find('h1', class_='detailsTitleCaption') else '',
+        lead=soup.find('div', class_='detailsLead').get_text(strip=True) if soup.find('div', class_='detailsLead') else '',
+        published=soup.find('div', class_='detailsAttributeDates').get_text(strip=True) if soup.find('div', class_='detailsAttributeDates') else '',
+        tags=[a.get_text(strip=True) for a in soup.select('ul.detailsTagList a.detailsTagLink')],
+        content=[p.get_text(strip=True) for p in soup.select('article.detailsContent p') if p.get_text(strip=True) and len(p.get_text(strip=True)) > 20],
+    )
+
+    for item in soup.select('div.detailsAuthor div.detailsAuthorItem'):
+        text = item.get_text(strip=True)
+        if text.startswith('Penulis :'):
+            data.authors = [text.replace('Penulis :', '').strip()]
+        elif text.startswith('Editor :'):
+            data.editor = text.replace('Editor :', '').strip()
+
+    img_tag = soup.select_one('figure.detailsCoverImg img')
+    caption = soup.select_one('figcaption.detailsImgCaption')
+    if img_tag:
+        data.image_url = img_tag.get('src', '')
+        data.image_alt = img_tag.get('alt', '')
+    if caption:
+        data.image_caption = caption.get_text(strip=True)
+
+    return data
+
+def _parse_article_lexbor(html, url):
+    tree = make_tree(html)
+
+    def first_text(selector, default=''):
+        node = tree.css_first(selector)
+        return node_text(node) if node else default
+
+    data = Article(
+        url=url,
+        site="bisnis",
+        title=first_text('h1.detailsTitleCaption'),
+        lead=first_text('div.detailsLead'),
+        published=first_text('div.detailsAttributeDates'),
+        tags=[node_text(a) for a in tree.css('ul.detailsTagList a.detailsTagLink')],
+        content=[text for text in (node_text(p) for p in tree.css('article.detailsContent p')) if text and len(text) > 20],
+    )
+
+    for item in tree.css('div.detailsAuthor div.detailsAuthorItem'):
+        text = node_text(item)
+        if text.startswith('Penulis :'):
+            data.authors = [text.replace('Penulis :', '').strip()]
+        elif text.startswith('Editor :'):
+            data.editor = text.replace('Editor :', '').strip()
+
+    img_tag = tree.css_first('figure.detailsCoverImg img')
+    caption = tree.css_first('figcaption.detailsImgCaption')
+    if img_tag:
+        data.image_url = img_tag.attributes.get('src') or ''
+        data.image_alt = img_tag.attributes.get('alt') or ''
+    if caption:
+        data.image_caption = node_text(caption)
+
+    return data
+
 def scrape_article(url):
     try:
-        res = requests.get(url, headers=HEADERS)
+        res = http_client.get(url, headers=HEADERS)
         res.raise_for_status()
-        soup = BeautifulSoup(res.content, 'html.parser')
-
-        data = {
-            'url': url,
-            'scraped_at': datetime.now().isoformat(),
-            'title': soup.find('h1', class_='detailsTitleCaption').get_text(strip=True) if soup.find('h1', class_='detailsTitleCaption') else 'No title found',
-            'lead': soup.find('div', class_='detailsLead').get_text(strip=True) if soup.find('div', class_='detailsLead') else '',
-            'publish_date': soup.find('div', class_='detailsAttributeDates').get_text(strip=True) if soup.find('div', class_='detailsAttributeDates') else '',
-            'author': '',
-            'editor': '',
-            'tags': [a.get_text(strip=True) for a in soup.select('ul.detailsTagList a.detailsTagLink')],
-            'content': [p.get_text(strip=True) for p in soup.select('article.detailsContent p') if p.get_text(strip=True) and len(p.get_text(strip=True)) > 20],
-            'image_url': '',
-            'image_alt': '',
-            'image_caption': ''
-        }
-
-        for item in soup.select('div.detailsAuthor div.detailsAuthorItem'):
-            text = item.get_text(strip=True)
-            if text.startswith('Penulis :'):
-                data['author'] = text.replace('Penulis :', '').strip()
-            elif text.startswith('Editor :'):
-                data['editor'] = text.replace('Editor :', '').strip()
-
-        img_tag = soup.select_one('figure.detailsCoverImg img')
-        caption = soup.select_one('figcaption.detailsImgCaption')
-        if img_tag:
-            data['image_url'] = img_tag.get('src', '')
-            data['image_alt'] = img_tag.get('alt', '')
-        if caption:
-            data['image_caption'] = caption.get_text(strip=True)
-
-        return data
+        return parse_article(res.content, url)
+    except requests.RequestException as e:
+        logger.warning(f"Failed to fetch article {url}: {e}")
+        return None
     except Exception as e:
-        return {'url': url, 'error': str(e)}
+        logger.exception(f"Unexpected error while scraping article {url}: {e}")
+        return None
+
+def get_category_ids():
+    return list(get_categories().values())
+
+SITE = SiteSpec(
+    name="bisnis",
+    get_categories=get_category_ids,
+    index_page_url=index_page_url,
+    parse_index=parse_article_links,
+    parse_article=parse_article,
+    parse_max_page=parse_max_page,
+    date_format="%Y-%m-%d",
+)
 
 def save_to_file(data, filename='bisnis_articles.json'):
     with open(filename, 'w', encoding='utf-8') as f:
@@ -81,12 +160,17 @@ def save_to_file(data, filename='bisnis_articles.json'):
     print(f"Saved {len(data)} articles to {filename}")
 
 if __name__ == "__main__":
+    import sys
+
     date = "2025-07-28"
     categories = get_categories()
     selected_category_id = categories.get("Ekonomi", "43")  # Default to "43" if not found
 
-    links = get_article_links(selected_category_id, date)
-    print(f"Found {len(links)} unique articles. Scraping...")
+    # The frontier makes an interrupted or repeated run only scrape what is missing
+    with Frontier('bisnis_frontier.sqlite') as frontier, CrawlEngine(frontier=frontier, incremental="--incremental" in sys.argv) as engine, \
+            JsonlSink('bisnis_articles.jsonl', append=True) as sink:
+        count = engine.run_to(sink, SITE, date, categories=[selected_category_id])
+    print(f"Saved {count} articles to bisnis_articles.jsonl")
 
-    articles = [scrape_article(url) for url in links]
-    save_to_file(articles)
+    if "--pretty" in sys.argv:
+        save_to_file(list(read_jsonl('bisnis_articles.jsonl')))
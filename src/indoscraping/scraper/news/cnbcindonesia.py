@@ -1,13 +1,20 @@
 import requests
 import logging
 import time
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import datetime
 import json
 import os
 
 from fake_useragent import UserAgent
+
+from indoscraping.scraper.client import http_client
+from indoscraping.scraper.engine import SiteSpec
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import walk_until_empty
+from indoscraping.scraper.parsing import make_soup, partial_parser
+from indoscraping.scraper.sinks import JsonlSink, read_jsonl
+
 ua = UserAgent()
 
 # Configure logging
@@ -33,11 +40,11 @@ def get_categories():
     start_time = time.time()
     
     try:
-        res = requests.get(INDEX_URL, headers=HEADERS)
+        res = http_client.get(INDEX_URL, headers=HEADERS, use_cache=True)
         res.raise_for_status()
         logger.debug(f"Categories page response status: {res.status_code}")
         
-        soup = BeautifulSoup(res.text, "html.parser")
+        soup = make_soup(res.text)
         select = soup.find("select", {"onchange": "articleKanalHandle(this)"})
         
         if not select:
@@ -70,115 +77,114 @@ def get_categories():
         logger.error(f"Unexpected error fetching categories: {str(e)}")
         return []
 
+def index_page_url(category, date_str, page):
+    return f"{BASE_URL}/{category['slug']}/indeks/{category['id']}?date={date_str}&page={page}"
+
+def parse_article_links(html):
+    soup = make_soup(html)
+    return [tag.get("href") for tag in soup.select("article a") if tag.get("href")]
+
 def get_articles_for_category(category, date_str):
     slug = category['slug']
-    cat_id = category['id']
-    articles = []
     
     logger.info(f"Starting to fetch articles for category: {category['name']} (slug: {slug})")
     start_time = time.time()
     
-    page = 1
-    total_articles = 0
-    
-    try:
-        while True:
-            url = f"{BASE_URL}/{slug}/indeks/{cat_id}?date={date_str}&page={page}"
-            logger.debug(f"Fetching page {page} for category {category['name']}: {url}")
+    def fetch_page(page):
+        url = index_page_url(category, date_str, page)
+        logger.debug(f"Fetching page {page} for category {category['name']}: {url}")
+        
+        try:
+            res = http_client.get(url, headers=HEADERS, use_cache=True)
+            res.raise_for_status()
             
-            try:
-                res = requests.get(url, headers=HEADERS)
-                res.raise_for_status()
-                
-                soup = BeautifulSoup(res.text, "html.parser")
-                article_tags = soup.select("article a")
-
-                if not article_tags:
-                    logger.debug(f"No articles found on page {page}, stopping pagination")
-                    break
-
-                page_articles = 0
-                for tag in article_tags:
-                    href = tag.get("href")
-                    if href:
-                        articles.append(href)
-                        page_articles += 1
-
-                logger.info(f"Fetched {page_articles} articles from {slug} page {page}")
-                total_articles += page_articles
-                page += 1
-                
-                # Add small delay to be respectful
-                time.sleep(0.5)
-                
-            except requests.RequestException as e:
-                logger.error(f"Error fetching page {page} for category {category['name']}: {str(e)}")
-                break
-            except Exception as e:
-                logger.error(f"Unexpected error on page {page} for category {category['name']}: {str(e)}")
-                break
+            page_links = parse_article_links(res.text)
+            if page_links:
+                logger.info(f"Fetched {len(page_links)} articles from {slug} page {page}")
+            else:
+                logger.debug(f"No articles found on page {page}, stopping pagination")
+            return page_links
+            
+        except requests.RequestException as e:
+            logger.error(f"Error fetching page {page} for category {category['name']}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error on page {page} for category {category['name']}: {str(e)}")
+        return []
     
-    except Exception as e:
-        logger.error(f"Critical error in get_articles_for_category for {category['name']}: {str(e)}")
+    # The last page is only known once an empty one comes back, so a few
+    # pages are requested ahead of it at a time
+    articles = walk_until_empty(fetch_page)
+    total_articles = len(articles)
     
     elapsed_time = time.time() - start_time
     logger.info(f"Completed fetching {total_articles} articles for {category['name']} in {elapsed_time:.2f}s")
     
     return articles
 
+# What parse_article reads
+ARTICLE_REGIONS = ("h1", "div.text-cm.text-gray", "div.mb-1.text-base.font-semibold", "div.detail-text",
+                   "section.px-4.py-4.stretch.bg-white")
+
+@partial_parser(ARTICLE_REGIONS)
+def parse_article(html, url):
+    soup = make_soup(html)
+
+    # Extract title
+    title_tag = soup.find("h1")
+    title = title_tag.get_text(strip=True) if title_tag else ""
+    logger.debug(f"Extracted title: {title[:50]}...")
+
+    # Extract publication date
+    date_tag = soup.find("div", class_="text-cm text-gray")
+    date = date_tag.get_text(strip=True) if date_tag else ""
+    logger.debug(f"Extracted date: {date}")
+
+    # Extract author
+    author_tag = soup.find("div", class_="mb-1 text-base font-semibold")
+    author = author_tag.get_text(strip=True) if author_tag else ""
+    logger.debug(f"Extracted author: {author}")
+
+    # Extract main article content
+    content_div = soup.find("div", class_="detail-text")
+    paragraphs = content_div.find_all("p") if content_div else []
+    content = [text for text in (p.get_text(strip=True) for p in paragraphs) if text]
+    logger.debug(f"Extracted {len(content)} paragraphs")
+
+    # Extract tags
+    tag_section = soup.find('section', class_='px-4 py-4 stretch bg-white')
+    tags, tag_urls = [], []
+    if tag_section:
+        for tag in tag_section.find_all('a'):
+            tags.append(tag.get_text(strip=True))
+            tag_urls.append(tag['href'])
+    logger.debug(f"Extracted {len(tags)} tags")
+
+    return Article(
+        url=url,
+        site="cnbcindonesia",
+        title=title,
+        published=date,
+        authors=[author] if author else [],
+        content=content,
+        tags=tags,
+        extra={"tag_urls": tag_urls} if tag_urls else {},
+    )
+
 def scrape_article(url):
     logger.info(f"Starting to scrape article: {url}")
     start_time = time.time()
     
     try:
-        response = requests.get(url, headers=HEADERS)
+        response = http_client.get(url, headers=HEADERS)
         response.raise_for_status()
         logger.debug(f"Article response status: {response.status_code}")
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Extract title
-        title_tag = soup.find("h1")
-        title = title_tag.get_text(strip=True) if title_tag else "No title"
-        logger.debug(f"Extracted title: {title[:50]}...")
-
-        # Extract publication date
-        date_tag = soup.find("div", class_="text-cm text-gray")
-        date = date_tag.get_text(strip=True) if date_tag else "No date found"
-        logger.debug(f"Extracted date: {date}")
-
-        # Extract author
-        author_tag = soup.find("div", class_="mb-1 text-base font-semibold")
-        author = author_tag.get_text(strip=True) if author_tag else "No author found"
-        logger.debug(f"Extracted author: {author}")
-
-        # Extract main article content
-        content_div = soup.find("div", class_="detail-text")
-        paragraphs = content_div.find_all("p") if content_div else []
-        article_text = '\n\n'.join(p.get_text(strip=True) for p in paragraphs)
-        logger.debug(f"Extracted content length: {len(article_text)} characters")
-
-        # Extract tags
-        tag_section = soup.find('section', class_='px-4 py-4 stretch bg-white')
-        tags = []
-        if tag_section:
-            for tag in tag_section.find_all('a'):
-                tag_text = tag.get_text(strip=True)
-                tag_href = tag['href']
-                tags.append((tag_text, tag_href))
-        logger.debug(f"Extracted {len(tags)} tags")
+        article = parse_article(response.text, url)
 
         elapsed_time = time.time() - start_time
-        logger.info(f"Successfully scraped article in {elapsed_time:.2f}s: {title[:50]}...")
+        logger.info(f"Successfully scraped article in {elapsed_time:.2f}s: {article.title[:50]}...")
         
-        return {
-            "title": title,
-            "date": date,
-            "author": author,
-            "content": article_text,
-            "tags": tags,
-            "url": url
-        }
+        return article
         
     except requests.RequestException as e:
         logger.error(f"Network error scraping article {url}: {str(e)}")
@@ -187,6 +193,19 @@ def scrape_article(url):
         logger.error(f"Error scraping article {url}: {str(e)}", exc_info=True)
         raise
 
+def category_fields(category):
+    return {'category': category['name'], 'category_slug': category['slug']}
+
+SITE = SiteSpec(
+    name="cnbcindonesia",
+    get_categories=get_categories,
+    index_page_url=index_page_url,
+    parse_index=parse_article_links,
+    parse_article=parse_article,
+    category_fields=category_fields,
+    date_format="%Y/%m/%d",
+)
+
 def export_to_json(data, filename=None):
     """Export scraped data to JSON file"""
     logger.info("Starting data export to JSON")
@@ -218,7 +237,7 @@ def export_to_json(data, filename=None):
         logger.error(f"Failed to export data to JSON: {str(e)}", exc_info=True)
         raise
 
-def main():
+def main(pretty_json=False):
     logger.info("Starting CNBC Indonesia scraper")
     overall_start_time = time.time()
     
@@ -231,66 +250,65 @@ def main():
         today = datetime.datetime.now().strftime("%Y/%m/%d")
         logger.info(f"Scraping articles for date: {today}")
         
-        all_articles = []
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join("output", f"cnbc_scraped_{timestamp}.jsonl")
         total_categories = len(categories)
         
-        # Scrape articles from all categories
-        for cat_idx, cat in enumerate(categories[:1], 1):  # Limit to first category for demo
-            category_start_time = time.time()
-            logger.info(f"Processing category {cat_idx}/{total_categories}: {cat['name']}")
-            
-            try:
-                links = get_articles_for_category(cat, today)
-                logger.info(f"Found {len(links)} articles in category '{cat['name']}'")
-                
-                if not links:
-                    logger.warning(f"No articles found for category: {cat['name']}")
-                    continue
+        # Articles are streamed to JSONL as they are scraped
+        with JsonlSink(filepath) as sink:
+            for cat_idx, cat in enumerate(categories[:1], 1):  # Limit to first category for demo
+                category_start_time = time.time()
+                logger.info(f"Processing category {cat_idx}/{total_categories}: {cat['name']}")
                 
-                # Scrape articles and collect data
-                category_articles = []
-                total_links = min(5, len(links))  # Limit to 5 articles for demo
-                
-                for i, link in enumerate(links[:5], 1):
-                    logger.info(f"Scraping article {i}/{total_links} in {cat['name']}: {link}")
+                try:
+                    links = get_articles_for_category(cat, today)
+                    logger.info(f"Found {len(links)} articles in category '{cat['name']}'")
                     
-                    try:
-                        article_data = scrape_article(link)
-                        article_data['category'] = cat['name']
-                        article_data['category_slug'] = cat['slug']
-                        category_articles.append(article_data)
-                        
-                        logger.debug(f"Successfully scraped article {i}/{total_links}")
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to scrape article {link}: {str(e)}", exc_info=True)
+                    if not links:
+                        logger.warning(f"No articles found for category: {cat['name']}")
                         continue
-                
-                all_articles.extend(category_articles)
-                category_elapsed = time.time() - category_start_time
-                logger.info(f"Completed category '{cat['name']}' - scraped {len(category_articles)} articles in {category_elapsed:.2f}s")
-                
-            except Exception as e:
-                logger.error(f"Error processing category {cat['name']}: {str(e)}", exc_info=True)
-                continue
+                    
+                    category_count = 0
+                    total_links = min(5, len(links))  # Limit to 5 articles for demo
+                    
+                    for i, link in enumerate(links[:5], 1):
+                        logger.info(f"Scraping article {i}/{total_links} in {cat['name']}: {link}")
+                        
+                        try:
+                            article_data = scrape_article(link)
+                            article_data.update(category_fields(cat))
+                            sink.write(article_data)
+                            category_count += 1
+                            
+                            logger.debug(f"Successfully scraped article {i}/{total_links}")
+                            
+                        except Exception as e:
+                            logger.error(f"Failed to scrape article {link}: {str(e)}", exc_info=True)
+                            continue
+                    
+                    category_elapsed = time.time() - category_start_time
+                    logger.info(f"Completed category '{cat['name']}' - scraped {category_count} articles in {category_elapsed:.2f}s")
+                    
+                except Exception as e:
+                    logger.error(f"Error processing category {cat['name']}: {str(e)}", exc_info=True)
+                    continue
         
-        # Export all articles to JSON
-        if all_articles:
-            logger.info(f"Preparing to export {len(all_articles)} total articles")
-            
+        if not sink.count:
+            logger.warning("No articles were scraped")
+        elif pretty_json:
+            # Pretty JSON with metadata is opt-in
+            articles = list(read_jsonl(filepath))
             export_data = {
                 "metadata": {
-                    "total_articles": len(all_articles),
+                    "total_articles": len(articles),
                     "scraped_at": datetime.datetime.now().isoformat(),
                     "date_filter": today,
                     "source": "CNBC Indonesia"
                 },
-                "articles": all_articles
+                "articles": articles
             }
             
-            export_to_json(export_data)
-        else:
-            logger.warning("No articles were scraped")
+            export_to_json(export_data, f"cnbc_scraped_{timestamp}.json")
     
     except Exception as e:
         logger.error(f"Critical error in main scraper: {str(e)}", exc_info=True)
@@ -300,4 +318,5 @@ def main():
         logger.info(f"CNBC Indonesia scraper completed in {overall_elapsed:.2f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    main(pretty_json="--pretty" in sys.argv)
@@ -1,17 +1,19 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-import time
-import json
+
+from indoscraping.scraper.client import http_client
+from indoscraping.scraper.engine import SiteSpec
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import walk_until_empty
+from indoscraping.scraper.parsing import make_soup, partial_parser
+from indoscraping.scraper.sinks import JsonlSink, export_json, read_jsonl
 
 BASE_URL = "https://www.cnnindonesia.com"
 INDEX_URL = f"{BASE_URL}/indeks"
-DATE = datetime.now().strftime("%Y/%m/%d")
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
 def get_categories():
-    res = requests.get(INDEX_URL, headers=HEADERS)
-    soup = BeautifulSoup(res.text, "html.parser")
+    res = http_client.get(INDEX_URL, headers=HEADERS, use_cache=True)
+    soup = make_soup(res.text)
     select = soup.find("select", {"id": "kanalOption"})
     return [
         {"label": opt["data-label"], "id": opt["value"]}
@@ -19,48 +21,69 @@ def get_categories():
         if opt.get("data-label") and opt.get("value")
     ]
 
-def get_article_links(category_label, category_id, max_pages=1):
-    page, links = 1, []
-    while page <= max_pages:
-        url = f"{BASE_URL}/{category_label}/indeks/{category_id}?date={DATE}&page={page}"
-        res = requests.get(url, headers=HEADERS)
-        soup = BeautifulSoup(res.text, "html.parser")
-        articles = soup.select("a.flex.group.items-center.gap-4")
-        if not articles:
-            break
-        links += [a["href"] for a in articles if a.get("href")]
-        page += 1
-        time.sleep(0.5)
-    return links
+def index_page_url(category, date_str, page):
+    return f"{BASE_URL}/{category['label']}/indeks/{category['id']}?date={date_str}&page={page}"
 
-def scrape_article(url):
-    res = requests.get(url, headers=HEADERS)
-    soup = BeautifulSoup(res.text, 'html.parser')
+def parse_article_links(html):
+    soup = make_soup(html)
+    return [a["href"] for a in soup.select("a.flex.group.items-center.gap-4") if a.get("href")]
+
+def get_article_links(category_label, category_id, max_pages=1, date_str=None):
+    category = {"label": category_label, "id": category_id}
+    date_str = date_str or datetime.now().strftime("%Y/%m/%d")
+
+    def fetch_page(page):
+        res = http_client.get(index_page_url(category, date_str, page), headers=HEADERS, use_cache=True)
+        return parse_article_links(res.text)
+
+    return walk_until_empty(fetch_page, max_pages=max_pages)
+
+# What parse_article reads
+ARTICLE_REGIONS = ("h1.text-[28px]", "div.text-cnn_grey", "div.detail-text", "div.flex.flex-wrap.gap-3")
+
+@partial_parser(ARTICLE_REGIONS)
+def parse_article(html, url):
+    soup = make_soup(html)
     title = soup.find('h1', class_='text-[28px]')
     date = soup.find('div', class_='text-cnn_grey')
     tags_block = soup.find('div', class_='flex flex-wrap gap-3')
     content_div = soup.find('div', class_='detail-text')
 
-    return {
-        "url": url,
-        "title": title.get_text(strip=True) if title else "",
-        "date": date.get_text(strip=True) if date else "",
-        "tags": [a.get_text(strip=True) for a in tags_block.find_all('a')] if tags_block else [],
-        "content": "\n\n".join(p.get_text(strip=True) for p in content_div.find_all('p') if p.get_text(strip=True)) if content_div else " "
-    }
+    return Article(
+        url=url,
+        site="cnnindonesia",
+        title=title.get_text(strip=True) if title else "",
+        published=date.get_text(strip=True) if date else "",
+        tags=[a.get_text(strip=True) for a in tags_block.find_all('a')] if tags_block else [],
+        content=[p.get_text(strip=True) for p in content_div.find_all('p') if p.get_text(strip=True)] if content_div else [],
+    )
+
+def scrape_article(url):
+    res = http_client.get(url, headers=HEADERS)
+    res.raise_for_status()
+    return parse_article(res.text, url)
+
+SITE = SiteSpec(
+    name="cnnindonesia",
+    get_categories=get_categories,
+    index_page_url=index_page_url,
+    parse_index=parse_article_links,
+    parse_article=parse_article,
+    date_format="%Y/%m/%d",
+)
 
-def main():
-    all_articles = []
+def main(pretty_json=False):
     categories = get_categories()
-    for cat in categories[:1]:  # limit to first category
-        links = get_article_links(cat['label'], cat['id'], max_pages=1)
-        for link in links[:3]:
-            article = scrape_article(link)
-            all_articles.append(article)
+    with JsonlSink("cnn_articles.jsonl") as sink:
+        for cat in categories[:1]:  # limit to first category
+            links = get_article_links(cat['label'], cat['id'], max_pages=1)
+            for link in links[:3]:
+                sink.write(scrape_article(link))
+    print(f"Saved {sink.count} articles to cnn_articles.jsonl")
     
-    with open("cnn_articles.json", "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(all_articles)} articles to cnn_articles.json")
+    if pretty_json:
+        export_json(read_jsonl("cnn_articles.jsonl"), "cnn_articles.json")
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(pretty_json="--pretty" in sys.argv)
@@ -1,12 +1,19 @@
-import json
 import logging
-import time
+import re
 from urllib.parse import quote, urlparse, parse_qs
 
 import requests
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 
+from indoscraping.scraper.client import http_client
+from indoscraping.scraper.dedup import canonical_url
+from indoscraping.scraper.engine import CrawlEngine, SiteSpec
+from indoscraping.scraper.frontier import Frontier
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import fetch_pages
+from indoscraping.scraper.parsing import get_backend, make_soup, make_tree, node_text, partial_parser
+from indoscraping.scraper.sinks import JsonlSink, export_json, read_jsonl
+
 # Configure logging with proper formatting and level
 logging.basicConfig(
     level=logging.INFO,
@@ -29,9 +36,9 @@ def get_categories_urls(start_url="https://news.detik.com/indeks"):
     logger.info(f"Fetching categories from: {start_url}")
     
     try:
-        resp = requests.get(start_url, headers=HEADERS)
+        resp = http_client.get(start_url, headers=HEADERS, use_cache=True)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text)
         
         kanal_urls = []
         nav_links = soup.select("nav.static-nav a[href$='/indeks']")
@@ -53,6 +60,30 @@ def get_categories_urls(start_url="https://news.detik.com/indeks"):
         logger.exception(f"Unexpected error while fetching categories: {e}")
         return []
 
+def parse_max_page(html):
+    """Return the highest page number linked from an index page."""
+    soup = make_soup(html)
+    
+    max_page = 1
+    pagination_links = soup.select("div.pagination a[href*='?page=']")
+    
+    for a in pagination_links:
+        href = a.get("href")
+        if href:
+            parsed = urlparse(href)
+            qs = parse_qs(parsed.query)
+            page_nums = qs.get("page")
+            if page_nums:
+                try:
+                    num = int(page_nums[0])
+                    if num > max_page:
+                        max_page = num
+                except ValueError:
+                    logger.warning(f"Invalid page number: {page_nums[0]}")
+                    continue
+    
+    return max_page
+
 def get_max_page(kanal_url, date_str):
     """Get the maximum page number for a given kanal and date."""
     logger.info(f"Getting max page for {kanal_url} on date {date_str}")
@@ -61,27 +92,9 @@ def get_max_page(kanal_url, date_str):
         encoded_date = quote(date_str, safe="")
         url = f"{kanal_url}?date={encoded_date}"
         
-        resp = requests.get(url, headers=HEADERS)
+        resp = http_client.get(url, headers=HEADERS, use_cache=True)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        max_page = 1
-        pagination_links = soup.select("div.pagination a[href*='?page=']")
-        
-        for a in pagination_links:
-            href = a.get("href")
-            if href:
-                parsed = urlparse(href)
-                qs = parse_qs(parsed.query)
-                page_nums = qs.get("page")
-                if page_nums:
-                    try:
-                        num = int(page_nums[0])
-                        if num > max_page:
-                            max_page = num
-                    except ValueError:
-                        logger.warning(f"Invalid page number: {page_nums[0]}")
-                        continue
+        max_page = parse_max_page(resp.text)
         
         logger.info(f"Max page for {kanal_url}: {max_page}")
         return max_page
@@ -93,39 +106,40 @@ def get_max_page(kanal_url, date_str):
         logger.exception(f"Unexpected error while getting max page: {e}")
         return 1
 
+def index_page_url(kanal_url, date_str, page):
+    """Build the URL of one index page of a kanal."""
+    return f"{kanal_url}?page={page}&date={quote(date_str, safe='')}"
+
+def parse_article_links(html):
+    """Return the article links listed on an index page."""
+    soup = make_soup(html)
+    return [link.get("href") for link in soup.select("a.media__link") if link.get("href")]
+
 def scrape_articles(kanal_url, date_str):
     """Scrape all article URLs from a kanal for a specific date."""
     logger.info(f"Starting article scraping for {kanal_url} on {date_str}")
     
     try:
-        encoded_date = quote(date_str, safe="")
         max_page = get_max_page(kanal_url, date_str)
         
-        articles = []
-        
-        for page in range(1, max_page + 1):
-            url = f"{kanal_url}?page={page}&date={encoded_date}"
+        def fetch_page(page):
+            url = index_page_url(kanal_url, date_str, page)
             logger.debug(f"Fetching page {page}/{max_page}: {url}")
             
             try:
-                resp = requests.get(url, headers=HEADERS)
+                resp = http_client.get(url, headers=HEADERS, use_cache=True)
                 resp.raise_for_status()
-                soup = BeautifulSoup(resp.text, "html.parser")
-                
-                links = soup.select("a.media__link")
-                page_articles = []
-                
-                for link in links:
-                    href = link.get("href")
-                    if href:
-                        page_articles.append(href)
-                
-                articles.extend(page_articles)
+                page_articles = parse_article_links(resp.text)
                 logger.debug(f"Page {page}: found {len(page_articles)} articles")
+                return page_articles
                 
             except requests.RequestException as e:
                 logger.error(f"Failed to fetch page {page} for {kanal_url}: {e}")
-                continue
+                return []
+        
+        # The page count is known, so every index page is requested at once
+        articles = [link for page_articles in fetch_pages(fetch_page, range(1, max_page + 1))
+                    for link in page_articles]
         
         logger.info(f"Total articles found for {kanal_url}: {len(articles)}")
         return articles
@@ -134,70 +148,136 @@ def scrape_articles(kanal_url, date_str):
         logger.exception(f"Unexpected error while scraping articles: {e}")
         return []
 
+# What parse_detik_article reads
+ARTICLE_REGIONS = ("h1", "div.detail__author", "div.detail__date", "div.nav", "div.detail__body-text",
+                   "div.text--detail")
+
+@partial_parser(ARTICLE_REGIONS)
+def parse_detik_article(html, url):
+    """Parse a detik.com article page into an ``Article``."""
+    if get_backend() == "selectolax":
+        return _parse_detik_article_lexbor(html, url)
+    
+    soup = make_soup(html)
+    
+    # Extract title
+    title_tag = soup.find('h1', class_='detail__title') or soup.find('h1')
+    title = title_tag.get_text(strip=True) if title_tag else None
+    if not title:
+        logger.warning(f"No title found for {url}")
+    
+    # Extract author
+    author_tag = soup.find('div', class_='detail__author')
+    author = None
+    if author_tag:
+        for span in author_tag.find_all('span'):
+            span.decompose()
+        author = author_tag.get_text(strip=True)
+    else:
+        logger.debug(f"No author found for {url}")
+    
+    # Extract date
+    date_tag = soup.find('div', class_='detail__date')
+    date = date_tag.get_text(strip=True) if date_tag else None
+    if not date:
+        logger.warning(f"No date found for {url}")
+    
+    # Extract tags
+    tag_div = soup.find('div', class_='nav')
+    tags, tag_urls = [], []
+    if tag_div:
+        for a in tag_div.find_all('a', class_='nav__item'):
+            tags.append(a.get_text(strip=True))
+            tag_urls.append(a.get('href'))
+    logger.debug(f"Found {len(tags)} tags for {url}")
+    
+    # Extract content
+    content_div = soup.find('div', class_='detail__body-text') or soup.find('div', class_='text--detail')
+    paragraphs = []
+    if content_div:
+        for p in content_div.find_all('p'):
+            txt = p.get_text(strip=True)
+            if txt:
+                paragraphs.append(txt)
+    
+    if not paragraphs:
+        logger.warning(f"No content found for {url}")
+    
+    return Article(
+        url=url,
+        site="detik",
+        title=title or "",
+        authors=[author] if author else [],
+        published=date or "",
+        tags=tags,
+        content=paragraphs,
+        extra={"tag_urls": tag_urls} if tag_urls else {},
+    )
+
+def _parse_detik_article_lexbor(html, url):
+    """selectolax port of ``parse_detik_article`` with identical output."""
+    tree = make_tree(html)
+    
+    title_tag = tree.css_first('h1.detail__title') or tree.css_first('h1')
+    title = node_text(title_tag) if title_tag else None
+    if not title:
+        logger.warning(f"No title found for {url}")
+    
+    author_tag = tree.css_first('div.detail__author')
+    author = None
+    if author_tag:
+        for span in author_tag.css('span'):
+            span.decompose()
+        author = node_text(author_tag)
+    else:
+        logger.debug(f"No author found for {url}")
+    
+    date_tag = tree.css_first('div.detail__date')
+    date = node_text(date_tag) if date_tag else None
+    if not date:
+        logger.warning(f"No date found for {url}")
+    
+    tag_div = tree.css_first('div.nav')
+    tags, tag_urls = [], []
+    if tag_div:
+        for a in tag_div.css('a.nav__item'):
+            tags.append(node_text(a))
+            tag_urls.append(a.attributes.get('href'))
+    logger.debug(f"Found {len(tags)} tags for {url}")
+    
+    content_div = tree.css_first('div.detail__body-text') or tree.css_first('div.text--detail')
+    paragraphs = []
+    if content_div:
+        for p in content_div.css('p'):
+            txt = node_text(p)
+            if txt:
+                paragraphs.append(txt)
+    
+    if not paragraphs:
+        logger.warning(f"No content found for {url}")
+    
+    return Article(
+        url=url,
+        site="detik",
+        title=title or "",
+        authors=[author] if author else [],
+        published=date or "",
+        tags=tags,
+        content=paragraphs,
+        extra={"tag_urls": tag_urls} if tag_urls else {},
+    )
+
 def scrape_detik_article(url):
     """Scrape a single article from detik.com."""
     logger.info(f"Scraping article: {url}")
     
     try:
         headers = {"User-Agent": ua.random}
-        resp = requests.get(url, headers=headers)
+        resp = http_client.get(url, headers=headers)
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        # Extract title
-        title_tag = soup.find('h1', class_='detail__title') or soup.find('h1')
-        title = title_tag.get_text(strip=True) if title_tag else None
-        if not title:
-            logger.warning(f"No title found for {url}")
-        
-        # Extract author
-        author_tag = soup.find('div', class_='detail__author')
-        author = None
-        if author_tag:
-            for span in author_tag.find_all('span'):
-                span.decompose()
-            author = author_tag.get_text(strip=True)
-        else:
-            logger.debug(f"No author found for {url}")
-        
-        # Extract date
-        date_tag = soup.find('div', class_='detail__date')
-        date = date_tag.get_text(strip=True) if date_tag else None
-        if not date:
-            logger.warning(f"No date found for {url}")
-        
-        # Extract tags
-        tag_div = soup.find('div', class_='nav')
-        tags = []
-        if tag_div:
-            for a in tag_div.find_all('a', class_='nav__item'):
-                tag_text = a.get_text(strip=True)
-                tag_href = a.get('href')
-                tags.append({'text': tag_text, 'href': tag_href})
-        logger.debug(f"Found {len(tags)} tags for {url}")
-        
-        # Extract content
-        content_div = soup.find('div', class_='detail__body-text') or soup.find('div', class_='text--detail')
-        paragraphs = []
-        if content_div:
-            for p in content_div.find_all('p'):
-                txt = p.get_text(strip=True)
-                if txt:
-                    paragraphs.append(txt)
-        
-        if not paragraphs:
-            logger.warning(f"No content found for {url}")
-        
-        article_data = {
-            "url": url,
-            "title": title,
-            "author": author,
-            "date": date,
-            "tags": tags,
-            "content": paragraphs
-        }
+        article_data = parse_detik_article(resp.text, url)
         
-        logger.info(f"Successfully scraped article: {title}")
+        logger.info(f"Successfully scraped article: {article_data.title}")
         return article_data
         
     except requests.RequestException as e:
@@ -207,6 +287,26 @@ def scrape_detik_article(url):
         logger.exception(f"Unexpected error while scraping article {url}: {e}")
         raise
 
+def article_key(url):
+    """Return detik's article id, which is the same under every kanal an article is listed in."""
+    match = re.search(r"/d-(\d+)", url)
+    return f"detik:d-{match.group(1)}" if match else canonical_url(url)
+
+def get_kanal_urls():
+    """Return the index URL of every kanal, for use as crawl categories."""
+    return [href for _, href in get_categories_urls()]
+
+SITE = SiteSpec(
+    name="detik",
+    get_categories=get_kanal_urls,
+    index_page_url=index_page_url,
+    parse_index=parse_article_links,
+    parse_article=parse_detik_article,
+    parse_max_page=parse_max_page,
+    date_format="%m/%d/%Y",
+    url_key=article_key,
+)
+
 if __name__ == "__main__":
     import sys
     
@@ -221,39 +321,18 @@ if __name__ == "__main__":
     
     logger.info(f"Starting detik.com scraping for date: {date}")
     
-    all_articles = []
-    seen_urls = set()
+    # Articles are written as they complete and the frontier remembers what
+    # was already scraped, so an interrupted run resumes where it stopped
+    output_file = "detik_articles.jsonl"
+    with Frontier("detik_frontier.sqlite") as frontier, CrawlEngine(frontier=frontier, incremental="--incremental" in sys.argv) as engine, \
+            JsonlSink(output_file, append=True) as sink:
+        count = engine.run_to(sink, SITE, date, categories=['https://news.detik.com/indeks'])
+    logger.info(f"Scraping complete. Saved {count} articles to {output_file}")
     
-    # Get article links
-    article_links = scrape_articles('https://news.detik.com/indeks', date)
-    logger.info(f"Found {len(article_links)} total article links")
-    
-    # Scrape individual articles
-    for i, link in enumerate(article_links, 1):
-        if link in seen_urls:
-            logger.info(f"Skipping duplicate ({i}/{len(article_links)}): {link}")
-            continue
-        
+    # Pretty JSON is opt-in
+    if "--pretty" in sys.argv:
         try:
-            logger.info(f"Processing article ({i}/{len(article_links)}): {link}")
-            article_data = scrape_detik_article(link)
-            all_articles.append(article_data)
-            seen_urls.add(link)
-            
-            # Respectful delay between requests
-            time.sleep(1)
-            
+            export_json(read_jsonl(output_file), "detik_articles.json")
+            logger.info("Exported articles to detik_articles.json")
         except Exception as e:
-            logger.error(f"Failed to scrape article {link}: {e}")
-            continue
-    
-    # Save results
-    try:
-        output_file = "detik_articles.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(all_articles, f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Scraping complete. Saved {len(all_articles)} articles to {output_file}")
-        
-    except Exception as e:
-        logger.exception(f"Failed to save articles to JSON: {e}")
+            logger.exception(f"Failed to save articles to JSON: {e}")
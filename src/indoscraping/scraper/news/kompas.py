@@ -1,92 +1,158 @@
-import requests
-from bs4 import BeautifulSoup
-import json
+import logging
 from datetime import datetime
 
+import requests
+
+from indoscraping.scraper.client import http_client
+from indoscraping.scraper.engine import SiteSpec
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import walk_until_empty
+from indoscraping.scraper.parsing import get_backend, make_soup, make_tree, node_text, partial_parser
+from indoscraping.scraper.sinks import JsonlSink, export_json, read_jsonl
+
+logger = logging.getLogger(__name__)
+
 BASE_URL = "https://indeks.kompas.com/"
 DATE = "2025-07-23"
 
 def get_categories():
-    response = requests.get(BASE_URL)
-    soup = BeautifulSoup(response.text, "html.parser")
+    response = http_client.get(BASE_URL, use_cache=True)
+    soup = make_soup(response.text)
     select = soup.find("select", class_="form__select dropdown_sites")
     categories = [option.get("value") for option in select.find_all("option") if option.get("value") != "all"]
     return list(set(categories))
 
-def get_article_links(category, date):
-    page = 1
+def index_page_url(category, date, page):
+    return f"{BASE_URL}?site={category}&date={date}&page={page}"
+
+def parse_article_links(html):
+    soup = make_soup(html)
     links = []
+    for article in soup.find_all("div", class_="articleItem"):
+        a_tag = article.find("a", class_="article-link")
+        if a_tag and a_tag.get("href"):
+            links.append(a_tag["href"])
+    return links
+
+def get_article_links(category, date):
+    def fetch_page(page):
+        response = http_client.get(index_page_url(category, date, page), use_cache=True)
+        return parse_article_links(response.text)
     
-    while True:
-        url = f"{BASE_URL}?site={category}&date={date}&page={page}"
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        articles = soup.find_all("div", class_="articleItem")
-        
-        if not articles:
-            break
-            
-        for article in articles:
-            a_tag = article.find("a", class_="article-link")
-            if a_tag and a_tag.get("href"):
-                links.append(a_tag["href"])
-        
-        page += 1
+    return walk_until_empty(fetch_page)
+
+# What parse_kompas_article reads
+ARTICLE_REGIONS = ("title", ".read__time", ".credit-title-nameEditor", ".cover-photo", ".read__content", "ul.tag__article__wrap")
+
+@partial_parser(ARTICLE_REGIONS)
+def parse_kompas_article(html, url):
+    if get_backend() == "selectolax":
+        return _parse_kompas_article_lexbor(html, url)
     
-    return links
+    soup = make_soup(html)
+    
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    
+    raw_date = soup.select_one(".read__time")
+    date = raw_date.get_text(strip=True).split("-", 1)[-1].strip() if raw_date else ""
+    
+    journalists = [j.get_text(strip=True).rstrip(",") for j in soup.select(".credit-title-nameEditor")]
+    
+    tags = [t.get_text(strip=True) for t in soup.select("ul.tag__article__wrap li a")]
+    
+    img = soup.select_one(".cover-photo img")
+    image_url = img["src"] if img else ""
+    
+    paragraphs = soup.select(".read__content p")
+    content = [text for text in (p.get_text(strip=True) for p in paragraphs) if text]
+    
+    return Article(
+        url=url,
+        site="kompas",
+        title=title,
+        published=date,
+        authors=journalists,
+        tags=tags,
+        image_url=image_url,
+        content=content,
+    )
+
+def _parse_kompas_article_lexbor(html, url):
+    tree = make_tree(html)
+    
+    title_tag = tree.css_first("title")
+    title = node_text(title_tag) if title_tag else ""
+    
+    raw_date = tree.css_first(".read__time")
+    date = node_text(raw_date).split("-", 1)[-1].strip() if raw_date else ""
+    
+    journalists = [node_text(j).rstrip(",") for j in tree.css(".credit-title-nameEditor")]
+    
+    tags = [node_text(t) for t in tree.css("ul.tag__article__wrap li a")]
+    
+    img = tree.css_first(".cover-photo img")
+    image_url = (img.attributes["src"] or "") if img else ""
+    
+    paragraphs = tree.css(".read__content p")
+    content = [text for text in (node_text(p) for p in paragraphs) if text]
+    
+    return Article(
+        url=url,
+        site="kompas",
+        title=title,
+        published=date,
+        authors=journalists,
+        tags=tags,
+        image_url=image_url,
+        content=content,
+    )
 
 def scrape_kompas_article(url):
     try:
-        soup = BeautifulSoup(requests.get(url, headers={"User-Agent": "Mozilla/5.0"}).content, "html.parser")
-        
-        title = soup.title.get_text(strip=True) if soup.title else ""
-        
-        raw_date = soup.select_one(".read__time")
-        date = raw_date.get_text(strip=True).split("-", 1)[-1].strip() if raw_date else ""
-        
-        journalists = [j.get_text(strip=True).rstrip(",") for j in soup.select(".credit-title-nameEditor")]
-        
-        tags = [t.get_text(strip=True) for t in soup.select("ul.tag__article__wrap li a")]
-        
-        img = soup.select_one(".cover-photo img")
-        image_url = img["src"] if img else ""
-        
-        paragraphs = soup.select(".read__content p")
-        content = "\n".join(p.get_text(strip=True) for p in paragraphs)
-        
-        return {
-            "url": url,
-            "title": title,
-            "date": date,
-            "journalists": journalists,
-            "tags": tags,
-            "image_url": image_url,
-            "content": content
-        }
+        res = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"})
+        res.raise_for_status()
+        return parse_kompas_article(res.content, url)
+    except requests.RequestException as e:
+        logger.warning(f"Failed to fetch article {url}: {e}")
+        return None
     except Exception as e:
-        print(f"Error scraping {url}: {e}")
+        logger.exception(f"Unexpected error while scraping article {url}: {e}")
         return None
 
-def main():
+def category_fields(category):
+    return {"category": category}
+
+SITE = SiteSpec(
+    name="kompas",
+    get_categories=get_categories,
+    index_page_url=index_page_url,
+    parse_index=parse_article_links,
+    parse_article=parse_kompas_article,
+    category_fields=category_fields,
+    date_format="%Y-%m-%d",
+)
+
+def main(pretty_json=False, date=DATE):
     categories = get_categories()
-    all_articles = []
+    filename = f"kompas_articles_{date}.jsonl"
     
-    for category in categories[:1]:
-        print(f"Processing category: {category}")
-        article_links = get_article_links(category, DATE)
-        
-        for link in article_links[:2]:
-            article_data = scrape_kompas_article(link)
-            if article_data:
-                article_data["category"] = category
-                all_articles.append(article_data)
+    with JsonlSink(filename) as sink:
+        for category in categories[:1]:
+            print(f"Processing category: {category}")
+            article_links = get_article_links(category, date)
+            
+            for link in article_links[:2]:
+                article_data = scrape_kompas_article(link)
+                if article_data:
+                    article_data.category = category
+                    sink.write(article_data)
     
-    # Export to JSON
-    filename = f"kompas_articles_{DATE}.json"
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=2)
+    print(f"Exported {sink.count} articles to {filename}")
     
-    print(f"Exported {len(all_articles)} articles to {filename}")
+    # Pretty JSON is opt-in
+    if pretty_json:
+        export_json(read_jsonl(filename), f"kompas_articles_{date}.json")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    main(pretty_json="--pretty" in sys.argv)
\ No newline at end of file
@@ -1,19 +1,129 @@
+"""Narasi.tv articles from the gateway API behind narasi.tv.
+
+The ``tags/special`` feed lists articles newest first, a page at a time,
+and has no page count, so ``iter_articles`` pages through it ``window``
+pages at a time until the first empty page (see ``iter_until_empty``) and
+yields each page's articles as soon as the pages before it are in.
+
+With ``since`` only articles published after it are kept and paging
+stops at the first page without any, so a regular run costs a request or
+a few. ``main`` appends to ``narasi_articles.jsonl``, skipping articles
+already in it, and by default picks up from the newest ``publishDate``
+already in it::
+
+    indoscraping narasi
+    indoscraping narasi --since 2025-07-01 -o narasi_july.jsonl
+"""
+import logging
 import os
-import subprocess
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from indoscraping.scraper.client import http_client, retry_count
+from indoscraping.scraper.metrics import metrics
+from indoscraping.scraper.models import Article
+from indoscraping.scraper.pagination import iter_until_empty
+from indoscraping.scraper.sinks import JsonlSink, export_json, read_jsonl
+
+logger = logging.getLogger(__name__)
 
-# Absolute path to src/narasi/
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+API_URL = "https://gateway.narasi.tv/core/api/tags/special/{page}"
+SITE_URL = "https://narasi.tv"
+OUTPUT_FILE = "narasi_articles.jsonl"
 
-def run_node_script(script_relative_path="js/main.js"):
-    script_path = os.path.join(BASE_DIR, script_relative_path)
-    
+
+def parse_date(value):
+    """Return a ``publishDate`` (or a ``--since`` date) as a naive UTC datetime, or ``None``."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace(" ", "T"))
+    except ValueError:
+        logger.warning(f"Unparseable publish date {value!r}")
+        return None
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def fetch_page(page):
+    """Return the article records on ``page`` of the feed."""
+    url = API_URL.format(page=page)
+    started = time.perf_counter()
     try:
-        result = subprocess.run(
-            ["node", script_path],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print("Node.js Output:", result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("Node.js Error:", e.stderr)
+        resp = http_client.get(url)
+    except requests.RequestException:
+        metrics.observe_request("narasi", "api", time.perf_counter() - started, "error")
+        raise
+    metrics.observe_request("narasi", "api", time.perf_counter() - started, resp.status_code, len(resp.content),
+                            retry_count(resp))
+    resp.raise_for_status()
+    return (resp.json().get("data") or {}).get("articles") or []
+
+
+def parse_article(record):
+    """Build an ``Article`` from one record of the feed."""
+    return Article(
+        url=f"{SITE_URL}/{record.get('slug', '')}",
+        site="narasi",
+        title=record.get("title") or "",
+        lead=record.get("short") or "",
+        published=record.get("publishDate") or "",
+    )
+
+
+def iter_articles(since=None, window=4, max_pages=None):
+    """Yield the feed's articles page by page, only those published after ``since`` if given."""
+    since = parse_date(since) if isinstance(since, str) else since
+
+    def fetch(page):
+        records = fetch_page(page)
+        if since is not None:
+            # An empty page ends the walk, as nothing further down is newer.
+            # Articles without a readable date are kept.
+            records = [r for r in records if (parse_date(r.get("publishDate")) or datetime.max) > since]
+        logger.debug(f"Page {page}: {len(records)} articles")
+        return records
+
+    for records in iter_until_empty(fetch, window=window, max_pages=max_pages):
+        yield [parse_article(record) for record in records]
+
+
+def newest_published(path):
+    """Return the newest ``published`` date of the articles in ``path``, or ``None``."""
+    if not os.path.exists(path):
+        return None
+    dates = (parse_date(record.get("published")) for record in read_jsonl(path))
+    return max((d for d in dates if d is not None), default=None)
+
+
+def known_urls(path):
+    """Return the URLs of the articles already in ``path``."""
+    if not os.path.exists(path):
+        return set()
+    return {record["url"] for record in read_jsonl(path) if record.get("url")}
+
+
+def main(output=OUTPUT_FILE, since=None, full=False, window=4, max_pages=None, pretty_json=False):
+    """Append the feed's new articles to ``output`` and return how many were written.
+
+    Unless ``since`` is given or ``full`` is set, only articles newer than
+    the newest one already in ``output`` are fetched. Articles already in
+    ``output`` are never written again.
+    """
+    if since is None and not full:
+        since = newest_published(output)
+    logger.info(f"Fetching Narasi articles{f' published after {since}' if since else ''}")
+    seen = known_urls(output)
+    with JsonlSink(output, append=True) as sink:
+        for articles in iter_articles(since, window=window, max_pages=max_pages):
+            for article in articles:
+                # Articles published while paging push older ones onto the next page
+                if article.url not in seen:
+                    seen.add(article.url)
+                    sink.write(article)
+    logger.info(f"Saved {sink.count} articles to {output}")
+    if pretty_json:
+        export_json(read_jsonl(output), os.path.splitext(output)[0] + ".json")
+    return sink.count
+
@@ -0,0 +1,43 @@
+"""Concurrent index pagination for the synchronous scraper functions.
+
+``fetch_pages`` fetches a known range of index pages at once.
+``walk_until_empty`` is for sites that only reveal their last page by
+returning an empty one: it fetches ``window`` pages at a time and stops at
+the first empty page, so at most ``window - 1`` pages past the end are
+requested speculatively; ``iter_until_empty`` does the same but yields
+each page's results as soon as the pages before it are in. All of them
+keep page order, and requests still go through the shared client's
+per-host rate limiter.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 8
+DEFAULT_WINDOW = 4
+
+
+def fetch_pages(fetch_page, pages, workers=DEFAULT_WORKERS):
+    """Return ``fetch_page(page)`` for each of ``pages``, fetched concurrently."""
+    pages = list(pages)
+    if not pages:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(pages)), thread_name_prefix="index") as pool:
+        return list(pool.map(fetch_page, pages))
+
+
+def iter_until_empty(fetch_page, window=DEFAULT_WINDOW, max_pages=None):
+    """Yield ``fetch_page(page)`` for pages 1, 2, ... up to the first empty one."""
+    window = max(1, window if max_pages is None else min(window, max_pages))
+    page = 1
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix="index") as pool:
+        while max_pages is None or page <= max_pages:
+            end = page + window if max_pages is None else min(page + window, max_pages + 1)
+            for page_links in pool.map(fetch_page, range(page, end)):
+                if not page_links:
+                    return
+                yield page_links
+            page = end
+
+
+def walk_until_empty(fetch_page, window=DEFAULT_WINDOW, max_pages=None):
+    """Return the links of pages 1, 2, ... up to the first page ``fetch_page`` finds empty."""
+    return [link for page_links in iter_until_empty(fetch_page, window, max_pages) for link in page_links]
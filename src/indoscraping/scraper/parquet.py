@@ -0,0 +1,330 @@
+"""Partitioned Parquet output for articles and retail products.
+
+``ParquetSink`` takes the same records as ``JsonlSink`` and writes them to
+a hive-partitioned dataset (``site=detik/date=2025-07-28/part-....parquet``
+for articles, e.g. ``retailer=indomaret/category=.../`` for products). Rows
+are buffered per partition and written as a row group every
+``row_group_size`` records, or sooner when the rows buffered over all
+partitions pass ``max_buffered_rows``, so memory stays bounded during a
+crawl and readers can load just the columns and partitions they need::
+
+    dataset("articles/").to_table(columns=["title"])
+
+A part file gets its footer when it is finished, so each one is written
+under a ``.tmp`` name and renamed then; a crashed crawl leaves ``.tmp``
+files behind, never a truncated ``.parquet``. Part files are finished
+every ``checkpoint_rows`` records, which bounds what a crash loses.
+
+Articles use ``Article``'s Arrow schema. Other records are flattened: nested
+values become JSON strings and, unless a ``schema`` is given, the columns
+and their types are inferred from every row buffered when the first row
+group is written. Columns that show up later, and integer columns that
+meet a fraction or a string, widen the schema for the part files started
+after them; ``dataset`` unifies the schemas of the part files when
+reading, so no value is dropped.
+
+``convert`` turns the existing JSON and JSONL outputs into a dataset.
+Requires ``pip install -e ".[arrow]"``.
+"""
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+
+from indoscraping.scraper.models import Article, _pyarrow, to_arrow
+from indoscraping.scraper.sinks import read_records
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_PARTITIONS = ("site", "date")
+
+
+def _parquet():
+    _pyarrow()
+    import pyarrow.parquet
+    return pyarrow.parquet
+
+
+def partition_value(record, name):
+    """Return the value of partition column ``name`` for ``record``."""
+    if isinstance(record, Article):
+        if name == "date":
+            return record.index_date or record.scraped_at[:10]
+        if name == "site":
+            return record.site
+        return getattr(record, name, None) or record.extra.get(name)
+    return record.get(name)
+
+
+def _path_value(value):
+    # Hive partition directories cannot contain path separators.
+    value = "__HIVE_DEFAULT_PARTITION__" if value in (None, "") else str(value)
+    return value.replace("/", "_").replace(os.sep, "_")
+
+
+def flatten(record):
+    """Return a copy of a product record with nested values as JSON strings."""
+    return {
+        key: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+        for key, value in record.items()
+    }
+
+
+def _value_type(value):
+    pa = _pyarrow()
+    if value is None:
+        return pa.null()
+    if isinstance(value, bool):
+        return pa.bool_()
+    if isinstance(value, int):
+        return pa.int64()
+    if isinstance(value, float):
+        return pa.float64()
+    return pa.string()
+
+
+def _merge_type(current, new):
+    """Return the type that holds the values of both ``current`` and ``new``."""
+    pa = _pyarrow()
+    if current == new or new == pa.null():
+        return current
+    if current == pa.null():
+        return new
+    if {current, new} == {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def infer_schema(rows, schema=None):
+    """Infer a flat Arrow schema from dict ``rows``, widening ``schema`` if given.
+
+    A column gets the type that holds all of its values: integers and
+    floats give float64, any other mix gives string, and a column of nulls
+    only stays null-typed until a value shows up.
+    """
+    pa = _pyarrow()
+    types = {field.name: field.type for field in schema} if schema is not None else {}
+    for row in rows:
+        for key, value in row.items():
+            types[key] = _merge_type(types.get(key, pa.null()), _value_type(value))
+    return pa.schema([pa.field(key, t) for key, t in types.items()])
+
+
+def _coerce(value, arrow_type):
+    pa = _pyarrow()
+    if value is None or arrow_type == pa.null():
+        return None
+    try:
+        if arrow_type == pa.string():
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        if arrow_type == pa.int64():
+            # A fraction in an integer column is dropped rather than truncated
+            return int(value) if float(value).is_integer() else None
+        if arrow_type == pa.float64():
+            return float(value)
+        if arrow_type == pa.bool_():
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def dataset(root):
+    """Open the dataset under ``root`` with the schemas of its part files unified.
+
+    Part files written before a column appeared or was widened have an
+    older schema; reading them under the unified one fills the missing
+    columns with nulls and casts integers to the widened types.
+    """
+    pa = _pyarrow()
+    import pyarrow.dataset as ds
+
+    found = ds.dataset(root, format="parquet", partitioning="hive")
+    types = {}
+    for schema in [fragment.physical_schema for fragment in found.get_fragments()] + [found.partitioning.schema]:
+        for field in schema:
+            types[field.name] = _merge_type(types.get(field.name, pa.null()), field.type)
+    schema = pa.schema([pa.field(name, t) for name, t in types.items()])
+    return ds.dataset(root, schema=schema, format="parquet", partitioning="hive")
+
+
+class _Partition:
+    def __init__(self, directory):
+        self.directory = directory
+        self.rows = []
+        self.writer = None
+        self.path = None
+
+
+class ParquetSink:
+    """Write records to a hive-partitioned Parquet dataset under ``root``.
+
+    ``partition_by`` names the partition columns; they are taken from each
+    record (``date`` of an article is its ``index_date``) and kept out of
+    the files themselves. A partition's rows are written as a row group
+    once there are ``row_group_size`` of them, and the largest partition's
+    rows as soon as more than ``max_buffered_rows`` are held over all
+    partitions. Every ``checkpoint_rows`` records all part files are
+    finished, so a crash loses at most that many. At most
+    ``max_open_files`` part files are open at once; the least recently
+    written one is finished when another is needed.
+
+    Unless a ``schema`` is given, it is inferred from the rows buffered in
+    every partition when the first row group is written, and widened when
+    later rows bring new columns or values of another type; part files
+    started afterwards get the wider schema (``dataset`` reads them all).
+    """
+
+    def __init__(self, root, partition_by=ARTICLE_PARTITIONS, row_group_size=1_000, compression="zstd",
+                 max_open_files=64, schema=None, max_buffered_rows=20_000, checkpoint_rows=100_000):
+        self.root = root
+        self.schema = schema
+        self._given_schema = schema is not None
+        self.partition_by = tuple(partition_by or ())
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_open_files = max_open_files
+        self.max_buffered_rows = max_buffered_rows
+        self.checkpoint_rows = checkpoint_rows
+        self.count = 0
+        self.files = []
+        self._buffered = 0
+        self._pq = _parquet()
+        self._partitions = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+
+    def _partition(self, record):
+        key = tuple(_path_value(partition_value(record, name)) for name in self.partition_by)
+        partition = self._partitions.get(key)
+        if partition is None:
+            parts = [f"{name}={value}" for name, value in zip(self.partition_by, key)]
+            partition = self._partitions[key] = _Partition(os.path.join(self.root, *parts))
+        self._partitions.move_to_end(key)
+        return partition
+
+    def write(self, record):
+        partition = self._partition(record)
+        partition.rows.append(record)
+        self.count += 1
+        self._buffered += 1
+        if len(partition.rows) >= self.row_group_size:
+            self._flush(partition)
+        elif self._buffered > self.max_buffered_rows:
+            self._flush(max(self._partitions.values(), key=lambda p: len(p.rows)))
+        if self.checkpoint_rows and self.count % self.checkpoint_rows == 0:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered row and finish the open part files."""
+        for partition in self._partitions.values():
+            self._flush(partition)
+            if partition.writer is not None:
+                self._finish(partition)
+
+    @staticmethod
+    def _flat(rows):
+        return [flatten(row.to_dict() if isinstance(row, Article) else row) for row in rows]
+
+    def _table(self, partition):
+        pa = _pyarrow()
+        rows = partition.rows
+        if all(isinstance(row, Article) for row in rows):
+            table = to_arrow(rows)
+        else:
+            rows = self._flat(rows)
+            if self.schema is None:
+                # A sample of every partition, so a column the first one lacks is not missed
+                others = [row for p in self._partitions.values() if p is not partition for row in p.rows]
+                self.schema = infer_schema(rows + self._flat(others))
+            elif not self._given_schema:
+                self._widen(rows)
+            schema = self.schema
+            dropped = {key for row in rows for key in row} - set(schema.names)
+            if dropped:
+                logger.warning(f"Dropping columns not in the schema of {self.root}: {sorted(dropped)}")
+            columns = {}
+            for field in schema:
+                values = [row.get(field.name) for row in rows]
+                columns[field.name] = [_coerce(value, field.type) for value in values]
+                lost = sum(1 for value, coerced in zip(values, columns[field.name])
+                           if value is not None and coerced is None)
+                if lost:
+                    logger.warning(f"Writing {lost} values of {field.name!r} that are not {field.type} as null "
+                                   f"in {self.root}")
+            table = pa.Table.from_pydict(columns, schema=schema)
+        drop = [name for name in self.partition_by if name in table.column_names]
+        return table.drop_columns(drop) if drop else table
+
+    def _widen(self, rows):
+        """Widen the schema to ``rows``, finishing the part files written with the old one."""
+        schema = infer_schema(rows, self.schema)
+        if schema.equals(self.schema):
+            return
+        changed = [field.name for field in schema
+                   if field.name not in self.schema.names or self.schema.field(field.name).type != field.type]
+        logger.info(f"New or widened columns in {self.root}: {changed}")
+        for partition in self._partitions.values():
+            if partition.writer is not None:
+                self._finish(partition)
+        self.schema = schema
+
+    def _flush(self, partition):
+        if not partition.rows:
+            return
+        table = self._table(partition)
+        self._buffered -= len(partition.rows)
+        partition.rows = []
+        if partition.writer is None:
+            self._limit_open_files()
+            os.makedirs(partition.directory, exist_ok=True)
+            partition.path = os.path.join(partition.directory, f"part-{uuid.uuid4().hex}.parquet")
+            partition.writer = self._pq.ParquetWriter(partition.path + ".tmp", table.schema,
+                                                      compression=self.compression)
+        partition.writer.write_table(table, row_group_size=self.row_group_size)
+
+    def _limit_open_files(self):
+        open_partitions = [p for p in self._partitions.values() if p.writer is not None]
+        for partition in open_partitions[:max(0, len(open_partitions) - self.max_open_files + 1)]:
+            self._finish(partition)
+
+    def _finish(self, partition):
+        partition.writer.close()
+        os.replace(partition.path + ".tmp", partition.path)
+        self.files.append(partition.path)
+        partition.writer = None
+
+    def close(self):
+        self.flush()
+        self._partitions.clear()
+        logger.info(f"Wrote {self.count} records to {len(self.files)} Parquet files under {self.root}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert(paths, root, site=None, date=None, partition_by=None, fields=None, row_group_size=10_000):
+    """Convert JSON/JSONL outputs into a Parquet dataset under ``root``.
+
+    With ``site`` the records are read as articles of that site and
+    partitioned by site and date, ``date`` (ISO) standing in for the index
+    date older records do not have; otherwise they are written as they are,
+    with the constant ``fields`` (e.g. ``{"retailer": "indomaret"}``) added,
+    and partitioned by the ``partition_by`` fields. Returns the number of rows.
+    """
+    if site:
+        partition_by = partition_by or ARTICLE_PARTITIONS
+    with ParquetSink(root, partition_by=partition_by, row_group_size=row_group_size) as sink:
+        for path in paths:
+            for record in read_records(path):
+                if site:
+                    article = Article.from_dict(record, site=site)
+                    article.index_date = article.index_date or date or ""
+                    sink.write(article)
+                else:
+                    sink.write({**record, **fields} if fields else record)
+    return sink.count
+
@@ -0,0 +1,172 @@
+"""Selectable HTML parser backends.
+
+``lxml`` and ``html.parser`` go through BeautifulSoup, so every parser in
+the site modules works with either of them. ``selectolax`` uses the Lexbor
+engine directly and is implemented by the article parsers of the sites
+that have been ported to it (detik, kompas and bisnis); everything else
+falls back to lxml when it is selected.
+
+The backend is chosen with ``set_backend`` or the ``INDOSCRAPING_PARSER``
+environment variable and defaults to lxml when it is installed.
+
+Article parsers can also run in partial mode (``set_partial`` or
+``INDOSCRAPING_PARTIAL=1``), in which only the elements matching the
+site's regions are built into a tree (see ``partial_parser``). Headers,
+navigation, ads, related articles, comments and scripts are skipped by the
+parser. A site can also give an end marker, the first thing in the page
+layout after everything the parser reads, at which the page is cut and,
+where the engine fetches it, no longer read from the network.
+"""
+import functools
+import importlib.util
+import logging
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+BACKENDS = ("lxml", "html.parser", "selectolax")
+
+# Text inside these elements is not part of get_text() in BeautifulSoup.
+_NON_TEXT_TAGS = ("script", "style", "-comment")
+
+
+def available_backends():
+    """Return the backends whose libraries are installed."""
+    modules = {"lxml": "lxml", "html.parser": "html", "selectolax": "selectolax"}
+    return [name for name in BACKENDS if importlib.util.find_spec(modules[name]) is not None]
+
+
+def _default_backend():
+    backend = os.environ.get("INDOSCRAPING_PARSER")
+    if backend:
+        return backend
+    return "lxml" if "lxml" in available_backends() else "html.parser"
+
+
+_backend = _default_backend()
+_partial = os.environ.get("INDOSCRAPING_PARTIAL", "") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    """Select the parser backend used by every site module."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {name!r}, expected one of {BACKENDS}")
+    if name not in available_backends():
+        raise ValueError(f"Parser backend {name!r} is not installed")
+    _backend = name
+
+
+def partial_enabled():
+    return _partial
+
+
+def set_partial(enabled):
+    """Turn partial parsing of articles on or off for every site module."""
+    global _partial
+    _partial = bool(enabled)
+
+
+def make_soup(markup, backend=None, parse_only=None):
+    """Build a BeautifulSoup tree with the selected backend.
+
+    selectolax has no BeautifulSoup tree builder, so lxml is used for it.
+    A tree built by ``partial_parser`` is passed in as ``markup`` and
+    returned as it is.
+    """
+    if isinstance(markup, BeautifulSoup):
+        return markup
+    backend = backend or _backend
+    if backend == "selectolax":
+        backend = "lxml" if "lxml" in available_backends() else "html.parser"
+    return BeautifulSoup(markup, backend, parse_only=parse_only)
+
+
+def truncate(markup, end):
+    """Return ``markup`` up to and including the first ``end``, or all of it."""
+    if isinstance(markup, bytes):
+        end = end.encode("utf-8")
+    position = markup.find(end)
+    return markup if position == -1 else markup[:position + len(end)]
+
+
+class Regions(SoupStrainer):
+    """Strainer that only builds the elements matching simple selectors.
+
+    A selector is a tag name, one or more classes (``.read__content``) or
+    both (``div.text-cm.text-gray``). A matching element is kept with
+    everything inside it; everything else is skipped by the tree builder.
+    """
+
+    def __init__(self, selectors):
+        super().__init__()
+        self.selectors = []
+        for selector in selectors:
+            name, *classes = selector.split(".")
+            self.selectors.append((name or None, frozenset(classes)))
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        classes = attrs.get("class") if attrs else None
+        if isinstance(classes, str):
+            classes = classes.split()
+        classes = set(classes or ())
+        return any((tag is None or tag == name) and wanted <= classes for tag, wanted in self.selectors)
+
+
+def partial_parser(regions, end=None):
+    """Decorate an article parser ``parse(html, url)`` with partial parsing.
+
+    In partial mode the page is cut after ``end``, if given and found, and
+    handed to the parser as a BeautifulSoup tree of the ``regions`` only
+    (``make_soup`` passes it through), or as the cut markup for the
+    selectolax backend. A page whose article has no title or content that
+    way is parsed again in full, so a layout change costs speed rather
+    than data.
+    """
+    strainer = Regions(regions)
+
+    def decorate(parse):
+        @functools.wraps(parse)
+        def wrapper(html, url):
+            if not _partial:
+                return parse(html, url)
+            markup = truncate(html, end) if end else html
+            if _backend != "selectolax":
+                markup = make_soup(markup, parse_only=strainer)
+            article = parse(markup, url)
+            if article is not None and article.title and article.content:
+                return article
+            logger.debug(f"Partial parse of {url} missed its article, parsing the whole page")
+            return parse(html, url)
+
+        return wrapper
+
+    return decorate
+
+
+def make_tree(markup):
+    """Build a Lexbor tree for parsers ported to selectolax."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    return LexborHTMLParser(markup)
+
+
+def node_text(node):
+    """Equivalent of BeautifulSoup's ``get_text(strip=True)`` for a Lexbor node."""
+    parts = []
+    for child in node.iter(include_text=True):
+        if child.tag == "-text":
+            text = child.text_content.strip()
+            if text:
+                parts.append(text)
+        elif child.tag not in _NON_TEXT_TAGS:
+            text = node_text(child)
+            if text:
+                parts.append(text)
+    return "".join(parts)
@@ -0,0 +1,96 @@
+"""Process-pool parsing stage for the crawl engine.
+
+Fetch tasks hand raw HTML to a bounded queue; a fixed number of feeder
+tasks move it into a ``ProcessPoolExecutor`` whose workers run the site's
+parse functions and send back the ``Article`` records they produce, with
+the CPU time parsing took in the worker. When
+parsing falls behind, the queue fills up and fetch tasks block on it, so
+memory stays bounded by the queue size instead of by the crawl size.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from indoscraping.scraper import parsing
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_in_worker(backend, partial, parse, html, url):
+    if parsing.get_backend() != backend:
+        parsing.set_backend(backend)
+    parsing.set_partial(partial)
+    started = time.process_time()
+    return parse(html, url), time.process_time() - started
+
+
+def _parse_index_in_worker(backend, partial, parse, html):
+    if parsing.get_backend() != backend:
+        parsing.set_backend(backend)
+    started = time.process_time()
+    return parse(html), time.process_time() - started
+
+
+class ParsePool:
+    """Run parse functions in worker processes behind a bounded queue.
+
+    ``parse`` functions must be picklable, which the module-level parsers
+    of the site modules are. ``max_queued`` is how many fetched pages may
+    wait for a worker before fetching is throttled.
+    """
+
+    def __init__(self, workers=None, max_queued=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queued = max_queued or self.workers * 4
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = None
+        self._feeders = []
+
+    def _start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        # Two feeders per worker keep every process busy while the next
+        # page is being pickled over to it.
+        self._feeders = [asyncio.create_task(self._feed()) for _ in range(self.workers * 2)]
+
+    async def _feed(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            func, args, future = await self._queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, func, parsing.get_backend(),
+                                                    parsing.partial_enabled(), *args)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    async def _submit(self, func, *args):
+        if self._queue is None:
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, future))
+        return await future
+
+    async def parse_article(self, parse, html, url):
+        """Run ``parse(html, url)`` in a worker process; return its result and CPU seconds."""
+        return await self._submit(_parse_in_worker, parse, html, url)
+
+    async def parse_index(self, parse, html):
+        """Run ``parse(html)`` in a worker process; return its result and CPU seconds."""
+        return await self._submit(_parse_index_in_worker, parse, html)
+
+    async def stop(self):
+        """Cancel the feeder tasks of the current event loop."""
+        for task in self._feeders:
+            task.cancel()
+        await asyncio.gather(*self._feeders, return_exceptions=True)
+        self._queue, self._feeders = None, []
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
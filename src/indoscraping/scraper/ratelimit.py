@@ -0,0 +1,100 @@
+"""Per-host token-bucket rate limiting.
+
+Every request the scrapers make waits for a token from the bucket of its
+host, so each site gets a steady requests-per-second with short bursts
+instead of fixed sleeps between requests.
+"""
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+# (requests per second, burst) per host. A key also covers its subdomains,
+# so "kompas.com" applies to indeks.kompas.com, nasional.kompas.com, ...
+DEFAULT_HOST_RATES = {
+    "news.detik.com": (2.0, 4),
+    "finance.detik.com": (2.0, 4),
+    "detik.com": (2.0, 4),
+    "www.bisnis.com": (4.0, 8),
+    "bisnis.com": (4.0, 8),
+    "indeks.kompas.com": (2.0, 4),
+    "kompas.com": (2.0, 4),
+    "www.cnbcindonesia.com": (2.0, 4),
+    "www.cnnindonesia.com": (2.0, 4),
+    "narasi.tv": (4.0, 8),
+    "klikindomaret.com": (5.0, 10),
+    "alfagift.id": (5.0, 10),
+}
+DEFAULT_RATE = (1.0, 2)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second."""
+
+    def __init__(self, rate, burst):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be positive and burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class HostRateLimiter:
+    """Keep one token bucket per host, configured from ``rates``."""
+
+    def __init__(self, rates=None, default=DEFAULT_RATE):
+        self.rates = dict(DEFAULT_HOST_RATES if rates is None else rates)
+        self.default = default
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host, rate, burst):
+        """Set the rate and burst for ``host`` (and its subdomains)."""
+        with self._lock:
+            self.rates[host] = (rate, burst)
+            for name in [h for h in self._buckets if h == host or h.endswith("." + host)]:
+                del self._buckets[name]
+
+    def rate_for(self, host):
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            key = ".".join(labels[i:])
+            if key in self.rates:
+                return self.rates[key]
+        return self.default
+
+    def bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(*self.rate_for(host))
+            return self._buckets[host]
+
+    def wait(self, url):
+        """Block until a request to ``url`` is allowed."""
+        delay = self.bucket(urlparse(url).hostname or "").reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """Asyncio counterpart of ``wait``."""
+        delay = self.bucket(urlparse(url).hostname or "").reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# Shared by every scraper in the process so that all of them draw from the
+# same per-host budget.
+rate_limiter = HostRateLimiter()
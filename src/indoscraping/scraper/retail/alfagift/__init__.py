@@ -0,0 +1,119 @@
+"""Alfagift product catalog.
+
+Every subcategory is a listing. Its first page gives the page count and
+the remaining pages are fetched at once, ``workers`` listings at a time.
+Products are tagged with the ``categoryId`` of their listing and
+``retailer``, and streamed to ``alfagift_products.jsonl`` or a Parquet
+dataset partitioned by retailer and category::
+
+    indoscraping retail alfagift -o alfagift_products.jsonl
+
+``categories.json`` is a saved copy of the category tree that can stand
+in for the live one.
+
+``scrape_stores`` crawls the catalog from many locations at once for
+regional prices::
+
+    indoscraping retail alfagift --stores locations.json -o alfagift/
+"""
+import json
+import logging
+import os
+import random
+
+from indoscraping.scraper.pagination import fetch_pages
+from indoscraping.scraper.retail.catalog import StoreMatrix, crawl, crawl_stores, get_json, open_sink
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://webcommerce-gw.alfagift.id/v2"
+
+HEADERS = {
+    "accept": "application/json",
+    "accept-language": "id",
+    "devicemodel": "chrome",
+    "devicetype": "Web",
+    "fingerprint": "hNvsXdRTVhrqH5gGgHkI8OnvtKOGC8E/vIk1u9NwkKyV1i1yorHlQQr52UMqtait",
+    "latitude": "0",
+    "longitude": "0",
+    "priority": "u=1, i",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "Referer": "https://alfagift.id/",
+}
+
+# Product key and store of the price history
+KEY = "sku"
+STORE = ""
+
+PAGE_SIZE = 60
+
+PARTITIONS = ("retailer", "categoryId")
+
+SAVED_CATEGORIES = os.path.join(os.path.dirname(__file__), "categories.json")
+
+
+def _headers(store=None):
+    # The gateway expects a new transaction id on every request
+    headers = {**HEADERS, "trxid": str(random.randrange(10_000_000_000))}
+    if store:
+        headers.update({name: str(value) for name, value in store.items()})
+    return headers
+
+
+def get_categories(path=None):
+    """Return the category tree, from the API or from the saved ``path``."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["categories"]
+    return get_json(f"{BASE_URL}/categories", headers=_headers())["categories"]
+
+
+def get_listings(categories):
+    """Return the ids of all subcategories."""
+    listings = [sub["categoryId"] for category in categories for sub in category.get("subCategories") or []]
+    logger.info(f"Found {len(listings)} subcategories in {len(categories)} categories")
+    return listings
+
+
+def get_products(category_id, page=0, store=None):
+    url = f"{BASE_URL}/products/category/{category_id}"
+    params = {"sortDirection": "asc", "start": page, "limit": PAGE_SIZE}
+    return get_json(url, params=params, headers=_headers(store))
+
+
+def get_listing_products(category_id, workers=4, store=None):
+    """Return every product of a subcategory, tagged with its id."""
+    first = get_products(category_id, store=store)
+    pages = [first] + fetch_pages(lambda page: get_products(category_id, page, store),
+                                  range(1, (first.get("totalPage") or 0) + 1), workers=workers)
+    products = [product for page in pages for product in page.get("products") or []]
+    for product in products:
+        product.update({"categoryId": category_id, "retailer": "alfagift"})
+    return products
+
+
+def scrape(sink, workers=4, window=4, categories_file=None):
+    """Write the whole catalog to ``sink``; return the crawl stats."""
+    listings = get_listings(get_categories(categories_file))
+    return crawl(listings, lambda listing: get_listing_products(listing, window), sink, workers=workers)
+
+
+def scrape_stores(stores, products_sink, offers_sink, workers=8, window=4, categories_file=None):
+    """Write the catalogs seen from many ``stores`` as products and offers.
+
+    A store is a dict of request headers, at least ``latitude`` and
+    ``longitude``, from which the gateway picks the serving store.
+    """
+    listings = get_listings(get_categories(categories_file))
+    matrix = StoreMatrix(products_sink, offers_sink, KEY)
+    return crawl_stores(stores, listings, lambda listing, store: get_listing_products(listing, window, store),
+                        matrix, workers=workers)
+
+
+def main(output="alfagift_products.jsonl", format="jsonl", workers=4, window=4, categories_file=None):
+    with open_sink(output, format, partition_by=PARTITIONS) as sink:
+        stats = scrape(sink, workers=workers, window=window, categories_file=categories_file)
+    logger.info(f"Saved {stats['products']} products to {output} ({stats['failed']} listings failed)")
+    return stats
@@ -0,0 +1,167 @@
+"""Concurrent crawling of retail product catalogs.
+
+A catalog is a list of listings (a category, or a category and
+subcategory) whose products are paged through a JSON API. ``crawl``
+fetches ``workers`` listings at once, and each listing's pages
+concurrently too, and streams every listing's products to a sink as soon
+as it is complete. Requests go through the shared client, so they are
+retried on 429/5xx and held to the API host's rate limit.
+
+``crawl_stores`` crawls the same listings for many stores at once, under
+one ``workers`` budget shared by all of them. Product metadata rarely
+depends on the store, so ``StoreMatrix`` writes each product once and,
+per store, only an offer: the product key, the store and, under
+``fields``, the values that differ from the product record (price,
+promo, stock, ...). ``merge_offers`` puts the per-store records back
+together.
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product as cross
+from urllib.parse import urlparse
+
+import requests
+
+from indoscraping.scraper.client import http_client, retry_count
+from indoscraping.scraper.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tags added from the listing a product was found on rather than from the
+# product itself; they differ between listings of one product, not stores.
+LISTING_FIELDS = frozenset({"retailer", "metaCategories", "categories", "subCategories", "categoryId"})
+
+
+def get_json(url, **kwargs):
+    """GET ``url`` and decode its JSON body.
+
+    The catalog APIs answer blocked or expired sessions with an HTML page
+    and a 200, which is reported as an error instead of a decode failure,
+    and counts as throttling for the client's adaptive limiter. The request
+    is recorded in the metrics under the API host.
+    """
+    host = urlparse(url).hostname
+    started = time.perf_counter()
+    try:
+        resp = http_client.get(url, **kwargs)
+    except requests.RequestException:
+        metrics.observe_request(host, "api", time.perf_counter() - started, "error")
+        raise
+    metrics.observe_request(host, "api", time.perf_counter() - started, resp.status_code, len(resp.content),
+                            retry_count(resp))
+    text = resp.text
+    if text.lstrip()[:1] == "<":
+        if http_client.adaptive:
+            http_client.adaptive.penalize(url)
+        raise ValueError(f"{url} returned HTML instead of JSON (status {resp.status_code}): {text[:200]!r}")
+    resp.raise_for_status()
+    started = time.thread_time()
+    data = resp.json()
+    metrics.observe_parse(host, "api", time.thread_time() - started)
+    return data
+
+
+def open_sink(path, format="jsonl", partition_by=()):
+    """Open a JSONL file, or a Parquet dataset partitioned by the ``partition_by`` fields."""
+    if format == "parquet":
+        from indoscraping.scraper.parquet import ParquetSink
+        return ParquetSink(path, partition_by=partition_by)
+    from indoscraping.scraper.sinks import JsonlSink
+    return JsonlSink(path)
+
+
+def crawl(listings, fetch_listing, sink, workers=8):
+    """Write the products ``fetch_listing(listing)`` returns for every listing to ``sink``.
+
+    Returns the number of products written and of listings that failed.
+    """
+    stats = {"products": 0, "listings": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catalog") as pool:
+        futures = {pool.submit(fetch_listing, listing): listing for listing in listings}
+        for future in as_completed(futures):
+            listing = futures[future]
+            try:
+                products = future.result()
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"Failed to fetch listing {listing}: {e}")
+                stats["failed"] += 1
+                continue
+            for product in products:
+                sink.write(product)
+            stats["listings"] += 1
+            stats["products"] += len(products)
+            logger.info(f"Retrieved {len(products)} products from {listing} "
+                        f"({stats['listings']}/{len(futures)} listings)")
+    return stats
+
+
+def store_id(store):
+    """Return the code of a store config, or its coordinates if it has none."""
+    return str(store.get("storeCode") or f"{store.get('latitude')},{store.get('longitude')}")
+
+
+class StoreMatrix:
+    """Split per-store product records into shared products and per-store offers."""
+
+    def __init__(self, products_sink, offers_sink, key):
+        self.products_sink = products_sink
+        self.offers_sink = offers_sink
+        self.key = key
+        self.products = {}
+        self._offered = set()
+
+    def write(self, record, store):
+        sku = record.get(self.key)
+        if sku is None or (sku, store) in self._offered:
+            return
+        self._offered.add((sku, store))
+        fields = {}
+        product = self.products.get(sku)
+        if product is None:
+            self.products[sku] = record
+            self.products_sink.write(record)
+        else:
+            for field in record.keys() | product.keys():
+                if field not in LISTING_FIELDS and record.get(field) != product.get(field):
+                    fields[field] = record.get(field)
+        # Nested, so that every offer has the same columns in a Parquet dataset
+        self.offers_sink.write({self.key: sku, "store": store, "fields": fields})
+
+
+def crawl_stores(stores, listings, fetch_listing, matrix, workers=8):
+    """Crawl every listing for every store, ``fetch_listing(listing, store)``, into ``matrix``.
+
+    Returns per-store counts of products and failed listings.
+    """
+    stats = {store_id(store): {"products": 0, "failed": 0} for store in stores}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="catalog") as pool:
+        futures = {pool.submit(fetch_listing, listing, store): (listing, store_id(store))
+                   for store, listing in cross(stores, listings)}
+        for done, future in enumerate(as_completed(futures), 1):
+            listing, store = futures[future]
+            try:
+                products = future.result()
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"Failed to fetch listing {listing} of store {store}: {e}")
+                stats[store]["failed"] += 1
+                continue
+            for product in products:
+                matrix.write(product, store)
+            stats[store]["products"] += len(products)
+            if done % 100 == 0:
+                logger.info(f"Fetched {done}/{len(futures)} listings, {len(matrix.products)} distinct products")
+    return stats
+
+
+def merge_offers(products, offers, key):
+    """Yield the full per-store records of ``StoreMatrix`` output, with their ``store``."""
+    products = {product[key]: product for product in products}
+    for offer in offers:
+        product = products.get(offer[key])
+        if product is not None:
+            fields = offer.get("fields") or {}
+            if isinstance(fields, str):
+                fields = json.loads(fields)
+            yield {**product, **fields, "store": offer["store"]}
@@ -0,0 +1,256 @@
+"""Append-only price history of retail catalogs.
+
+Each catalog snapshot is compared with the last known state of every
+product, keyed by SKU and store, and only the fields that changed (price,
+promo, stock, ...) are appended to ``changes`` as (old, new) pairs. A
+product missing from a complete snapshot gets a ``listed`` change to
+false, and back to true when it returns. Storage and load time therefore
+grow with churn rather than catalog size: an unchanged product costs one
+hash comparison.
+
+``price_at`` and ``prices_at`` answer "what did it cost at T" from the
+newest change at or before T, and ``changes_since`` lists what moved
+after T::
+
+    with PriceHistory("prices.sqlite") as history:
+        history.record(read_records("klikindomaret_products.jsonl"), key="plu", store="TJKT")
+        history.changes_since("2025-07-01", field="price")
+
+Times are datetimes or ISO 8601 strings; a bare date means its midnight.
+The snapshots of a store have to be recorded in time order.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from indoscraping.scraper.retail.catalog import LISTING_FIELDS
+
+LISTED = "listed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    sku TEXT NOT NULL,
+    store TEXT NOT NULL,
+    state TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    listed INTEGER NOT NULL DEFAULT 1,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (sku, store)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    sku TEXT NOT NULL,
+    store TEXT NOT NULL,
+    at TEXT NOT NULL,
+    field TEXT NOT NULL,
+    old TEXT,
+    new TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_product ON changes (sku, store, field, at);
+CREATE INDEX IF NOT EXISTS changes_at ON changes (at, field);
+CREATE TABLE IF NOT EXISTS snapshots (
+    at TEXT NOT NULL,
+    store TEXT,
+    products INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    changes INTEGER NOT NULL
+);
+"""
+
+
+def _encode(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+def _decode(value):
+    return None if value is None else json.loads(value)
+
+
+def _time(at):
+    """Normalize a datetime, date or ISO string so that times compare as strings."""
+    if isinstance(at, str):
+        at = datetime.fromisoformat(at)
+    if not isinstance(at, datetime):
+        at = datetime(at.year, at.month, at.day)
+    return at.isoformat(timespec="seconds")
+
+
+def _hash(state):
+    return hashlib.blake2b(_encode(state).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PriceHistory:
+    """SQLite store of product states and their field-level changes.
+
+    ``fields`` limits the tracked fields (e.g. ``("price", "promo",
+    "stock")``); by default every field except the listing tags is.
+    """
+
+    def __init__(self, path, fields=None, chunk_size=5000):
+        self.path = path
+        self.fields = frozenset(fields) if fields else None
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _state(self, product, key, store_field):
+        if self.fields is not None:
+            return {f: product.get(f) for f in self.fields}
+        return {f: v for f, v in product.items() if f not in LISTING_FIELDS and f != key and f != store_field}
+
+    def record(self, products, key, store=None, at=None, complete=True, store_field="storeCode"):
+        """Append the changes between the last known state and ``products``.
+
+        ``store`` is the store of every product, or is read from each
+        product's ``store_field`` when not given. Only the stores in the
+        snapshot (or ``store``) are compared: with ``complete`` their
+        products not in the snapshot are marked unlisted, and the products
+        of other stores and retailers sharing the database are left alone.
+        Returns counts of products read, products changed and changes
+        written.
+        """
+        at = _time(at or datetime.now())
+        known = {}
+        by_store = {}
+
+        def open_store(name):
+            # One hash per known product is all an unchanged product costs
+            with self._lock:
+                last = self._conn.execute("SELECT MAX(at) FROM snapshots WHERE store = ?", (name,)).fetchone()[0]
+                if last and at < last:
+                    raise ValueError(f"Snapshot of store {name!r} at {at} is older than the last one recorded, {last}")
+                known.update({(sku, name): (digest, listed) for sku, digest, listed in self._conn.execute(
+                    "SELECT sku, hash, listed FROM products WHERE store = ?", (name,))})
+            by_store[name] = {"products": 0, "changed": 0, "changes": 0}
+
+        if store is not None:
+            open_store(str(store))
+        seen = set()
+        batch = []
+        for product in products:
+            sku = product.get(key)
+            if sku is None:
+                continue
+            product_key = (str(sku), str(store if store is not None else product.get(store_field) or ""))
+            if product_key[1] not in by_store:
+                open_store(product_key[1])
+            by_store[product_key[1]]["products"] += 1
+            if product_key in seen:
+                continue
+            seen.add(product_key)
+            state = self._state(product, key, store_field)
+            previous = known.get(product_key)
+            if previous and previous[0] == _hash(state) and previous[1]:
+                continue
+            batch.append((product_key, state))
+            if len(batch) >= self.chunk_size:
+                self._apply(batch, at, by_store)
+                batch = []
+        self._apply(batch, at, by_store)
+        if complete:
+            gone = [k for k, (_, listed) in known.items() if listed and k not in seen]
+            self._unlist(gone, at, by_store)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                                   [(at, name, c["products"], c["changed"], c["changes"])
+                                    for name, c in by_store.items()])
+        return {field: sum(c[field] for c in by_store.values()) for field in ("products", "changed", "changes")}
+
+    def _apply(self, batch, at, by_store):
+        if not batch:
+            return
+        with self._lock, self._conn:
+            for (sku, store), state in batch:
+                row = self._conn.execute(
+                    "SELECT state, listed FROM products WHERE sku = ? AND store = ?", (sku, store)).fetchone()
+                old_state, listed = (json.loads(row[0]), row[1]) if row else ({}, 0)
+                changes = [(sku, store, at, field, _encode(old_state[field]) if field in old_state else None,
+                            _encode(state.get(field)))
+                           for field in state.keys() | old_state.keys()
+                           if field not in old_state or old_state[field] != state.get(field)]
+                if not listed:
+                    changes.append((sku, store, at, LISTED, _encode(False) if row else None, _encode(True)))
+                self._conn.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?)", changes)
+                self._conn.execute(
+                    "INSERT INTO products (sku, store, state, hash, listed, updated_at) VALUES (?, ?, ?, ?, 1, ?) "
+                    "ON CONFLICT (sku, store) DO UPDATE SET state = excluded.state, hash = excluded.hash, "
+                    "listed = 1, updated_at = excluded.updated_at",
+                    (sku, store, _encode(state), _hash(state), at))
+                by_store[store]["changed"] += 1
+                by_store[store]["changes"] += len(changes)
+
+    def _unlist(self, keys, at, by_store):
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO changes VALUES (?, ?, ?, ?, ?, ?)",
+                                   [(sku, store, at, LISTED, _encode(True), _encode(False)) for sku, store in keys])
+            self._conn.executemany("UPDATE products SET listed = 0, updated_at = ? WHERE sku = ? AND store = ?",
+                                   [(at, sku, store) for sku, store in keys])
+        for _, store in keys:
+            by_store[store]["changed"] += 1
+            by_store[store]["changes"] += 1
+
+    def stores(self, sku):
+        """Return the stores a product has been recorded in."""
+        with self._lock:
+            rows = self._conn.execute("SELECT store FROM products WHERE sku = ? ORDER BY store", (str(sku),)).fetchall()
+        return [store for store, in rows]
+
+    def price_at(self, sku, at, store="", field="price"):
+        """Return the value of ``field`` for a product at time ``at`` (None if unknown)."""
+        at = _time(at)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT new FROM changes WHERE sku = ? AND store = ? AND field = ? AND at <= ? "
+                "ORDER BY at DESC LIMIT 1", (str(sku), store, field, at)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def state_at(self, sku, at, store=""):
+        """Return every tracked field of a product at time ``at``."""
+        at = _time(at)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT field, new, MAX(at) FROM changes WHERE sku = ? AND store = ? AND at <= ? GROUP BY field",
+                (str(sku), store, at)).fetchall()
+        return {field: _decode(value) for field, value, _ in rows}
+
+    def prices_at(self, at, store=None, field="price"):
+        """Return ``{(sku, store): value}`` of ``field`` for the whole catalog at time ``at``."""
+        at = _time(at)
+        query = "SELECT sku, store, new, MAX(at) FROM changes WHERE field = ? AND at <= ?"
+        params = [field, at]
+        if store is not None:
+            query += " AND store = ?"
+            params.append(store)
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY sku, store", params).fetchall()
+        return {(sku, s): _decode(value) for sku, s, value, _ in rows}
+
+    def changes_since(self, at, field=None, store=None):
+        """Return the changes after ``at`` as dicts, oldest first."""
+        at = _time(at)
+        query = "SELECT sku, store, at, field, old, new FROM changes WHERE at > ?"
+        params = [at]
+        if field:
+            query += " AND field = ?"
+            params.append(field)
+        if store is not None:
+            query += " AND store = ?"
+            params.append(store)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY at, sku, field", params).fetchall()
+        return [{"sku": sku, "store": s, "at": t, "field": f, "old": _decode(old), "new": _decode(new)}
+                for sku, s, t, f, old, new in rows]
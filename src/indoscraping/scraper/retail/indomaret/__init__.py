@@ -0,0 +1,132 @@
+"""Klik Indomaret product catalog.
+
+Every (meta category, category, subcategory) listing of the catalog API is
+paged through until an empty page, ``workers`` listings at a time and
+``window`` pages of a listing at once. Products are tagged with their
+listing (``metaCategories``, ``categories``, ``subCategories``) and
+``retailer``, and streamed to ``klikindomaret_products.jsonl`` or a
+Parquet dataset partitioned by retailer and category::
+
+    indoscraping retail indomaret -o klikindomaret_products.jsonl
+
+``scrape_stores`` crawls a list of store configs like ``STORE_CONFIG``
+at once for regional prices::
+
+    indoscraping retail indomaret --stores stores.json -o indomaret/
+"""
+import logging
+import uuid
+
+from indoscraping.scraper.pagination import walk_until_empty
+from indoscraping.scraper.retail.catalog import StoreMatrix, crawl, crawl_stores, get_json, open_sink
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://ap-mc.klikindomaret.com/assets-klikidmgroceries/api/get/catalog-xpress/api/webapp"
+
+STORE_CONFIG = {
+    "storeCode": "TJKT",
+    "latitude": -6.1763897,
+    "longitude": 106.82667,
+    "mode": "DELIVERY",
+    "districtId": 141100100,
+}
+
+HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "en-US,en;q=0.9",
+    "apps": "{\"app_version\":\"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36\",\"device_class\":\"browser|browser\",\"device_family\":\"none\",\"device_id\":\"e97a1210-e2aa-4908-9ddd-12d4ac58afa6\",\"os_name\":\"Linux\",\"os_version\":\"x86_64\"}",
+    "page": "unpage",
+    "priority": "u=1, i",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "Referer": "https://www.klikindomaret.com/",
+}
+
+# Product key and store of the price history
+KEY = "plu"
+STORE = STORE_CONFIG["storeCode"]
+
+PAGE_SIZE = 20
+
+PARTITIONS = ("retailer", "categories")
+
+
+def _headers():
+    return {**HEADERS, "x-correlation-id": str(uuid.uuid4())}
+
+
+def get_categories(store=STORE_CONFIG):
+    """Return the meta categories, with their categories and subcategories."""
+    data = get_json(f"{BASE_URL}/category/meta", params=store, headers=_headers())
+    if not data.get("data"):
+        raise ValueError("No category data received")
+    return data["data"]
+
+
+def get_listings(meta_categories):
+    """Return a (meta category, category, subcategory) permalink triple per listing.
+
+    A category without subcategories is one listing with ``None`` as its
+    subcategory.
+    """
+    listings = []
+    for meta in meta_categories:
+        for category in meta.get("categories") or []:
+            subcategories = category.get("subCategories") or []
+            if not subcategories:
+                listings.append((meta["permalink"], category["permalink"], None))
+            for subcategory in subcategories:
+                listings.append((meta["permalink"], category["permalink"], subcategory["permalink"]))
+    logger.info(f"Found {len(listings)} listings in {len(meta_categories)} meta categories")
+    return listings
+
+
+def get_products(listing, page, store=STORE_CONFIG):
+    """Return the products on ``page`` (0-based) of a listing."""
+    meta_category, category, subcategory = listing
+    params = {"metaCategories": meta_category, "categories": category, "page": page, "size": PAGE_SIZE, **store}
+    if subcategory:
+        params["subCategories"] = subcategory
+    data = get_json(f"{BASE_URL}/search/result", params=params, headers=_headers())
+    return (data.get("data") or {}).get("content") or []
+
+
+def get_listing_products(listing, window=4, store=STORE_CONFIG):
+    """Return every product of a listing, tagged with the listing."""
+    meta_category, category, subcategory = listing
+    products = walk_until_empty(lambda page: get_products(listing, page - 1, store), window=window)
+    for product in products:
+        product.update({
+            "metaCategories": meta_category,
+            "categories": category,
+            "subCategories": subcategory,
+            "retailer": "indomaret",
+        })
+    return products
+
+
+def scrape(sink, workers=4, window=4, store=STORE_CONFIG):
+    """Write the whole catalog of ``store`` to ``sink``; return the crawl stats."""
+    listings = get_listings(get_categories(store))
+    return crawl(listings, lambda listing: get_listing_products(listing, window, store), sink, workers=workers)
+
+
+def scrape_stores(stores, products_sink, offers_sink, workers=8, window=4):
+    """Write the catalogs of many ``stores`` (``STORE_CONFIG``-like dicts) as products and offers.
+
+    The category tree is fetched once, from the first store, and its
+    listings are crawled for every store.
+    """
+    listings = get_listings(get_categories(stores[0]))
+    matrix = StoreMatrix(products_sink, offers_sink, KEY)
+    return crawl_stores(stores, listings, lambda listing, store: get_listing_products(listing, window, store),
+                        matrix, workers=workers)
+
+
+def main(output="klikindomaret_products.jsonl", format="jsonl", workers=4, window=4):
+    with open_sink(output, format, partition_by=PARTITIONS) as sink:
+        stats = scrape(sink, workers=workers, window=window)
+    logger.info(f"Saved {stats['products']} products to {output} ({stats['failed']} listings failed)")
+    return stats
@@ -1,33 +1,43 @@
-import pandas as pd
-from sqlalchemy import create_engine
+"""Load klikindomaret_products.jsonl into the ``indomaret`` table.
+
+Products are upserted on their PLU, so a re-run only writes new and
+changed products instead of replacing the table. DATABASE_URL may be a
+``postgresql://`` URL or an SQLite path and is read from the environment
+(or a ``.env`` file when python-dotenv is installed).
+"""
+import argparse
+import logging
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Load and clean data
-df = pd.read_json("klikindomaret_products.json")
-
-df.drop(
-    ["descriptionList", "promoTagList", "promo", "promoText", "pairProducts"],
-    axis=1,
-    inplace=True,
-    errors="ignore",
-)
-
-# Optionally save to CSV
-df.to_csv("indomaret.csv", index=False)
-
-# Create engine using the full DATABASE_URL from .env
-db_url = os.getenv("DATABASE_URL")
-engine = create_engine(db_url)
-
-# Write to PostgreSQL
-df.to_sql(
-    name="indomaret",
-    con=engine,
-    schema="public",
-    if_exists="replace",
-    method="multi",
-    index=False,
-)
+
+from indoscraping.scraper.loader import open_loader
+from indoscraping.scraper.sinks import read_records
+
+EXCLUDE = ["descriptionList", "promoTagList", "promo", "promoText", "pairProducts"]
+
+
+def main(argv=None):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description="Upsert Indomaret products into a database.")
+    parser.add_argument("input", nargs="?", default="klikindomaret_products.jsonl")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--table", default="indomaret")
+    parser.add_argument("--key", nargs="+", default=["plu"], help="product key column(s) (default: plu)")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("set DATABASE_URL or pass --database-url")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open_loader(args.database_url) as loader:
+        stats = loader.load(args.table, read_records(args.input), key=args.key,
+                            chunk_size=args.chunk_size, exclude=EXCLUDE)
+    print(f"{stats['written']} of {stats['records']} products written to {args.table}")
+
+
+if __name__ == "__main__":
+    main()
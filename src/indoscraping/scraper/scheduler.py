@@ -0,0 +1,107 @@
+"""Scheduler for multi-site, multi-date crawls.
+
+A crawl is split into (site, category, date) jobs. Each site has its own
+job list drained by ``per_site`` workers, and ``jobs`` caps how many run
+at once across all sites, so one slow site cannot starve the others while
+the engine's global and per-host limits keep the request rate polite.
+"""
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from indoscraping.scraper.engine import SiteSpec
+from indoscraping.scraper.sites import select_categories
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    site: SiteSpec
+    category: Any
+    date_str: str
+
+
+def _list_categories(site):
+    try:
+        return site.get_categories()
+    except Exception as e:
+        logger.error(f"[{site.name}] Failed to list categories: {e}")
+        return []
+
+
+def build_jobs(sites, dates, categories=None):
+    """Return a job for every category of every site on every date.
+
+    Categories are listed once per site, concurrently; with ``categories``
+    only those matching one of the given names are kept. Jobs are ordered
+    by date so a backfill makes progress on every site at once.
+    """
+    sites = list(sites)
+    with ThreadPoolExecutor(max_workers=max(1, len(sites))) as pool:
+        listed = list(pool.map(_list_categories, sites))
+    per_site = {}
+    for site, site_categories in zip(sites, listed):
+        if categories:
+            site_categories = select_categories(site_categories, categories)
+        logger.info(f"[{site.name}] {len(site_categories)} categories selected")
+        per_site[site.name] = site_categories
+    return [
+        Job(site, category, day.strftime(site.date_format))
+        for day in dates
+        for site in sites
+        for category in per_site[site.name]
+    ]
+
+
+class JobScheduler:
+    """Run crawl jobs over one ``CrawlEngine``.
+
+    ``sink_for(site)`` returns the sink a site's articles are written to.
+    """
+
+    def __init__(self, engine, jobs=8, per_site=2):
+        self.engine = engine
+        self.jobs = jobs
+        self.per_site = per_site
+
+    async def _work(self, queue, slots, sink_for, stats):
+        while queue:
+            job = queue.popleft()
+            site_stats = stats[job.site.name]
+            async with slots:
+                count = 0
+                try:
+                    async for article in self.engine.crawl(job.site, job.date_str, [job.category]):
+                        self.engine.write(sink_for(job.site), job.site, article)
+                        count += 1
+                except Exception as e:
+                    logger.exception(f"[{job.site.name}] Job {job.category} on {job.date_str} failed: {e}")
+                    site_stats["failed"] += 1
+                site_stats["jobs"] += 1
+                site_stats["articles"] += count
+                logger.info(f"[{job.site.name}] {count} articles for {job.category} on {job.date_str} "
+                            f"({site_stats['jobs']}/{site_stats['total']} jobs)")
+
+    async def crawl(self, jobs, sink_for):
+        """Run ``jobs`` and return per-site counts of jobs, failures and articles."""
+        queues, stats = {}, {}
+        for job in jobs:
+            queues.setdefault(job.site.name, deque()).append(job)
+        for name, queue in queues.items():
+            stats[name] = {"total": len(queue), "jobs": 0, "failed": 0, "articles": 0}
+        slots = asyncio.Semaphore(self.jobs)
+        workers = [
+            self._work(queue, slots, sink_for, stats)
+            for queue in queues.values()
+            for _ in range(min(self.per_site, len(queue)))
+        ]
+        await asyncio.gather(*workers)
+        return stats
+
+    def run(self, jobs, sink_for):
+        """Synchronous wrapper around ``crawl``."""
+        return self.engine.run_async(self.crawl(jobs, sink_for))
@@ -0,0 +1,317 @@
+"""Local full-text search over scraped articles.
+
+``SearchIndex`` keeps articles in SQLite: their metadata in ordinary
+indexed tables and their title and text in an FTS5 table, ranked with
+BM25 (title matches weigh more than body matches). It takes the same
+records as ``JsonlSink``, so a crawl can index articles as they stream in,
+and re-adding an article replaces it::
+
+    with SearchIndex("search.sqlite") as index:
+        for record in read_records("detik_articles.jsonl"):
+            index.write(record)
+        index.search("harga beras", site="detik", date_from="2025-07-01")
+
+Text is tokenized and reduced to stems by ``stem``, a rule-based
+Indonesian stemmer that strips particles (-lah, -kah), possessives (-nya,
+-ku), derivational suffixes (-kan, -an, -i) and prefixes (meng-, di-,
+ber-, ter-, pe-, ...), so ``membeli``, ``dibeli`` and ``pembelian`` all
+match ``beli``. A prefix is only stripped where it can stand before the
+rest of the word and leaves a plausible root, so ``menteri`` and
+``berita`` are kept whole, and the ``k`` that meng- and peng- drop is put
+back for the roots in ``K_ROOTS`` (``mengatakan`` and ``dikatakan`` both
+give ``kata``). Queries, including the prefix of a ``term*``
+query, are stemmed the same way; an index built by an earlier stemmer
+should be rebuilt.
+"""
+import json
+import re
+import sqlite3
+import threading
+
+from indoscraping.scraper.models import Article
+
+VOWELS = set("aeiou")
+
+# Shorter remainders are more often part of the root (ber-ita, ber-ada)
+MIN_STEM = 4
+# Two consonants a root can start with; any other pair means a prefix was
+# cut off in the middle of a root (me-nteri, pe-nting)
+ONSET_CLUSTERS = ("ng", "ny", "sy", "kh", "bl", "br", "dr", "fl", "fr", "gl", "gr", "kl", "kr", "pl", "pr",
+                  "sk", "sl", "sp", "st", "tr")
+# Words the rules below would take apart
+ROOTS = {"berita", "berada", "menteri", "sekolah", "selesai", "pemilu"}
+# Roots starting with k, whose k meng- and peng- drop before the vowel
+# (mengatakan, pengiriman); other roots after meng- start with the vowel
+# (mengambil, pengalaman)
+K_ROOTS = {
+    "kabar", "kaji", "kalah", "kampanye", "kandung", "karang", "kata", "kawal", "kecil", "kejar", "kelola",
+    "keluar", "keluh", "kembali", "kembang", "kemuka", "kena", "kenal", "kendali", "kepung", "kerja", "kikis",
+    "kira", "kirim", "koordinasi", "kontrol", "konsumsi", "kuasa", "kuat", "kubur", "kumpul", "kunci",
+    "kunjung", "kupas", "kurang", "kutip",
+}
+
+PARTICLES = ("lah", "kah", "pun")
+POSSESSIVES = ("nya", "ku", "mu")
+# Suffixes of the confixes of me-, di- and ter- words, and of pe-, ke- and
+# se- words (pendidikan, kebijakan), which only end in -an
+VERB_SUFFIXES = ("kan", "an", "i")
+NOUN_SUFFIXES = ("an",)
+# Without a prefix, -kan and -i are more often part of the root (ekonomi, polisi, bahkan)
+UNPREFIXED_SUFFIXES = ("an",)
+# (prefix, replacement when a vowel follows, consonants it can precede or
+# None for any, suffixes) in the order they are tried. A nasal prefix
+# replaces the root's first letter before a vowel (menulis, memilih) and
+# only precedes the consonants it assimilated to (membeli, mendapat).
+FIRST_PREFIXES = (
+    ("meny", "s", "", VERB_SUFFIXES), ("meng", "", "ghk", VERB_SUFFIXES), ("mem", "p", "bfpv", VERB_SUFFIXES),
+    ("men", "t", "cdjz", VERB_SUFFIXES), ("me", "", "lmnrwy", VERB_SUFFIXES),
+    ("peny", "s", "", NOUN_SUFFIXES), ("peng", "", "ghk", NOUN_SUFFIXES), ("pem", "p", "bfv", NOUN_SUFFIXES),
+    ("pen", "t", "cdjz", NOUN_SUFFIXES),
+    ("di", "", None, VERB_SUFFIXES), ("ter", "", None, VERB_SUFFIXES), ("ke", "", None, NOUN_SUFFIXES),
+    ("se", "", None, NOUN_SUFFIXES),
+)
+SECOND_PREFIXES = (("ber", "", None, ()), ("bel", "", None, ()), ("be", "", None, ()), ("per", "", None, ()),
+                   ("pel", "", None, ()), ("pe", "", None, ()))
+
+WORD_RE = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    site TEXT NOT NULL,
+    date TEXT NOT NULL,
+    title TEXT,
+    published TEXT,
+    authors TEXT,
+    tags TEXT,
+    lead TEXT,
+    category TEXT,
+    scraped_at TEXT
+);
+CREATE INDEX IF NOT EXISTS articles_site_date ON articles (site, date);
+CREATE INDEX IF NOT EXISTS articles_date ON articles (date);
+CREATE TABLE IF NOT EXISTS article_tags (
+    tag TEXT NOT NULL,
+    article INTEGER NOT NULL,
+    PRIMARY KEY (tag, article)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_tags_article ON article_tags (article);
+CREATE TABLE IF NOT EXISTS article_authors (
+    author TEXT NOT NULL,
+    article INTEGER NOT NULL,
+    PRIMARY KEY (author, article)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS article_authors_article ON article_authors (article);
+CREATE VIRTUAL TABLE IF NOT EXISTS article_text USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+
+def _syllables(word):
+    return sum(1 for c in word if c in VOWELS)
+
+
+def _is_stem(word):
+    return (len(word) >= MIN_STEM and _syllables(word) >= 2
+            and (word[0] in VOWELS or word[1] in VOWELS or word[:2] in ONSET_CLUSTERS))
+
+
+def _strip_suffix(word, suffixes):
+    # Only the first suffix the word ends with is tried (-kan before -an)
+    for suffix in suffixes:
+        if word.endswith(suffix):
+            rest = word[:-len(suffix)]
+            return (rest, True) if _is_stem(rest) else (word, False)
+    return word, False
+
+
+def _strip_prefix(word, prefixes):
+    """Return ``word`` without the first of ``prefixes`` it starts with.
+
+    Also returns that prefix, or ``None``, and whether it had replaced the
+    root's first letter.
+    """
+    if word in ROOTS:
+        return word, None, False
+    for prefix in prefixes:
+        name, replacement, onsets, _ = prefix
+        rest = word[len(name):]
+        if not word.startswith(name) or len(rest) < 2:
+            continue
+        if rest[0] in VOWELS:
+            stem = replacement + rest
+        elif onsets is None or rest[0] in onsets:
+            stem = rest
+        else:
+            continue
+        if _is_stem(stem):
+            return stem, prefix, bool(replacement) and rest[0] in VOWELS
+    return word, None, False
+
+
+def stem(word):
+    """Return the stem of an Indonesian ``word`` (lowercase)."""
+    if len(word) <= MIN_STEM or not word.isalpha() or word in ROOTS:
+        return word
+    word, _ = _strip_suffix(word, PARTICLES)
+    word, _ = _strip_suffix(word, POSSESSIVES)
+    word, prefix, replaced = _strip_prefix(word, FIRST_PREFIXES)
+    if prefix:
+        stemmed = _strip_confix(word, prefix, replaced)
+        if prefix[0] in ("meng", "peng") and word[0] in VOWELS:
+            # The root may have started with the k meng- replaced
+            with_k = _strip_confix("k" + word, prefix, True)
+            if with_k in K_ROOTS:
+                return with_k
+        return stemmed
+    word, _, _ = _strip_prefix(word, SECOND_PREFIXES)
+    word, _ = _strip_suffix(word, UNPREFIXED_SUFFIXES)
+    return word
+
+
+def _strip_confix(word, prefix, replaced):
+    """Strip the suffix that goes with ``prefix``, then a second prefix."""
+    word, suffixed = _strip_suffix(word, prefix[3])
+    # A replaced first letter belongs to the root (pemerintahan, not pe-per-intah-an)
+    if suffixed and not replaced:
+        word, _, _ = _strip_prefix(word, SECOND_PREFIXES)
+    return word
+
+
+def analyze(text):
+    """Return the stems of the words in ``text`` as one string, as they are indexed."""
+    return " ".join(stem(word) for word in WORD_RE.findall(text.lower()))
+
+
+def match_query(query, any_term=False):
+    """Turn free text into an FTS5 query over stems; ``term*`` keeps its prefix match."""
+    terms = []
+    for word in re.findall(r"\w+\*?", query.lower()):
+        if word.endswith("*"):
+            # The index holds stems, so the prefix is stemmed too (pembeli* finds beli)
+            terms.append(f'"{stem(word[:-1])}"*')
+        else:
+            terms.append(f'"{stem(word)}"')
+    return (" OR " if any_term else " ").join(terms)
+
+
+def _date(article):
+    return article.index_date or article.scraped_at[:10]
+
+
+class SearchIndex:
+    """SQLite FTS5 index of articles, usable as a crawl sink.
+
+    Writes are committed every ``commit_every`` articles and on ``close``
+    (or ``commit``). The index may be shared by the threads of a crawl.
+    """
+
+    def __init__(self, path, commit_every=500):
+        self.path = path
+        self.commit_every = commit_every
+        self.count = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Title matches rank ahead of body matches
+        self._conn.execute("INSERT INTO article_text (article_text, rank) VALUES ('rank', 'bm25(5.0, 1.0)')")
+        self._conn.commit()
+
+    def write(self, record):
+        """Index an ``Article`` or an article record, replacing an earlier copy of its URL."""
+        article = record if isinstance(record, Article) else Article.from_dict(record)
+        if not article.url:
+            return
+        with self._lock:
+            conn = self._conn
+            row = conn.execute("SELECT id FROM articles WHERE url = ?", (article.url,)).fetchone()
+            if row:
+                self._delete(row[0])
+            cursor = conn.execute(
+                "INSERT INTO articles (url, site, date, title, published, authors, tags, lead, category, scraped_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (article.url, article.site, _date(article), article.title, article.published,
+                 json.dumps(article.authors, ensure_ascii=False), json.dumps(article.tags, ensure_ascii=False),
+                 article.lead, article.category, article.scraped_at))
+            article_id = cursor.lastrowid
+            conn.executemany("INSERT OR IGNORE INTO article_tags VALUES (?, ?)",
+                             [(tag.lower(), article_id) for tag in article.tags if tag])
+            conn.executemany("INSERT OR IGNORE INTO article_authors VALUES (?, ?)",
+                             [(author.lower(), article_id) for author in article.authors if author])
+            body = "\n".join(filter(None, [article.lead, article.text]))
+            conn.execute("INSERT INTO article_text (rowid, title, body) VALUES (?, ?, ?)",
+                         (article_id, analyze(article.title), analyze(body)))
+            self.count += 1
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                conn.commit()
+                self._pending = 0
+
+    def _delete(self, article_id):
+        for table, column in (("articles", "id"), ("article_tags", "article"), ("article_authors", "article"),
+                              ("article_text", "rowid")):
+            self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (article_id,))
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, query, site=None, date_from=None, date_to=None, tag=None, author=None, limit=20,
+               offset=0, any_term=False):
+        """Return the best matches for ``query`` as dicts, best first.
+
+        ``date_from`` and ``date_to`` are inclusive ISO dates. ``tag`` and
+        ``author`` match case-insensitively. With ``any_term`` an article
+        needs only one of the query's words.
+        """
+        match = match_query(query, any_term)
+        if not match:
+            return []
+        sql = ("SELECT a.url, a.site, a.date, a.title, a.published, a.authors, a.tags, a.lead, t.rank "
+               "FROM article_text t JOIN articles a ON a.id = t.rowid WHERE article_text MATCH ?")
+        params = [match]
+        if site:
+            sql += " AND a.site = ?"
+            params.append(site)
+        if date_from:
+            sql += " AND a.date >= ?"
+            params.append(str(date_from))
+        if date_to:
+            sql += " AND a.date <= ?"
+            params.append(str(date_to))
+        if tag:
+            sql += " AND a.id IN (SELECT article FROM article_tags WHERE tag = ?)"
+            params.append(tag.lower())
+        if author:
+            sql += " AND a.id IN (SELECT article FROM article_authors WHERE author = ?)"
+            params.append(author.lower())
+        sql += " ORDER BY t.rank LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {"url": url, "site": site, "date": day, "title": title, "published": published,
+             "authors": json.loads(authors), "tags": json.loads(tags), "lead": lead, "score": -rank}
+            for url, site, day, title, published, authors, tags, lead, rank in rows
+        ]
+
+    def optimize(self):
+        """Merge the FTS index segments, e.g. after a large backfill."""
+        with self._lock:
+            self._conn.execute("INSERT INTO article_text (article_text) VALUES ('optimize')")
+            self._conn.commit()
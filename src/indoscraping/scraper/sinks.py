@@ -0,0 +1,167 @@
+"""Streaming output for scraped records.
+
+``JsonlSink`` writes each record (an ``Article`` or a plain dict) as one
+line of JSON the moment it is scraped, optionally gzip- or
+zstd-compressed, and fsyncs every ``fsync_every`` records so a crash
+loses at most that many. Pretty-printed
+JSON is still available through ``export_json`` as an opt-in export.
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import zlib
+
+from indoscraping.scraper.models import Article
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def compression_for(path):
+    """Infer the compression of ``path`` from its suffix."""
+    return COMPRESSIONS.get(os.path.splitext(path)[1])
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("zstd compression requires the 'zstandard' package") from e
+    return zstandard
+
+
+class JsonlSink:
+    """Append records to a newline-delimited JSON file as they arrive.
+
+    ``compression`` is ``None``, ``"gzip"`` or ``"zstd"`` and defaults to
+    what the file suffix says. Compressed streams are flushed to a
+    decodable boundary (a gzip full flush or a zstd block) on every sync,
+    so everything up to the last sync can be read back after a crash.
+    """
+
+    def __init__(self, path, compression="auto", fsync_every=100, append=False):
+        self.path = path
+        self.compression = compression_for(path) if compression == "auto" else compression
+        self.fsync_every = fsync_every
+        self.count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._raw = open(path, "ab" if append else "wb")
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="ab" if append else "wb")
+        elif self.compression == "zstd":
+            self._stream = _zstandard().ZstdCompressor().stream_writer(self._raw, closefd=False)
+        elif self.compression is None:
+            self._stream = self._raw
+        else:
+            raise ValueError(f"Unsupported compression: {self.compression}")
+
+    def write(self, record):
+        """Write one record, an ``Article`` or a JSON-serializable dict."""
+        line = (record.to_json() if isinstance(record, Article) else json.dumps(record, ensure_ascii=False)) + "\n"
+        self._stream.write(line.encode("utf-8"))
+        self.count += 1
+        if self.fsync_every and self.count % self.fsync_every == 0:
+            self.sync()
+
+    def sync(self):
+        """Flush buffered records to disk."""
+        if self.compression == "gzip":
+            self._stream.flush(zlib_mode=zlib.Z_FULL_FLUSH)
+        elif self.compression == "zstd":
+            self._stream.flush(_zstandard().FLUSH_BLOCK)
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self):
+        if self._raw.closed:
+            return
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        logger.info(f"Wrote {self.count} records to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TeeSink:
+    """Write every record to each of ``sinks``, e.g. a file and a search index."""
+
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_jsonl(path):
+    """Yield the records of a (possibly compressed) JSONL file.
+
+    A file cut short by a crash is read up to its last complete record.
+    """
+    compression = compression_for(path)
+    if compression == "gzip":
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif compression == "zstd":
+        raw = open(path, "rb")
+        f = io.TextIOWrapper(_zstandard().ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True),
+                             encoding="utf-8")
+    else:
+        f = open(path, encoding="utf-8")
+    with f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    logger.warning(f"Ignoring truncated last record in {path}")
+                    break
+                yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile) as e:
+            logger.warning(f"{path} ends in an incomplete block: {e}")
+
+
+def read_records(path):
+    """Yield the records of a JSON or (possibly compressed) JSONL file.
+
+    A JSON document may be a list of records or an object holding them
+    under ``articles`` (the cnbc export) or ``data``.
+    """
+    if path.endswith(".jsonl") or compression_for(path):
+        yield from read_jsonl(path)
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("articles") or data.get("data") or []
+    yield from data
+
+
+def export_json(records, path):
+    """Write ``records`` as one pretty-printed JSON document."""
+    if isinstance(records, dict):
+        data = records
+    else:
+        data = [record.to_dict() if isinstance(record, Article) else record for record in records]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
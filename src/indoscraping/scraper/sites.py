@@ -0,0 +1,46 @@
+"""Registry of the news sites the crawl engine knows about.
+
+Site modules are imported only when a site is asked for, so listing the
+sites or crawling one of them does not pull in (and configure logging
+for) all the others.
+"""
+import importlib
+from urllib.parse import urlparse
+
+SITES = {
+    "bisnis": "indoscraping.scraper.news.bisnis",
+    "cnbcindonesia": "indoscraping.scraper.news.cnbcindonesia",
+    "cnnindonesia": "indoscraping.scraper.news.cnnindonesia",
+    "detik": "indoscraping.scraper.news.detik",
+    "kompas": "indoscraping.scraper.news.kompas",
+}
+
+
+def load_site(name):
+    """Return the ``SiteSpec`` of site ``name``."""
+    try:
+        module = SITES[name]
+    except KeyError:
+        raise ValueError(f"Unknown site {name!r}; choose from {', '.join(SITES)}") from None
+    return importlib.import_module(module).SITE
+
+
+def category_names(category):
+    """Return the names a category can be selected by on the command line.
+
+    Categories are plain strings (kompas, bisnis), index URLs (detik, which
+    can also be picked by host) or dicts (cnbc, cnn, picked by any value).
+    """
+    values = list(category.values()) if isinstance(category, dict) else [category]
+    names = [str(value) for value in values]
+    for value in names[:]:
+        host = urlparse(value).netloc
+        if host:
+            names.append(host)
+    return names
+
+
+def select_categories(categories, wanted):
+    """Return the ``categories`` matching any of the ``wanted`` names."""
+    wanted = {name.lower() for name in wanted}
+    return [c for c in categories if wanted & {name.lower() for name in category_names(c)}]
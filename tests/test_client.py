@@ -0,0 +1,48 @@
+import io
+
+import pytest
+import requests
+
+from indoscraping.scraper.client import DRAIN_LIMIT, read_until
+
+
+class FakeRaw(io.BytesIO):
+    drained = False
+
+    def drain_conn(self):
+        self.drained = True
+        self.read()
+
+
+def streamed(body, length=None):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.raw = FakeRaw(body)
+    resp.headers["Content-Length"] = str(len(body) if length is None else length)
+    return resp
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+def test_read_until_stops_after_the_marker(chunk_size):
+    resp = read_until(streamed(b"<html><article>text</article><footer>...</footer>"), "</article>", chunk_size)
+    assert resp.truncated
+    assert resp.content == b"<html><article>text</article>"
+    assert resp.text.endswith("</article>")
+
+
+def test_read_until_reads_a_body_without_the_marker_in_full():
+    body = b"<html><div>no article here</div></html>"
+    resp = read_until(streamed(body), "</article>", 4)
+    assert not resp.truncated
+    assert resp.content == body
+
+
+def test_read_until_drains_a_short_rest_only():
+    short = b"<article>a</article>" + b"x" * 10
+    resp = read_until(streamed(short), "</article>")
+    assert resp.raw.drained
+    long = b"<article>a</article>" + b"x" * (2 * DRAIN_LIMIT)
+    resp = read_until(streamed(long), "</article>")
+    assert resp.truncated
+    assert not resp.raw.drained
+    assert resp.raw.closed
@@ -0,0 +1,22 @@
+import pytest
+
+from indoscraping.scraper.dedup import canonical_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://news.detik.com/berita/d-1/judul", "https://news.detik.com/berita/d-1/judul"),
+    ("HTTPS://News.Detik.COM:443/berita/d-1/judul/", "https://news.detik.com/berita/d-1/judul"),
+    ("http://example.com:80//a//b", "http://example.com/a/b"),
+    ("https://example.com:8443/a", "https://example.com:8443/a"),
+    ("https://example.com/a#comments", "https://example.com/a"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com/a?utm_source=x&utm_medium=y&fbclid=z", "https://example.com/a"),
+    ("https://example.com/a?page=2&id=7", "https://example.com/a?id=7&page=2"),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_canonical_url_keeps_parameters_that_select_content():
+    assert canonical_url("https://example.com/search?q=banjir&utm_campaign=x") == "https://example.com/search?q=banjir"
+    assert canonical_url("https://example.com/read?p=3") != canonical_url("https://example.com/read?p=4")
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from indoscraping.scraper import distributed
+from indoscraping.scraper.distributed import DEAD, DONE, LEASED, QUEUED, SqliteWorkQueue, Unit, Worker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(distributed.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SqliteWorkQueue(str(tmp_path / "queue.sqlite"), lease_timeout=10, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def unit(page=1):
+    return Unit("detik", "news", "2025-07-01", page)
+
+
+def test_put_skips_known_units(queue):
+    assert queue.put([unit(1), unit(2)]) == 2
+    assert queue.put([unit(2), unit(3)]) == 1
+    assert queue.counts() == {QUEUED: 3, LEASED: 0, DONE: 0, DEAD: 0}
+
+
+def test_expired_lease_is_handed_to_another_worker(queue, clock):
+    queue.put([unit()])
+    first, = queue.lease("a")
+    assert queue.lease("b") == []
+    clock[0] += 11
+    second, = queue.lease("b")
+    assert second.unit == unit() and second.attempts == 2
+    # The first worker lost its lease and cannot finish the unit any more
+    assert not queue.extend(first)
+    assert not queue.ack(first)
+    assert queue.ack(second)
+    assert queue.counts()[DONE] == 1
+
+
+def test_extended_lease_does_not_expire(queue, clock):
+    queue.put([unit()])
+    lease, = queue.lease("a")
+    clock[0] += 8
+    assert queue.extend(lease)
+    clock[0] += 8
+    assert queue.lease("b") == []
+    assert queue.ack(lease)
+
+
+def test_unit_is_dead_after_max_attempts(queue, clock):
+    queue.put([unit()])
+    queue.lease("a")
+    clock[0] += 11
+    queue.lease("b")
+    clock[0] += 11
+    assert queue.lease("c") == []
+    assert queue.counts() == {QUEUED: 0, LEASED: 0, DONE: 0, DEAD: 1}
+    assert queue.remaining() == 0
+
+
+def test_failed_unit_is_retried(queue):
+    queue.put([unit()])
+    lease, = queue.lease("a")
+    assert queue.fail(lease, "boom")
+    lease, = queue.lease("a")
+    assert lease.attempts == 2
+    queue.fail(lease, "boom")
+    assert queue.counts()[DEAD] == 1
+
+
+class FakeEngine:
+    max_index_pages = None
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.written = []
+
+    async def index_page(self, site, category, date, page):
+        return ["https://example.com/a", "https://example.com/b"], None
+
+    def unscraped(self, site, links):
+        return [link for link in links if link not in self.written]
+
+    async def scrape(self, site, url, category=None, date_str=None):
+        if url == "https://example.com/b" and self.failures:
+            self.failures -= 1
+            return None
+        return url
+
+    def write(self, sink, site, article):
+        self.written.append(article)
+
+    def run_async(self, main):
+        return asyncio.run(main)
+
+
+def test_worker_retries_unit_with_failed_articles(queue):
+    queue.put([unit()])
+    engine = FakeEngine(failures=1)
+    stats = Worker(queue, engine, lambda site: None, poll_interval=0).run()
+    assert engine.written == ["https://example.com/a", "https://example.com/b"]
+    assert stats == {"units": 1, "failed": 1, "articles": 2}
+    assert queue.counts()[DONE] == 1
+
+
+def test_worker_gives_up_on_articles_that_keep_failing(queue):
+    queue.put([unit()])
+    engine = FakeEngine(failures=5)
+    stats = Worker(queue, engine, lambda site: None, poll_interval=0).run()
+    assert stats == {"units": 0, "failed": 2, "articles": 1}
+    assert queue.counts()[DEAD] == 1
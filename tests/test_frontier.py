@@ -0,0 +1,38 @@
+import pytest
+
+from indoscraping.scraper.frontier import FAILED, FETCHED, PARSED, Frontier
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    with Frontier(str(tmp_path / "frontier.sqlite"), max_attempts=2) as frontier:
+        yield frontier
+
+
+def test_pending_lists_what_still_needs_scraping(frontier):
+    urls = [f"https://example.com/{i}" for i in range(5)]
+    assert frontier.add("detik", "news", "2025-07-01", urls) == 5
+    frontier.mark(urls[0], PARSED)
+    frontier.mark(urls[1], FETCHED)
+    frontier.mark(urls[2], FAILED, "timeout")
+    assert sorted(frontier.pending("detik", "2025-07-01")) == urls[1:]
+    frontier.mark(urls[2], FAILED, "timeout")
+    assert sorted(frontier.pending("detik", "2025-07-01")) == [urls[1], urls[3], urls[4]]
+    assert frontier.is_done(urls[2])
+
+
+def test_pending_filters_by_site_date_and_category(frontier):
+    frontier.add("detik", "news", "2025-07-01", ["https://example.com/a"])
+    frontier.add("detik", {"id": 2, "name": "finance"}, "2025-07-01", ["https://example.com/b"])
+    frontier.add("detik", "news", "2025-07-02", ["https://example.com/c"])
+    frontier.add("kompas", "news", "2025-07-01", ["https://example.com/d"])
+    assert sorted(frontier.pending("detik", "2025-07-01")) == ["https://example.com/a", "https://example.com/b"]
+    assert frontier.pending("detik", "2025-07-01", "news") == ["https://example.com/a"]
+    assert frontier.pending("detik", "2025-07-01", {"name": "finance", "id": 2}) == ["https://example.com/b"]
+
+
+def test_add_keeps_the_state_of_known_urls(frontier):
+    frontier.add("detik", "news", "2025-07-01", ["https://example.com/a"])
+    frontier.mark("https://example.com/a", PARSED)
+    assert frontier.add("detik", "news", "2025-07-01", ["https://example.com/a", "https://example.com/b"]) == 1
+    assert frontier.pending("detik", "2025-07-01") == ["https://example.com/b"]
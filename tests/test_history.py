@@ -0,0 +1,61 @@
+import pytest
+
+from indoscraping.scraper.retail.history import PriceHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    with PriceHistory(str(tmp_path / "prices.sqlite")) as history:
+        yield history
+
+
+def test_complete_snapshots_of_two_stores(history):
+    history.record([{"plu": 1, "price": 10000}, {"plu": 2, "price": 5000}], key="plu", store="TJKT",
+                   at="2025-07-01")
+    history.record([{"plu": 1, "price": 11000}, {"plu": 3, "price": 7000}], key="plu", store="TJKB",
+                   at="2025-07-02")
+    # A complete snapshot of one store leaves the products of the other alone
+    assert history.price_at(1, "2025-07-03", store="TJKT") == 10000
+    assert history.state_at(2, "2025-07-03", store="TJKT")["listed"] is True
+    assert history.stores(1) == ["TJKB", "TJKT"]
+
+    counts = history.record([{"plu": 1, "price": 9000}], key="plu", store="TJKT", at="2025-07-04")
+    assert counts == {"products": 1, "changed": 2, "changes": 2}
+    assert history.price_at(1, "2025-07-01", store="TJKT") == 10000
+    assert history.price_at(1, "2025-07-04", store="TJKT") == 9000
+    assert history.price_at(1, "2025-07-04", store="TJKB") == 11000
+    assert history.state_at(2, "2025-07-04", store="TJKT")["listed"] is False
+    assert history.state_at(3, "2025-07-04", store="TJKB")["listed"] is True
+    assert history.prices_at("2025-07-04") == {("1", "TJKT"): 9000, ("2", "TJKT"): 5000,
+                                                ("1", "TJKB"): 11000, ("3", "TJKB"): 7000}
+
+
+def test_snapshot_with_stores_per_product(history):
+    history.record([{"plu": 1, "storeCode": "A", "price": 100}, {"plu": 1, "storeCode": "B", "price": 120}],
+                   key="plu", at="2025-07-01")
+    history.record([{"plu": 1, "storeCode": "A", "price": 90}], key="plu", at="2025-07-02")
+    assert history.price_at(1, "2025-07-02", store="A") == 90
+    assert history.price_at(1, "2025-07-02", store="B") == 120
+    assert history.state_at(1, "2025-07-02", store="B")["listed"] is True
+
+
+def test_unchanged_product_writes_nothing(history):
+    history.record([{"plu": 1, "price": 100}], key="plu", store="A", at="2025-07-01")
+    assert history.record([{"plu": 1, "price": 100}], key="plu", store="A", at="2025-07-02") == {
+        "products": 1, "changed": 0, "changes": 0}
+    assert history.price_at(1, "2025-06-30", store="A") is None
+
+
+def test_relisted_product(history):
+    history.record([{"plu": 1, "price": 100}], key="plu", store="A", at="2025-07-01")
+    history.record([], key="plu", store="A", at="2025-07-02")
+    history.record([{"plu": 1, "price": 100}], key="plu", store="A", at="2025-07-03")
+    assert [history.state_at(1, day, store="A")["listed"] for day in ("2025-07-01", "2025-07-02", "2025-07-03")] == [
+        True, False, True]
+
+
+def test_snapshots_of_a_store_must_be_in_order(history):
+    history.record([{"plu": 1, "price": 100}], key="plu", store="A", at="2025-07-02")
+    history.record([{"plu": 1, "price": 100}], key="plu", store="B", at="2025-07-01")
+    with pytest.raises(ValueError):
+        history.record([{"plu": 1, "price": 90}], key="plu", store="A", at="2025-07-01")
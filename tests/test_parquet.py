@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from indoscraping.scraper.parquet import ParquetSink, dataset, infer_schema  # noqa: E402
+
+
+def products(root):
+    return sorted(dataset_rows(root), key=lambda row: row["sku"])
+
+
+def dataset_rows(root):
+    return dataset(root).to_table().to_pylist()
+
+
+def test_infer_schema_widens_mixed_columns():
+    import pyarrow as pa
+
+    schema = infer_schema([{"a": 1, "b": None, "c": 1}, {"a": 1.5, "b": True, "c": "x"}])
+    assert schema.field("a").type == pa.float64()
+    assert schema.field("b").type == pa.bool_()
+    assert schema.field("c").type == pa.string()
+    assert infer_schema([{"d": 2}], schema).names == ["a", "b", "c", "d"]
+
+
+def test_sparse_columns_across_partitions(tmp_path):
+    root = str(tmp_path / "products")
+    with ParquetSink(root, partition_by=("retailer",), row_group_size=2) as sink:
+        sink.write({"retailer": "alfagift", "sku": "1", "price": 1000})
+        sink.write({"retailer": "alfagift", "sku": "2", "price": 2000})
+        # Columns only the second partition has show up after the first row group
+        sink.write({"retailer": "indomaret", "sku": "3", "price": 3000, "promo": {"min": 2}})
+        sink.write({"retailer": "indomaret", "sku": "4", "price": 4000, "stock": 5})
+    rows = products(root)
+    assert [row["sku"] for row in rows] == ["1", "2", "3", "4"]
+    assert [row["retailer"] for row in rows] == ["alfagift", "alfagift", "indomaret", "indomaret"]
+    assert [row["promo"] for row in rows] == [None, None, '{"min": 2}', None]
+    assert [row["stock"] for row in rows] == [None, None, None, 5]
+
+
+def test_later_values_widen_the_schema_instead_of_being_dropped(tmp_path):
+    root = str(tmp_path / "products")
+    with ParquetSink(root, partition_by=("retailer",), row_group_size=1) as sink:
+        sink.write({"retailer": "alfagift", "sku": "1", "price": 1000})
+        sink.write({"retailer": "alfagift", "sku": "2", "price": 1999.5})
+        sink.write({"retailer": "indomaret", "sku": "3", "price": "call us"})
+    assert [row["price"] for row in products(root)] == ["1000", "1999.5", "call us"]
+
+
+def test_buffered_rows_are_bounded(tmp_path):
+    root = str(tmp_path / "products")
+    with ParquetSink(root, partition_by=("retailer",), row_group_size=1_000, max_buffered_rows=10) as sink:
+        for i in range(100):
+            sink.write({"retailer": f"r{i % 7}", "sku": str(i), "price": i})
+            assert sink._buffered <= 10
+    assert len(dataset_rows(root)) == 100
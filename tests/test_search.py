@@ -0,0 +1,47 @@
+import pytest
+
+from indoscraping.scraper.search import SearchIndex, match_query, stem
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("membeli", "beli"),
+    ("dibeli", "beli"),
+    ("pembelian", "beli"),
+    ("pendidikan", "didik"),
+    ("kebijakan", "bijak"),
+    ("pemerintahan", "perintah"),
+    ("memperbaiki", "baik"),
+    ("menggunakan", "guna"),
+    ("mengambil", "ambil"),
+    ("pengalaman", "alam"),
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize("word", ["menteri", "berita", "sekolah", "penting", "ekonomi", "polisi", "bahkan"])
+def test_stem_keeps_roots_whole(word):
+    assert stem(word) == word
+
+
+@pytest.mark.parametrize("words, expected", [
+    (("mengatakan", "dikatakan", "perkataan"), "kata"),
+    (("mengirim", "dikirim", "pengiriman", "kiriman"), "kirim"),
+    (("mengelola", "dikelola", "pengelolaan"), "kelola"),
+    (("mengeluarkan", "dikeluarkan", "pengeluaran"), "keluar"),
+    (("memberitakan", "diberitakan", "pemberitaan"), "berita"),
+])
+def test_stem_conflates_forms(words, expected):
+    assert [stem(word) for word in words] == [expected] * len(words)
+
+
+def test_match_query_stems_prefix_terms():
+    assert match_query("pembeli* harga") == '"beli"* "harga"'
+
+
+def test_search_finds_inflected_forms(tmp_path):
+    with SearchIndex(str(tmp_path / "search.sqlite")) as index:
+        index.write({"url": "https://example.com/a", "site": "detik", "title": "Menteri mengirim bantuan",
+                     "content": ["Pengiriman beras dikatakan lancar."], "index_date": "2025-07-01"})
+        for query in ("menteri", "kiriman", "mengatakan", "pengirim*"):
+            assert [r["url"] for r in index.search(query)] == ["https://example.com/a"], query